@@ -0,0 +1,83 @@
+"""
+Сравнение полнотекстового поиска (FTS5) с LIKE '%...%' по журналу действий.
+Схема и запросы - те же, что использует бот.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_audit_search [N]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+N_DEFAULT = 1_000_000
+# Частые термины (~4% записей) и редкие (единицы записей на миллион) -
+# при поиске по инциденту обычно ищут именно редкое
+QUERIES = ["nginx", "/etc/nginx/nginx.conf", "certbot", "/etc/letsencrypt"]
+
+SERVICES = ["nginx", "postgresql", "redis", "docker", "ssh", "cron", "fail2ban", "ufw"]
+PATHS = ["/etc/nginx/nginx.conf", "/var/log/syslog", "/home/mrk/app", "/etc/ssh/sshd_config", "/tmp/cache"]
+COMMANDS = ["ls -la {p}", "cat {p}", "systemctl restart {s}", "journalctl -u {s} -n 100", "du -sh {p}", "tail -n 50 {p}"]
+
+def _rows(n):
+    rnd = random.Random(42)
+    for i in range(n):
+        if i % 100_000 == 0:
+            yield (1, "bench", "/exec", "Выполнена команда: certbot renew --config-dir /etc/letsencrypt")
+        elif rnd.random() < 0.3:
+            cmd = rnd.choice(COMMANDS).format(p=rnd.choice(PATHS), s=rnd.choice(SERVICES))
+            yield (rnd.randint(1, 5), "bench", "/exec", f"Выполнена команда: {cmd}")
+        else:
+            yield (rnd.randint(1, 5), "bench", rnd.choice(["/status", "/logs", "/processes"]), "Просмотр")
+
+def _like(conn, term):
+    return conn.execute("""
+        SELECT id, user_id, username, action, details, timestamp
+        FROM logs
+        WHERE details LIKE ? OR action LIKE ?
+        ORDER BY id DESC
+        LIMIT 10
+    """, (f"%{term}%", f"%{term}%")).fetchall()
+
+def _timeit(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+async def _bench(n):
+    from database.database import init_db, search_logs
+    from database.engine import db
+
+    init_db()
+    start = time.perf_counter()
+    db.call(lambda conn: conn.executemany(
+        "INSERT INTO logs (user_id, username, action, details) VALUES (?, ?, ?, ?)", _rows(n)
+    ) and conn.commit())
+    print(f"Вставка {n} записей (с индексацией FTS5): {time.perf_counter() - start:.1f} с\n")
+
+    print(f"{'запрос':<26}{'LIKE, мс':>12}{'FTS5, мс':>12}")
+    loop = asyncio.get_running_loop()
+    for term in QUERIES:
+        like = _timeit(lambda: db.call(_like, term))
+        fts = float("inf")
+        for _ in range(5):
+            started = loop.time()
+            await search_logs(term)
+            fts = min(fts, loop.time() - started)
+        print(f"{term:<26}{like * 1000:>12.1f}{fts * 1000:>12.1f}")
+    db.close()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_DEFAULT
+    with tempfile.TemporaryDirectory() as tmp:
+        # DB_PATH относительный, база создаётся во временном каталоге
+        os.chdir(tmp)
+        asyncio.run(_bench(n))
+
+if __name__ == "__main__":
+    main()
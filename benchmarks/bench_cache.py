@@ -0,0 +1,64 @@
+"""
+Объединение одновременных запросов в utils.cache: N одинаковых /connections
+сразу (по умолчанию 50) должны стоить одного прохода по таблице сокетов,
+повтор в пределах TTL - ни одного, а после invalidate - снова одного.
+Для сравнения те же N запросов выполняются без кэша.
+Код возврата 1, если вычислений больше ожидаемого.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_cache [N]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCH")
+os.environ.setdefault("ADMIN_ID", "0")
+
+from utils.cache import ResponseCache
+from utils.offload import offload
+from utils.sockets import aggregate_sockets
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cache = ResponseCache(ttl=60)
+    computed = 0
+
+    def scan():
+        nonlocal computed
+        computed += 1
+        return aggregate_sockets()
+
+    async def request(user_id: int):
+        return await cache.get(("connections", ()), lambda: offload.run("scan", scan, user_id=user_id))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(offload.run("scan", aggregate_sockets, user_id=i) for i in range(n)))
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(request(i) for i in range(n)))
+    together = time.perf_counter() - start
+    concurrent_computed = computed
+
+    await request(0)
+    cached_computed = computed - concurrent_computed
+
+    cache.invalidate("connections")
+    await asyncio.gather(*(request(i) for i in range(n)))
+    invalidated_computed = computed - concurrent_computed - cached_computed
+
+    print(f"{n} одновременных запросов без кэша: {uncached * 1000:.0f} мс, {n} вычислений")
+    print(f"{n} одновременных запросов с кэшем: {together * 1000:.0f} мс, {concurrent_computed} вычислений")
+    print(f"повтор в пределах TTL: {cached_computed} вычислений")
+    print(f"после invalidate: {invalidated_computed} вычислений")
+    print(f"одинаковый результат у всех: {'да' if all(r is results[0] for r in results) else 'нет'}")
+    print(f"статистика: {cache.stats()}")
+    offload.shutdown()
+    if (concurrent_computed, cached_computed, invalidated_computed) != (1, 0, 1):
+        print("❌ проверка не пройдена")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
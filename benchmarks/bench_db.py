@@ -0,0 +1,87 @@
+"""
+Микробенчмарк операций с БД: старый способ (новое соединение на каждую
+операцию, rollback-журнал) против общего движка database.engine (WAL,
+одно соединение в выделенном потоке).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_db [N]
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from database.engine import Database
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        username TEXT,
+        action TEXT,
+        details TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER UNIQUE,
+        is_admin BOOLEAN DEFAULT 0
+    );
+"""
+INSERT = "INSERT INTO logs (user_id, username, action, details) VALUES (?, ?, ?, ?)"
+SELECT = "SELECT is_admin FROM users WHERE user_id = ?"
+
+def bench_legacy(path, n):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.close()
+
+    start = time.perf_counter()
+    for i in range(n):
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute(INSERT, (i, "bench", "/status", "Просмотр статуса сервера"))
+        conn.commit()
+        conn.close()
+    writes = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(n):
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute(SELECT, (i,))
+        cursor.fetchone()
+        conn.close()
+    reads = n / (time.perf_counter() - start)
+    return writes, reads
+
+async def bench_engine(path, n):
+    database = Database(path)
+    database.call(lambda conn: conn.executescript(SCHEMA))
+
+    start = time.perf_counter()
+    for i in range(n):
+        await database.execute(INSERT, (i, "bench", "/status", "Просмотр статуса сервера"))
+    writes = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(n):
+        await database.fetchone(SELECT, (i,))
+    reads = n / (time.perf_counter() - start)
+    database.close()
+    return writes, reads
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = bench_legacy(os.path.join(tmp, "legacy.db"), n)
+        engine = asyncio.run(bench_engine(os.path.join(tmp, "engine.db"), n))
+
+    print(f"{'':<22}{'insert ops/s':>14}{'select ops/s':>14}")
+    print(f"{'connect per call':<22}{legacy[0]:>14.0f}{legacy[1]:>14.0f}")
+    print(f"{'shared WAL engine':<22}{engine[0]:>14.0f}{engine[1]:>14.0f}")
+
+if __name__ == "__main__":
+    main()
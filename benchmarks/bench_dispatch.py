@@ -0,0 +1,115 @@
+"""
+Стоимость маршрутизации одного апдейта через Dispatcher.feed_update:
+прежние роутеры с фильтрами-лямбдами против таблицы команд (handlers.dispatch).
+Хендлеры пустые, поэтому измеряется только выбор хендлера и разбор апдейта.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_dispatch [N]
+"""
+import asyncio
+import datetime
+import random
+import sys
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import CallbackQuery, Chat, Message, PhotoSize, Update, User
+
+from handlers.dispatch import CommandRouter, build_router
+
+# Команды и callback-и бота по модулям, в порядке подключения роутеров
+COMMANDS = [
+    ["/start", "/help"],
+    ["/auth", "/exec", "/botstats"],
+    ["/status", "/logs", "/trend", "/history"],
+    ["/services"],
+    ["/processes", "/topusage", "/kill", "/pkill"],
+    ["/ports", "/connections", "/net"],
+    ["/backup"],
+    ["/adduser", "/deluser"],
+    ["/audit", "/auditsearch"],
+]
+CALLBACKS = ["show_status", "show_help", "back_to_main", "cancel", "close", "refresh_procs",
+             "create_backup", "list_backups", "close_backup", "admin_panel"]
+PREFIXES = ["kill_", "pkill:", "refresh_procs:", "svc_", "restart_", "stop_", "start_", "audit:", "afts:"]
+
+async def _noop(event):
+    pass
+
+def legacy_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+    for commands in COMMANDS:
+        router = Router()
+        for command in commands:
+            # Как было: `==` или startswith с пробелом
+            router.message.register(
+                _noop, lambda m, c=command: m.text == c or m.text.startswith(c + " ")
+            )
+        dp.include_router(router)
+    router = Router()
+    for data in CALLBACKS:
+        router.callback_query.register(_noop, lambda c, d=data: c.data == d)
+    for prefix in PREFIXES:
+        router.callback_query.register(_noop, lambda c, p=prefix: c.data.startswith(p))
+    dp.include_router(router)
+    return dp
+
+def table_dispatcher() -> Dispatcher:
+    routers = []
+    for commands in COMMANDS:
+        router = CommandRouter()
+        router.message(*commands)(_noop)
+        routers.append(router)
+    router = CommandRouter()
+    router.callback_query(*CALLBACKS, prefix=tuple(PREFIXES))(_noop)
+    routers.append(router)
+    dp = Dispatcher()
+    dp.include_router(build_router(*routers))
+    return dp
+
+def make_updates(n: int) -> list:
+    rnd = random.Random(42)
+    user = User(id=1, is_bot=False, first_name="bench")
+    chat = Chat(id=1, type="private")
+    date = datetime.datetime.now()
+    commands = [c for group in COMMANDS for c in group]
+    updates = []
+    for i in range(n):
+        kind = rnd.random()
+        if kind < 0.5:
+            text = rnd.choice(commands) + rnd.choice(("", " 50", " cpu 1h"))
+            message = Message(message_id=i, date=date, chat=chat, from_user=user, text=text)
+            updates.append(Update(update_id=i, message=message))
+        elif kind < 0.9:
+            data = rnd.choice(CALLBACKS + [p + str(rnd.randrange(1000)) for p in PREFIXES])
+            message = Message(message_id=i, date=date, chat=chat, from_user=user, text="menu")
+            callback = CallbackQuery(id=str(i), from_user=user, chat_instance="1", message=message, data=data)
+            updates.append(Update(update_id=i, callback_query=callback))
+        else:
+            # Фото без текста: прежние фильтры падали на message.text = None
+            photo = [PhotoSize(file_id="x", file_unique_id="x", width=1, height=1)]
+            message = Message(message_id=i, date=date, chat=chat, from_user=user, photo=photo)
+            updates.append(Update(update_id=i, message=message))
+    return updates
+
+async def _measure(dp: Dispatcher, bot: Bot, updates: list):
+    errors = 0
+    start = time.perf_counter()
+    for update in updates:
+        try:
+            await dp.feed_update(bot, update)
+        except AttributeError:
+            errors += 1
+    return (time.perf_counter() - start) / len(updates), errors
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    bot = Bot(token="42:BENCH")
+    updates = make_updates(n)
+    for name, dp in (("лямбда-фильтры", legacy_dispatcher()), ("таблица команд", table_dispatcher())):
+        seconds, errors = await _measure(dp, bot, updates)
+        print(f"{name:<18}{seconds * 1e6:>10.1f} мкс/апдейт   ошибок в фильтрах: {errors}")
+    await bot.session.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+/logs follow на локальном фейковом писателе логов, без journalctl и Telegram:
+писатель дописывает строки в стиле syslog во временный файл (RATE строк в
+секунду, SECONDS секунд, посередине - ротация как у logrotate), слежение
+фильтрует `nginx` + `error`, сообщение обновляется через фейковый объект.
+Проверяется, что
+- все подходящие строки дошли, и только они (в том числе через ротацию);
+- задержка от записи строки до её разбора меньше MAX_LAG_MS;
+- между правками сообщения не меньше LOG_FOLLOW_EDIT_INTERVAL;
+- после остановки писателя слежение заканчивается по простою.
+Код возврата 1 при провале.
+
+Только писатель, для проверки живого бота с LOG_FOLLOW_FILE=<файл>:
+    python -m benchmarks.bench_logfollow write <файл> [строк/с]
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_logfollow [строк/с] [секунд]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCH")
+os.environ.setdefault("ADMIN_ID", "0")
+
+from config.config import LOG_FOLLOW_EDIT_INTERVAL
+from handlers.monitoring import _follow_logs
+from utils.logfollow import FILE_POLL_INTERVAL, LogFollowManager
+from utils.offload import offload
+
+MAX_LAG_MS = FILE_POLL_INTERVAL * 1000 + 500
+IDLE = 2
+UNITS = ("nginx", "sshd", "cron", "systemd")
+LEVELS = ("info", "info", "info", "warning", "error")
+
+def fake_line(seq: int) -> str:
+    """Строка syslog; номер и время записи - для проверки доставки и задержки"""
+    unit = random.choice(UNITS)
+    return (
+        f"{time.strftime('%b %d %H:%M:%S')} bench {unit}[{1000 + seq % 50}]: "
+        f"{random.choice(LEVELS)} seq={seq} t={time.perf_counter():.6f}"
+    )
+
+async def write_lines(path: str, rate: float, seconds: float = None, rotate_at: float = None) -> list:
+    """Дописывает строки в path; возвращает записанные строки"""
+    written = []
+    start = time.perf_counter()
+    f = open(path, "a", buffering=1)
+    try:
+        while seconds is None or time.perf_counter() - start < seconds:
+            if rotate_at is not None and time.perf_counter() - start >= rotate_at:
+                # Как logrotate: переименование и новый файл
+                f.close()
+                os.rename(path, path + ".1")
+                f = open(path, "a", buffering=1)
+                rotate_at = None
+            line = fake_line(len(written))
+            f.write(line + "\n")
+            written.append(line)
+            await asyncio.sleep(1 / rate)
+    finally:
+        f.close()
+    return written
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append(time.perf_counter())
+
+async def bench(rate: float, seconds: float):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "syslog")
+        open(path, "w").close()
+        follows = LogFollowManager(path)
+        follow = follows.start(chat_id=1, unit="nginx", pattern="error", idle=IDLE)
+
+        lags = []
+        on_line = follow._on_line
+
+        def measure(line: str):
+            if "nginx" in line and "error" in line:
+                lags.append(time.perf_counter() - float(line.rsplit("t=", 1)[1]))
+            on_line(line)
+        follow._on_line = measure
+
+        message = FakeMessage()
+        viewer = asyncio.create_task(_follow_logs(follow, message))
+        # Слежение открывает файл в фоне - даём ему начать с текущего конца
+        await asyncio.sleep(FILE_POLL_INTERVAL)
+        start = time.perf_counter()
+        written = await write_lines(path, rate, seconds, rotate_at=seconds / 2)
+        await viewer
+        elapsed = time.perf_counter() - start
+
+    expected = [line for line in written if "nginx" in line and "error" in line]
+    received = follow.stored.text().splitlines()
+    gaps = [b - a for a, b in zip(message.edits, message.edits[1:])]
+    min_gap = min(gaps) if gaps else float("inf")
+    max_lag = max(lags) * 1000 if lags else 0.0
+
+    print(f"записано {len(written)} строк за {seconds:g} с, подходит {len(expected)}, получено {follow.matched} (всего разобрано {follow.seen})")
+    print(f"задержка строки: макс {max_lag:.0f} мс, средняя {sum(lags) / max(len(lags), 1) * 1000:.0f} мс")
+    print(f"правок сообщения: {len(message.edits)}, минимум {min_gap:.2f} с между правками (интервал {LOG_FOLLOW_EDIT_INTERVAL:g} с)")
+    print(f"остановка: {follow.status} через {elapsed - seconds:.1f} с после последней строки (простой {IDLE} с)")
+    offload.shutdown()
+
+    ok = (
+        received == expected
+        and max_lag <= MAX_LAG_MS
+        and min_gap >= LOG_FOLLOW_EDIT_INTERVAL * 0.95
+        and follow.status == "idle"
+    )
+    if not ok:
+        print("❌ проверка не пройдена")
+        sys.exit(1)
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "write":
+        rate = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+        print(f"пишу {rate:g} строк/с в {sys.argv[2]}, Ctrl+C - остановить")
+        try:
+            asyncio.run(write_lines(sys.argv[2], rate))
+        except KeyboardInterrupt:
+            pass
+        return
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(bench(rate, seconds))
+
+if __name__ == "__main__":
+    main()
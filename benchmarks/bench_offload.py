@@ -0,0 +1,93 @@
+"""
+Отзывчивость event loop, пока через utils.offload выполняется долгая команда:
+`sleep N` (по умолчанию 30 с) у одного пользователя, а в это время
+- таймер раз в 10 мс меряет задержку event loop;
+- другой пользователь выполняет короткие команды и сканирование;
+- у третьего отменяется долгая команда - её процесс должен завершиться.
+Код возврата 1, если event loop задерживался дольше MAX_LAG_MS
+или отменённая команда осталась жива.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_offload [секунд]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCH")
+os.environ.setdefault("ADMIN_ID", "0")
+
+from utils.offload import offload
+from utils.sockets import aggregate_sockets
+
+MAX_LAG_MS = 100
+TICK = 0.01
+
+async def _ticker(stop: asyncio.Event) -> list:
+    lags = []
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, loop.time() - expected))
+    return lags
+
+async def _other_user(stop: asyncio.Event) -> list:
+    """Короткие задачи второго пользователя: сколько ждал каждый ответ"""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await offload.command(["true"], user_id=2)
+        await offload.run("scan", aggregate_sockets, user_id=2)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.5)
+    return latencies
+
+async def _cancelled_command() -> bool:
+    """Отменяет `sleep 600` третьего пользователя; True, если процесс завершился"""
+    task = asyncio.create_task(offload.command(["sleep", "600"], user_id=3))
+    await asyncio.sleep(0.5)
+    pids = [int(p) for p in os.listdir("/proc") if p.isdigit() and _cmdline(p) == "sleep\x00600\x00"]
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    await asyncio.sleep(0.1)
+    return bool(pids) and not any(os.path.exists(f"/proc/{pid}") for pid in pids)
+
+def _cmdline(pid: str) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+async def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(stop))
+    other = asyncio.create_task(_other_user(stop))
+
+    start = time.perf_counter()
+    long_command = asyncio.create_task(offload.command(["sleep", str(seconds)], user_id=1, timeout=seconds + 10))
+    cancelled_ok = await _cancelled_command()
+    result = await long_command
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags, latencies = await ticker, await other
+
+    max_lag = max(lags) * 1000
+    print(f"sleep {seconds:g}: код {result.returncode}, {elapsed:.1f} с")
+    print(f"задержка event loop: макс {max_lag:.1f} мс, средняя {sum(lags) / len(lags) * 1000:.2f} мс ({len(lags)} тиков)")
+    print(f"другой пользователь: {len(latencies)} запросов, макс {max(latencies) * 1000:.0f} мс")
+    print(f"отменённая команда завершена: {'да' if cancelled_ok else 'нет'}")
+    print(f"статистика: {offload.stats()}")
+    offload.shutdown()
+    if max_lag > MAX_LAG_MS or not cancelled_ok:
+        print("❌ проверка не пройдена")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
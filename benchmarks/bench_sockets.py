@@ -0,0 +1,54 @@
+"""
+Время построения сводки /connections (aggregate_sockets) по синтетической
+таблице сокетов /proc/net/tcp из N записей в формате ядра.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_sockets [N]
+"""
+import random
+import sys
+import tempfile
+import time
+
+from utils import sockets
+
+HEADER = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when "
+          "retrnsmt   uid  timeout inode\n")
+
+def _write_table(path, n):
+    rnd = random.Random(42)
+    # Как на нагруженном веб-сервере: много клиентов на 443/80, немного исходящих
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for i in range(n):
+            local_port = rnd.choice((443, 443, 443, 80, 5432))
+            remote_ip = rnd.randrange(1 << 32) if rnd.random() < 0.5 else rnd.randrange(4096)
+            state = rnd.choice(("01", "01", "01", "06", "08", "03"))
+            line = (
+                f"{i:4d}: 0A00000F:{local_port:04X} {remote_ip:08X}:{rnd.randrange(1024, 65536):04X} {state} "
+                f"00000000:00000000 00:00000000 00000000  1000        0 {100000 + i} 1 "
+                f"0000000000000000 20 4 30 10 -1"
+            )
+            # Ядро дополняет строки IPv4 пробелами до 149 символов
+            f.write(line.ljust(149) + "\n")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_table(f"{tmp}/tcp", n)
+        sockets.PROC_NET = tmp
+        sockets.all_socket_owners()  # карта владельцев кэшируется отдельно
+
+        for title, filters in (
+            ("без фильтров", {}),
+            ("port=443 state=ESTAB", {"port": 443, "state": sockets.parse_state("ESTAB")}),
+        ):
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                summary = sockets.aggregate_sockets(protocols=("tcp",), **filters)
+                best = min(best, time.perf_counter() - start)
+            print(f"{title:<24}{summary['total']:>8} сокетов{best * 1000:>10.1f} мс")
+
+if __name__ == "__main__":
+    main()
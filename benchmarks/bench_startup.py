@@ -0,0 +1,140 @@
+"""
+Время запуска бота с бюджетом:
+- импорт main по `python -X importtime` (всего и самые тяжёлые модули);
+- редкие тяжёлые модули (бэкапы, webhook) не должны загружаться при старте;
+- время от запуска `python main.py` до первого getUpdates на локальном
+  фейковом Bot API (TELEGRAM_API_URL), то есть до готовности принимать апдейты.
+Код возврата 1, если бюджет превышен.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup [N]
+"""
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+from benchmarks.bench_webhook import FakeTelegram, _free_port
+
+# Бюджет, мс: медиана по N запускам, с прогретым кэшем байткода.
+# Большую часть импорта занимает aiogram (модели Bot API), поэтому
+# модули самого бота ограничены отдельно
+IMPORT_BUDGET_MS = 3500
+OWN_IMPORT_BUDGET_MS = 100
+READY_BUDGET_MS = 4000
+
+# Пакеты репозитория
+OWN_PACKAGES = ("config", "database", "handlers", "middlewares", "utils")
+
+# Модули, которые нужны только по требованию
+LAZY_MODULES = (
+    "requests", "smtplib", "tarfile", "email.mime.multipart", "aiohttp.web",
+    "concurrent.futures.process",
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _env(**extra) -> dict:
+    env = dict(os.environ, BOT_TOKEN="42:BENCH", ADMIN_ID="1", **extra)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (ROOT, env.get("PYTHONPATH"))))
+    return env
+
+def import_profile() -> tuple:
+    """(всего мкс, [(мкс, модуль)] прямых импортов main)"""
+    # main при импорте создаёт bot.log в текущем каталоге - запускаем во временном
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=workdir, env=_env(), capture_output=True, text=True, check=True,
+        )
+    total, children = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[13:]:
+            continue
+        _, cumulative, name = line[12:].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        if name.strip() == "main":
+            total = int(cumulative)
+        elif name.startswith("   ") and not name.startswith("    "):
+            children.append((int(cumulative), name.strip()))
+    return total, sorted(children, reverse=True)
+
+def loaded_lazy_modules() -> list:
+    code = f"import main, sys; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=workdir, env=_env(), capture_output=True, text=True, check=True,
+        )
+    return [m for m in result.stdout.strip().split(",") if m]
+
+class ReadyTelegram(FakeTelegram):
+    """Фейковый Bot API, который отмечает первый getUpdates"""
+
+    def __init__(self):
+        super().__init__()
+        self.ready = asyncio.Event()
+
+    async def _get_updates(self, timeout: float) -> list:
+        self.ready.set()
+        return await super()._get_updates(timeout)
+
+async def time_to_ready() -> float:
+    api = ReadyTelegram()
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.join(ROOT, "main.py"), cwd=workdir,
+                env=_env(TELEGRAM_API_URL=f"http://127.0.0.1:{port}"),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                await asyncio.wait_for(api.ready.wait(), 30)
+                return time.perf_counter() - start
+            finally:
+                proc.send_signal(signal.SIGINT)
+                try:
+                    await asyncio.wait_for(proc.wait(), 10)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+    finally:
+        await runner.cleanup()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # Первый запуск только прогревает кэш байткода
+    import_profile()
+    profiles = [import_profile() for _ in range(n)]
+    import_ms = statistics.median(total for total, _ in profiles) / 1000
+    own_ms = statistics.median(
+        sum(c for c, name in children if name.split(".")[0] in OWN_PACKAGES) for _, children in profiles
+    ) / 1000
+    print(f"импорт main: {import_ms:.0f} мс (бюджет {IMPORT_BUDGET_MS} мс)")
+    print(f"из них модули бота: {own_ms:.0f} мс (бюджет {OWN_IMPORT_BUDGET_MS} мс)")
+    for cumulative, name in profiles[-1][1][:8]:
+        print(f"  {name:<36}{cumulative / 1000:>8.1f} мс")
+
+    lazy = loaded_lazy_modules()
+    print(f"загружены при старте из отложенных: {', '.join(lazy) or 'нет'}")
+
+    ready_ms = statistics.median(asyncio.run(time_to_ready()) for _ in range(n)) * 1000
+    print(f"до первого getUpdates: {ready_ms:.0f} мс (бюджет {READY_BUDGET_MS} мс)")
+
+    if import_ms > IMPORT_BUDGET_MS or own_ms > OWN_IMPORT_BUDGET_MS or ready_ms > READY_BUDGET_MS or lazy:
+        print("❌ бюджет запуска превышен")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
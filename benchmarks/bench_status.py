@@ -0,0 +1,61 @@
+"""
+Задержка одного вызова get_system_status(): прежняя версия
+(cpu_percent(interval=1) и fork'и `uptime -p` / `hostname -I`)
+против сборщика на /proc и psutil.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_status [N]
+"""
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("BOT_TOKEN", "42:BENCH")
+os.environ.setdefault("ADMIN_ID", "0")
+
+import psutil
+
+from utils import system_monitor
+from utils.sampler import sampler
+
+def legacy_status(cpu_interval):
+    cpu = psutil.cpu_percent(interval=cpu_interval)
+    mem = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    uptime = subprocess.check_output(["uptime", "-p"], text=True).strip()
+    try:
+        ip = subprocess.check_output("hostname -I", shell=True, text=True).strip()
+    except Exception:
+        ip = "Не удалось получить IP"
+    return cpu, mem, disk, uptime, ip
+
+def _measure(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = []
+    rows.append(("прежняя версия (interval=1)", _measure(lambda: legacy_status(1), 2)))
+    try:
+        rows.append(("прежняя версия без sleep CPU", _measure(lambda: legacy_status(None), n)))
+    except (OSError, subprocess.CalledProcessError) as e:
+        rows.append((f"прежняя версия: {e}", float("nan")))
+
+    def uncached():
+        # Новый снимок на каждый вызов: полный проход по /proc и статусу
+        sampler.snapshot = sampler.sample()
+        return system_monitor.get_system_status()
+
+    rows.append(("/proc, новый снимок на вызов", _measure(uncached, n)))
+    sampler.snapshot = sampler.sample()
+    rows.append(("/proc, кэш такта сборщика", _measure(system_monitor.get_system_status, n * 100)))
+
+    for name, seconds in rows:
+        print(f"{name:<34}{seconds * 1e6:>14.1f} мкс")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Задержка доставки апдейта до ответа бота в режимах polling и webhook
+против локального фейкового Bot API: сервер отдаёт апдейт через
+getUpdates или POST'ом на webhook и замеряет время до sendMessage.
+Заодно проверяет, что webhook без секрета отклоняется.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_webhook [N]
+"""
+import asyncio
+import socket
+import statistics
+import sys
+import time
+
+from aiohttp import ClientSession, web
+from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from handlers.dispatch import CommandRouter, build_router
+from utils.webhook import run_webhook
+
+TOKEN = "42:BENCH"
+CHAT = {"id": 1, "type": "private"}
+USER = {"id": 1, "is_bot": False, "first_name": "bench"}
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class FakeTelegram:
+    """Минимальный Bot API: getMe, set/deleteWebhook, getUpdates, sendMessage"""
+
+    def __init__(self):
+        self.updates = asyncio.Queue()
+        self.webhook = None
+        self.secret = None
+        self.sent = {}
+        self.replies = {}
+        self._update_id = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        data = await request.post()
+        if method == "getme":
+            result = {**USER, "id": 42, "is_bot": True, "username": "bench_bot"}
+        elif method == "setwebhook":
+            self.webhook, self.secret = data["url"], data.get("secret_token")
+            result = True
+        elif method == "deletewebhook":
+            self.webhook = None
+            result = True
+        elif method == "getupdates":
+            result = await self._get_updates(float(data.get("timeout", 0)))
+        elif method == "sendmessage":
+            key = data["text"].split()[-1]
+            self.replies[key].set_result(time.perf_counter())
+            result = {"message_id": 1, "date": 0, "chat": CHAT, "text": data["text"]}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, timeout: float) -> list:
+        try:
+            updates = [await asyncio.wait_for(self.updates.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return updates
+
+    def make_update(self, key: str) -> dict:
+        self._update_id += 1
+        message = {"message_id": self._update_id, "date": 0, "chat": CHAT, "from": USER, "text": f"/ping {key}"}
+        self.replies[key] = asyncio.get_running_loop().create_future()
+        self.sent[key] = time.perf_counter()
+        return {"update_id": self._update_id, "message": message}
+
+    async def deliver(self, key: str, http: ClientSession = None, secret: str = None):
+        """Апдейт в очередь getUpdates или POST'ом на webhook; ждёт ответа бота"""
+        update = self.make_update(key)
+        if http is None:
+            await self.updates.put(update)
+        else:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": secret or ""}
+            async with http.post(self.webhook, json=update, headers=headers) as response:
+                if response.status != 200:
+                    return response.status
+        return await self.replies[key] - self.sent[key]
+
+def make_dispatcher() -> Dispatcher:
+    router = CommandRouter()
+
+    @router.message("/ping")
+    async def ping(message: types.Message):
+        await message.answer("pong " + message.text.split()[-1])
+
+    dp = Dispatcher()
+    dp.include_router(build_router(router))
+    return dp
+
+async def bench_polling(api: FakeTelegram, base: str, n: int) -> list:
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base)))
+    dp = make_dispatcher()
+    task = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=10))
+    latencies = [await api.deliver(f"p{i}") for i in range(n)]
+    await dp.stop_polling()
+    await task
+    return latencies
+
+async def bench_webhook(api: FakeTelegram, base: str, n: int) -> list:
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base)))
+    dp = make_dispatcher()
+    port = _free_port()
+    stop = asyncio.Event()
+    task = asyncio.create_task(run_webhook(
+        dp, bot, f"http://127.0.0.1:{port}", "127.0.0.1", port, secret="bench-secret", stop=stop
+    ))
+    while api.webhook is None:
+        await asyncio.sleep(0.01)
+    async with ClientSession() as http:
+        status = await api.deliver("forged", http, secret="wrong")
+        print(f"webhook с неверным секретом: HTTP {status}")
+        latencies = [await api.deliver(f"w{i}", http, api.secret) for i in range(n)]
+    stop.set()
+    await task
+    assert api.webhook is None, "webhook не снят при остановке"
+    return latencies
+
+def _report(name: str, latencies: list):
+    ms = sorted(x * 1000 for x in latencies)
+    p95 = ms[int(len(ms) * 0.95)]
+    print(f"{name:<10} медиана {statistics.median(ms):7.2f} мс   p95 {p95:7.2f} мс   макс {ms[-1]:7.2f} мс")
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    api = FakeTelegram()
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _report("polling", await bench_polling(api, base, n))
+        _report("webhook", await bench_webhook(api, base, n))
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
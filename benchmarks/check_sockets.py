@@ -0,0 +1,186 @@
+"""
+Проверка столбцового разбора aggregate_sockets: сводка сравнивается со
+сводкой простого построчного разбора (line.split()) на синтетических
+таблицах в форматах ядра - tcp с дополнением пробелами и номерами строк
+шире %4d, tcp6 и udp6 без дополнения, udp с %5d, широкие uid, inode
+разной ширины, короткие строки TIME-WAIT - при разных BATCH_BYTES и
+фильтрах. Код возврата 1 при любом расхождении.
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_sockets [N]
+"""
+import random
+import sys
+import tempfile
+from collections import Counter
+
+from utils import sockets
+
+HEADER = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when "
+          "retrnsmt   uid  timeout inode\n")
+HEADER6 = ("  sl  local_address                         remote_address                        st tx_queue "
+           "rx_queue tr tm->when retrnsmt   uid  timeout inode\n")
+
+# Размеры куска: по умолчанию, несколько строк, меньше одной строки
+BATCHES = (sockets.BATCH_BYTES, 5000, 149 * 7, 100)
+
+FILTERS = (
+    {},
+    {"port": 443},
+    {"port": 22},
+    {"port": 1},
+    {"state": "01"},
+    {"state": "0A"},
+    {"state": "07"},
+    {"port": 443, "state": "06"},
+    {"ip": "127.0.0.1"},
+    {"ip": "::1"},
+    {"ip": "10.0.0.7"},
+    {"ip": "0.0.0.1", "port": 443},
+)
+
+def _v6(words) -> str:
+    return "".join(f"{w:08X}" for w in words)
+
+def _line(rnd, i: int, v6: bool, udp: bool) -> str:
+    """Строка таблицы как её печатает ядро (tcp4_seq_show, tcp6_seq_show, udp4_format_sock)"""
+    local_port = rnd.choice((443, 443, 80, 22, 1, 5432))
+    remote_port = rnd.choice((0, 443, rnd.randrange(1024, 65536)))
+    if rnd.random() < 0.1:
+        remote = 0x0100007F  # 127.0.0.1
+    elif rnd.random() < 0.2:
+        remote = 0x0700000A  # 10.0.0.7
+    else:
+        remote = rnd.choice((0, 0x01000000, rnd.randrange(1 << 32), rnd.randrange(64)))
+    if v6:
+        # IPv4-mapped, ::1 и обычные IPv6
+        kind = rnd.random()
+        if kind < 0.4:
+            rip = _v6((0, 0, 0xFFFF0000, remote))
+        elif kind < 0.5:
+            rip = _v6((0, 0, 0, 0x01000000))
+        else:
+            rip = _v6(rnd.randrange(1 << 32) for _ in range(4)) if remote else _v6((0, 0, 0, 0))
+        lip = _v6((0, 0, 0xFFFF0000, 0x0F00000A)) if rnd.random() < 0.5 else _v6((0, 0, 0, 0))
+    else:
+        rip = f"{remote:08X}"
+        lip = rnd.choice(("0F00000A", "00000000", "0100007F"))
+    state = rnd.choice(("07",) if udp else ("01", "01", "01", "06", "0A", "08", "03"))
+    # uid обычно до 5 цифр, в контейнерах с user namespace - шире
+    uid = rnd.choice((0, 33, 1000, 65534, 100000, 4294967294))
+    # inode от 1 до 10 цифр, у TIME-WAIT - 0
+    inode = 0 if state == "06" else rnd.randrange(1, 10 ** rnd.randint(1, 10))
+    sl = f"{i:5d}" if udp else f"{i:4d}"
+    head = f"{sl}: {lip}:{local_port:04X} {rip}:{remote_port:04X} {state}"
+    if state == "06":
+        # TIME-WAIT печатается короче (get_timewait4_sock)
+        return f"{head} 00000000:00000000 03:0000171B 00000000     0        0 0 3 0000000000000000"
+    tail = f" 00000000:00000000 00:00000000 00000000 {uid:5d} {rnd.choice((0, 0, 1234567)):8d} {inode}"
+    if udp:
+        return f"{head}{tail} 2 ffff888012345678 {rnd.choice((0, 12))}"
+    return f"{head}{tail} 1 ffff888012345678 20 4 30 10 -1"
+
+def _write_tables(tmp: str, n: int, rnd) -> set:
+    """Таблицы tcp, tcp6, udp, udp6; возвращает inode всех строк"""
+    inodes = set()
+    for proto, rows, width in (("tcp", n, 149), ("tcp6", n // 4, 0), ("udp", n // 10, 127), ("udp6", n // 20, 0)):
+        v6 = proto.endswith("6")
+        with open(f"{tmp}/{proto}", "w") as f:
+            header = HEADER6 if v6 else HEADER
+            f.write(header.rstrip("\n").ljust(width) + "\n" if width else header)
+            for i in range(rows):
+                line = _line(rnd, i, v6, proto.startswith("udp"))
+                inodes.add(line.split()[9])
+                # Ядро дополняет пробелами только таблицы IPv4
+                f.write((line.ljust(width) if width else line) + "\n")
+    return inodes
+
+def reference(port=None, state=None, ip=None, protocols=sockets.PROTOCOLS, top=10, sample=15) -> dict:
+    """Сводка как у aggregate_sockets, но построчным разбором"""
+    port_hex = f"{port:04X}" if port is not None else None
+    ip_hex = {x.decode() for x in sockets.encode_ip(ip)} if ip is not None else None
+    owners, names = sockets.all_socket_owners()
+    total = 0
+    states, remotes, local_ports, processes = Counter(), Counter(), Counter(), Counter()
+    samples = []
+    for proto in protocols:
+        with open(f"{sockets.PROC_NET}/{proto}") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                local, remote, code = fields[1], fields[2], fields[3]
+                local_port = local.split(":")[1]
+                remote_ip, remote_port = remote.split(":")
+                if state is not None and code != state:
+                    continue
+                if port_hex is not None and port_hex not in (local_port, remote_port):
+                    continue
+                if ip_hex is not None and remote_ip not in ip_hex:
+                    continue
+                total += 1
+                states[code] += 1
+                local_ports[local_port] += 1
+                if set(remote_ip) != {"0"}:
+                    remotes[remote_ip] += 1
+                pid = owners.get(fields[9].encode())
+                if pid is not None:
+                    processes[pid] += 1
+                if len(samples) < sample:
+                    samples.append(sockets.SocketEntry(proto, local, remote, code, int(fields[7]), int(fields[9])))
+    return {
+        "total": total,
+        "states": [(sockets.STATES.get(k, k), n) for k, n in states.most_common()],
+        "remotes": [(sockets.decode_endpoint(k + ":0000")[0], n) for k, n in remotes.most_common(top)],
+        "local_ports": [(int(k, 16), n) for k, n in local_ports.most_common(top)],
+        "processes": [(f"{names[pid]}/{pid}", n) for pid, n in processes.most_common(top)],
+        "samples": samples if total <= sample else [],
+    }
+
+def _diff(got: dict, want: dict) -> list:
+    fields = []
+    for key, value in want.items():
+        if key == "states":
+            # Порядок состояний с равными счётчиками не определён
+            if sorted(got[key]) != sorted(value):
+                fields.append(key)
+        elif got[key] != value:
+            fields.append(key)
+    return fields
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 12_000
+    rnd = random.Random(7)
+    mismatches = 0
+    checks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        inodes = sorted(_write_tables(tmp, n, rnd) - {"0"})
+        sockets.PROC_NET = tmp
+        # Владельцы - у части сокетов, несколько на процесс; кэш не устаревает
+        owned = rnd.sample(inodes, len(inodes) // 2)
+        owners = {inode.encode(): 1000 + i % 37 for i, inode in enumerate(owned)}
+        names = {pid: f"proc{pid}" for pid in set(owners.values())}
+        sockets._owners_cache.update(time=float("inf"), owners=owners, names=names)
+
+        batch_bytes = sockets.BATCH_BYTES
+        try:
+            for batch in BATCHES:
+                sockets.BATCH_BYTES = batch
+                for protocols in (sockets.PROTOCOLS, ("tcp",), ("udp6",)):
+                    for filters in FILTERS:
+                        checks += 1
+                        want = reference(protocols=protocols, **filters)
+                        got = sockets.aggregate_sockets(protocols=protocols, **filters)
+                        fields = _diff(got, want)
+                        if fields:
+                            mismatches += 1
+                            print(f"BATCH_BYTES={batch} {protocols} {filters}: расходятся {', '.join(fields)}")
+                            for field in fields:
+                                print(f"  {field}: {got[field]!r}\n  ожидалось: {want[field]!r}")
+        finally:
+            sockets.BATCH_BYTES = batch_bytes
+    print(f"проверок: {checks}, расхождений: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
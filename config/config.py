@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Свой сервер Bot API (telegram-bot-api), по умолчанию api.telegram.org
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
 ADMIN_ID = int(os.getenv("ADMIN_ID"))
 BACKUP_STORAGE_PATH = os.getenv("BACKUP_STORAGE_PATH", os.path.expanduser("~/backups"))
 
@@ -23,5 +25,82 @@ CPU_THRESHOLD = int(os.getenv("CPU_THRESHOLD", "80"))
 MEMORY_THRESHOLD = int(os.getenv("MEMORY_THRESHOLD", "85"))
 DISK_THRESHOLD = int(os.getenv("DISK_THRESHOLD", "90"))
 
+# Сколько секунд порог CPU/RAM должен быть превышен до уведомления
+# и минимальный интервал между повторными уведомлениями одного правила
+ALERT_DURATION = int(os.getenv("ALERT_DURATION", "300"))
+ALERT_COOLDOWN = int(os.getenv("ALERT_COOLDOWN", "1800"))
+# Свои правила вместо порогов выше, через `;`:
+# "cpu>90 for=5m recover=80 cooldown=30m; disk>95 for=1m; inodes>90"
+ALERT_RULES = os.getenv("ALERT_RULES", "")
+
+# Исходящий трафик, Мбит/с, и сколько секунд он должен держаться для уведомления
+NET_EGRESS_THRESHOLD = float(os.getenv("NET_EGRESS_THRESHOLD", "80"))
+NET_EGRESS_DURATION = int(os.getenv("NET_EGRESS_DURATION", "300"))
+
+# Лимиты исходящих сообщений Telegram, запросов в секунду:
+# всего, в личный чат и в группу (Telegram допускает ~30/с, 1/с и 20/мин)
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "25"))
+OUTBOX_CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", "1"))
+OUTBOX_GROUP_RATE = float(os.getenv("OUTBOX_GROUP_RATE", "0.33"))
+
+# Режим webhook: публичный адрес (https://bot.example.com), на который Telegram
+# шлёт апдейты. Если не задан - long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# Адрес встроенного сервера (обычно за reverse proxy с TLS)
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+# Одновременных блокирующих задач из хендлеров по категориям:
+# внешние команды, сканирование /proc, файлы и сеть, сжатие (пул процессов), задачи /exec,
+# /logs follow
+OFFLOAD_LIMITS = {
+    'command': int(os.getenv("OFFLOAD_COMMANDS", "4")),
+    'scan': int(os.getenv("OFFLOAD_SCANS", "2")),
+    'io': int(os.getenv("OFFLOAD_IO", "4")),
+    'cpu': int(os.getenv("OFFLOAD_CPU", "1")),
+    'exec': int(os.getenv("OFFLOAD_EXEC", "4")),
+    'follow': int(os.getenv("OFFLOAD_FOLLOW", "4")),
+}
+# Сколько таких задач может выполняться сразу у одного пользователя
+OFFLOAD_USER_LIMIT = int(os.getenv("OFFLOAD_USER_LIMIT", "2"))
+# Таймаут внешних команд (systemctl, journalctl, useradd), секунд
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "60"))
+# Задачи /exec: таймаут, секунд; одновременных задач на пользователя;
+# как часто обновлять сообщение с выводом, секунд
+EXEC_TIMEOUT = float(os.getenv("EXEC_TIMEOUT", "600"))
+EXEC_USER_JOBS = int(os.getenv("EXEC_USER_JOBS", "3"))
+EXEC_EDIT_INTERVAL = float(os.getenv("EXEC_EDIT_INTERVAL", "2"))
+# Сколько секунд переиспользовать ответ /services, /ports,
+# /connections и /processes для одинаковых запросов (0 - только объединять одновременные)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3"))
+# Полные выводы /exec и /logs для постраничного просмотра: сколько байт
+# занимают сжатые выводы всего и сколько секунд хранится вывод после последнего просмотра
+OUTPUT_STORE_MAX_BYTES = int(os.getenv("OUTPUT_STORE_MAX_BYTES", str(32 * 1024 * 1024)))
+OUTPUT_STORE_TTL = float(os.getenv("OUTPUT_STORE_TTL", "3600"))
+
+# /logs follow: остановка, если новых строк нет LOG_FOLLOW_IDLE секунд, и в любом
+# случае через LOG_FOLLOW_MAX секунд; как часто обновлять сообщение, секунд
+LOG_FOLLOW_IDLE = float(os.getenv("LOG_FOLLOW_IDLE", "300"))
+LOG_FOLLOW_MAX = float(os.getenv("LOG_FOLLOW_MAX", "3600"))
+LOG_FOLLOW_EDIT_INTERVAL = float(os.getenv("LOG_FOLLOW_EDIT_INTERVAL", "2"))
+# Следить за файлом вместо journalctl (например, за файлом фейкового писателя логов)
+LOG_FOLLOW_FILE = os.getenv("LOG_FOLLOW_FILE", "")
+
 # Подключение Яндекс.Диск для бэкапа
 YANDEX_DISK_TOKEN = os.getenv('YANDEX_DISK_TOKEN')
+
+# Период фонового сбора метрик, секунд
+SAMPLE_INTERVAL = float(os.getenv("SAMPLE_INTERVAL", "1"))
+
+# Период обновления таблицы процессов, секунд
+PROCESS_REFRESH_INTERVAL = float(os.getenv("PROCESS_REFRESH_INTERVAL", "5"))
+
+# Учёт потребления по процессам для /topusage: глубина истории, секунд,
+# и сколько процессов (включая завершившиеся) хранить
+USAGE_RETENTION = int(os.getenv("USAGE_RETENTION", "3600"))
+USAGE_MAX_PROCESSES = int(os.getenv("USAGE_MAX_PROCESSES", "1000"))
+
+# Файл архива метрик (переживает перезапуски бота)
+METRICS_ARCHIVE_PATH = os.getenv("METRICS_ARCHIVE_PATH", "metrics.rrd")
@@ -1,2 +1,11 @@
 # config/database.py
 DB_PATH = "users.db"
+
+# Асинхронная запись журнала действий
+AUDIT_QUEUE_SIZE = 10000      # максимум записей в очереди, сверх этого записи отбрасываются
+AUDIT_BATCH_SIZE = 500        # максимум записей в одной транзакции
+AUDIT_FLUSH_INTERVAL = 1.0    # секунд ожидания перед записью неполного пакета
+
+# Хранение журнала действий: старые записи сворачиваются в дневные счётчики
+LOG_RETENTION_DAYS = 90                 # сколько дней хранить подробные записи
+LOG_RETENTION_INTERVAL = 6 * 60 * 60    # как часто запускать свёртку, секунд
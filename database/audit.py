@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from config.database import (
+    AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL,
+    LOG_RETENTION_DAYS, LOG_RETENTION_INTERVAL,
+)
+from database.engine import db
+
+logger = logging.getLogger(__name__)
+
+INSERT_LOG = """
+    INSERT INTO logs (user_id, username, action, details, timestamp)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+class AuditWriter:
+    """
+    Фоновая запись журнала действий.
+    Хендлеры кладут записи в ограниченную очередь без ожидания,
+    а фоновая задача пишет их пакетами, по одной транзакции на пакет.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize)
+        self._task = None
+        self._closed = False
+        # Метрики
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def submit(self, user_id: int, username: str, action: str, details: str = "") -> bool:
+        """Ставит запись в очередь. Возвращает False, если запись отброшена"""
+        # Время фиксируем в момент действия, в формате CURRENT_TIMESTAMP (UTC)
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        record = (user_id, username, action, details, timestamp)
+        if self._closed:
+            self._drop("журнал уже остановлен")
+            return False
+        try:
+            self._queue.put_nowait((time.monotonic(), record))
+        except asyncio.QueueFull:
+            self._drop("очередь переполнена")
+            return False
+        return True
+
+    def _drop(self, reason: str):
+        self.dropped += 1
+        # Не заваливаем лог при длительной перегрузке
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(f"Запись журнала отброшена ({reason}), всего отброшено: {self.dropped}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дописывает всё, что осталось в очереди, и останавливает запись"""
+        self._closed = True
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                break
+
+        # Дописываем то, что успели положить после сигнала остановки
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        lag = time.monotonic() - batch[0][0]
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        try:
+            await db.executemany(INSERT_LOG, [record for _, record in batch])
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Ошибка записи журнала ({len(batch)} записей): {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
+
+audit_writer = AuditWriter(AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL)
+
+async def run_log_retention():
+    """Периодически сворачивает старые записи журнала в дневные счётчики"""
+    # Импорт здесь, так как database.database сам импортирует audit_writer
+    from database.database import compact_logs
+
+    while True:
+        try:
+            removed = await compact_logs(LOG_RETENTION_DAYS)
+            if removed:
+                logger.info(f"Свёрнуто {removed} записей журнала старше {LOG_RETENTION_DAYS} дней")
+        except Exception as e:
+            logger.error(f"Ошибка свёртки журнала: {e}")
+        await asyncio.sleep(LOG_RETENTION_INTERVAL)
@@ -1,30 +1,34 @@
-# database/database.py
-import sqlite3
-import os
-from config.database import DB_PATH
+from datetime import datetime, timedelta, timezone
+from database.engine import db
+from database.audit import audit_writer
+
+ROLE_ADMIN = "admin"
+ROLE_USER = "user"
+
+# Кэш белого списка: user_id -> is_admin. Заполняется при старте и
+# обновляется в add_user, так что проверки доступа не ходят в БД.
+_acl_cache = {}
+
+def _executescript(conn, script):
+    with conn:
+        conn.executescript(script)
 
 def init_db():
-    if not os.path.exists(DB_PATH):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                user_id INTEGER UNIQUE,
-                is_admin BOOLEAN DEFAULT 0
-            )
-        """)
-        conn.commit()
-        conn.close()
+    db.call(_executescript, """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER UNIQUE,
+            is_admin BOOLEAN DEFAULT 0
+        );
+    """)
     
     # Инициализируем таблицу логов
     init_logs_table()
+    load_acl_cache()
 
 def init_logs_table():
     """Инициализирует таблицу логов"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+    db.call(_executescript, """
         CREATE TABLE IF NOT EXISTS logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER,
@@ -32,55 +36,174 @@ def init_logs_table():
             action TEXT,
             details TEXT,
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
+        );
+        CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_logs_user ON logs (user_id, id);
+        CREATE INDEX IF NOT EXISTS idx_logs_action ON logs (action, id);
+        CREATE INDEX IF NOT EXISTS idx_logs_user_action ON logs (user_id, action, id);
+
+        -- Дневные счётчики действий для записей старше срока хранения
+        CREATE TABLE IF NOT EXISTS logs_daily (
+            day TEXT,
+            action TEXT,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, action)
+        ) WITHOUT ROWID;
     """)
-    conn.commit()
-    conn.close()
+    init_logs_search()
+
+def _init_logs_search(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs_fts'"
+    ).fetchone()
+    with conn:
+        # Внешний контент: индекс хранит только токены, текст берётся из logs,
+        # а триггеры держат индекс в синхронизации с таблицей
+        conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+                action, details, content='logs', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+                INSERT INTO logs_fts (rowid, action, details)
+                VALUES (new.id, new.action, new.details);
+            END;
+            CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+                INSERT INTO logs_fts (logs_fts, rowid, action, details)
+                VALUES ('delete', old.id, old.action, old.details);
+            END;
+        """)
+        if not exists:
+            # Индексируем записи, сделанные до появления полнотекстового поиска
+            conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
+
+def init_logs_search():
+    """Инициализирует полнотекстовый индекс (FTS5) по журналу действий"""
+    db.call(_init_logs_search)
+
+def load_acl_cache():
+    """Загружает белый список пользователей в память"""
+    rows = db.call(lambda conn: conn.execute("SELECT user_id, is_admin FROM users").fetchall())
+    _acl_cache.clear()
+    _acl_cache.update({user_id: bool(admin) for user_id, admin in rows})
+
+def _add_user(conn, user_id, is_admin):
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO users (user_id, is_admin) VALUES (?, ?)", (user_id, is_admin))
+    # INSERT OR IGNORE не меняет существующую запись, поэтому кэш
+    # обновляем тем, что реально лежит в таблице
+    return conn.execute("SELECT is_admin FROM users WHERE user_id = ?", (user_id,)).fetchone()
 
-def add_user(user_id: int, is_admin: bool = False):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO users (user_id, is_admin) VALUES (?, ?)", (user_id, is_admin))
-    conn.commit()
-    conn.close()
+async def add_user(user_id: int, is_admin: bool = False):
+    result = await db.run(_add_user, user_id, is_admin)
+    _acl_cache[user_id] = bool(result[0])
+
+def get_role(user_id: int):
+    """Возвращает роль пользователя из кэша: ROLE_ADMIN, ROLE_USER или None"""
+    if user_id not in _acl_cache:
+        return None
+    return ROLE_ADMIN if _acl_cache[user_id] else ROLE_USER
 
 def is_user_allowed(user_id: int) -> bool:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
+    return user_id in _acl_cache
 
 def is_admin(user_id: int) -> bool:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT is_admin FROM users WHERE user_id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result and result[0] == 1
-
-def log_action(user_id: int, username: str, action: str, details: str = ""):
-    """Логирует действие пользователя"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO logs (user_id, username, action, details)
-        VALUES (?, ?, ?, ?)
-    """, (user_id, username, action, details))
-    conn.commit()
-    conn.close()
-
-def get_recent_logs(limit: int = 50):
+    return _acl_cache.get(user_id, False)
+
+async def log_action(user_id: int, username: str, action: str, details: str = ""):
+    """Логирует действие пользователя (запись уходит в фоновую очередь)"""
+    audit_writer.submit(user_id, username, action, details)
+
+async def get_recent_logs(limit: int = 50):
     """Получает последние логи"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+    # id растёт вместе со временем записи, а сортировка по первичному
+    # ключу не требует полного прохода по таблице
+    return await db.fetchall("""
         SELECT user_id, username, action, details, timestamp
         FROM logs
-        ORDER BY timestamp DESC
+        ORDER BY id DESC
         LIMIT ?
     """, (limit,))
-    logs = cursor.fetchall()
-    conn.close()
-    return logs
+
+async def get_logs_page(limit: int = 10, before_id: int = None, after_id: int = None,
+                        user_id: int = None, action: str = None):
+    """
+    Получает страницу логов (от новых к старым) по курсору:
+    before_id - записи старше указанной, after_id - новее указанной.
+    Стоимость запроса зависит только от размера страницы.
+    """
+    conditions = []
+    params = []
+    if user_id is not None:
+        conditions.append("user_id = ?")
+        params.append(user_id)
+    if action is not None:
+        conditions.append("action = ?")
+        params.append(action)
+
+    order = "DESC"
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+        order = "ASC"
+    elif before_id is not None:
+        conditions.append("id < ?")
+        params.append(before_id)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = await db.fetchall(f"""
+        SELECT id, user_id, username, action, details, timestamp
+        FROM logs
+        {where}
+        ORDER BY id {order}
+        LIMIT ?
+    """, (*params, limit))
+    if order == "ASC":
+        rows.reverse()
+    return rows
+
+def _compact_logs(conn, cutoff):
+    with conn:
+        conn.execute("""
+            INSERT INTO logs_daily (day, action, count)
+            SELECT date(timestamp), action, COUNT(*)
+            FROM logs
+            WHERE timestamp < ?
+            GROUP BY date(timestamp), action
+            ON CONFLICT (day, action) DO UPDATE SET count = count + excluded.count
+        """, (cutoff,))
+        return conn.execute("DELETE FROM logs WHERE timestamp < ?", (cutoff,)).rowcount
+
+async def compact_logs(retention_days: int) -> int:
+    """Сворачивает записи старше retention_days в дневные счётчики. Возвращает число удалённых записей"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    cutoff = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    return await db.run(_compact_logs, cutoff)
+
+def _fts_query(query: str) -> str:
+    """
+    Превращает пользовательский запрос в запрос FTS5: каждое слово
+    ищется как фраза (пути и имена сервисов не ломают синтаксис),
+    слово с * на конце ищется по префиксу.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+async def search_logs(query: str, limit: int = 10, offset: int = 0):
+    """Полнотекстовый поиск по журналу, результаты отсортированы по релевантности (bm25)"""
+    match = _fts_query(query)
+    if not match:
+        return []
+    return await db.fetchall("""
+        SELECT l.id, l.user_id, l.username, l.action,
+               snippet(logs_fts, 1, '«', '»', '…', 16), l.timestamp
+        FROM logs_fts
+        JOIN logs l ON l.id = logs_fts.rowid
+        WHERE logs_fts MATCH ?
+        ORDER BY bm25(logs_fts)
+        LIMIT ? OFFSET ?
+    """, (match, limit, offset))
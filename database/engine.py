@@ -0,0 +1,83 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from config.database import DB_PATH
+
+# WAL позволяет читать во время записи, а synchronous=NORMAL в режиме WAL
+# делает fsync только на чекпоинтах, а не на каждый commit
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA busy_timeout=5000",
+)
+
+def _execute(conn, sql, params):
+    with conn:
+        return conn.execute(sql, params).rowcount
+
+def _executemany(conn, sql, seq_of_params):
+    with conn:
+        return conn.executemany(sql, seq_of_params).rowcount
+
+def _fetchone(conn, sql, params):
+    return conn.execute(sql, params).fetchone()
+
+def _fetchall(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+class Database:
+    """
+    Долгоживущее соединение с SQLite.
+    Все запросы выполняются в одном выделенном потоке, поэтому
+    соединение не делится между потоками и не блокирует event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    def _connection(self):
+        # Вызывается только из потока БД
+        if self._conn is None:
+            # cached_statements - кэш подготовленных выражений sqlite3
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+            for pragma in PRAGMAS:
+                self._conn.execute(pragma)
+        return self._conn
+
+    def _call(self, fn, *args):
+        return fn(self._connection(), *args)
+
+    def call(self, fn, *args):
+        """Синхронно выполняет fn(conn, *args) в потоке БД (для старта и скриптов)"""
+        return self._executor.submit(self._call, fn, *args).result()
+
+    async def run(self, fn, *args):
+        """Выполняет fn(conn, *args) в потоке БД, не блокируя event loop"""
+        return await asyncio.wrap_future(self._executor.submit(self._call, fn, *args))
+
+    async def execute(self, sql: str, params=()):
+        return await self.run(_execute, sql, params)
+
+    async def executemany(self, sql: str, seq_of_params):
+        return await self.run(_executemany, sql, seq_of_params)
+
+    async def fetchone(self, sql: str, params=()):
+        return await self.run(_fetchone, sql, params)
+
+    async def fetchall(self, sql: str, params=()):
+        return await self.run(_fetchall, sql, params)
+
+    def close(self):
+        """Закрывает соединение и останавливает поток БД"""
+        def _close(conn):
+            conn.close()
+            self._conn = None
+        if self._conn is not None:
+            self.call(_close)
+        self._executor.shutdown(wait=True)
+
+db = Database(DB_PATH)
@@ -1,43 +1,174 @@
 # handlers/admin.py
-from aiogram import Router, types
-from database.database import add_user, is_admin, log_action
-import subprocess
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from handlers.dispatch import CommandRouter
+from handlers.pager import code_block, escape_v2, page_view, tail_text
+from database.database import ROLE_ADMIN, add_user, log_action
+from database.audit import audit_writer
+from utils.offload import offload
+from utils.cache import response_cache
+from utils.jobs import STATUS_LABELS, jobs
+from utils.outbox import outbox
+from utils.output_store import PAGE_SIZE, output_store
+from config.config import EXEC_EDIT_INTERVAL
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text.startswith("/auth"))
-async def auth_handler(message: types.Message):
-    if not is_admin(message.from_user.id):
+@router.message("/auth")
+async def auth_handler(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
         await message.answer("❌ Только администратор может добавлять пользователей.")
         return
 
     try:
         user_id = int(message.text.split()[1])
-        add_user(user_id, is_admin=False)
-        log_action(message.from_user.id, message.from_user.username or "Unknown", "/auth", f"Добавлен пользователь {user_id}")
+        await add_user(user_id, is_admin=False)
+        await log_action(message.from_user.id, message.from_user.username or "Unknown", "/auth", f"Добавлен пользователь {user_id}")
         await message.answer(f"✅ Пользователь {user_id} добавлен в белый список.")
     except (IndexError, ValueError):
         await message.answer("❌ Использование: /auth <user_id>")
 
-@router.message(lambda message: message.text.startswith("/exec"))
-async def exec_command(message: types.Message):
-    if not is_admin(message.from_user.id):
+# Если вывода нет, сообщение задачи всё равно обновляется раз в столько секунд (время выполнения)
+IDLE_REFRESH = 30
+
+def _job_title(job) -> str:
+    title = f"⚙️ Задача {job.id}: {STATUS_LABELS[job.status]}, {job.elapsed:.0f} с"
+    if job.returncode:
+        title += f", код {job.returncode}"
+    return title
+
+def _job_view(job):
+    """Текст MarkdownV2 и клавиатура сообщения задачи"""
+    if not job.active and not job.stored.evicted:
+        # Готовый вывод целиком - постранично, с последней страницы
+        job.stored.title = _job_title(job)
+        return page_view(job.stored, job.stored.page_count)
+
+    # Пока задача выполняется - хвост вывода
+    command = job.command if len(job.command) <= 300 else job.command[:297] + "..."
+    body = f"$ {command}\n" + tail_text(job.output, PAGE_SIZE - len(command))
+
+    builder = InlineKeyboardBuilder()
+    if job.active:
+        builder.button(text="⛔ Отменить", callback_data=f"job_cancel:{job.id}")
+    return f"{escape_v2(_job_title(job))}\n{code_block(body)}", builder.as_markup()
+
+async def _follow_job(job, message: types.Message):
+    """Обновляет сообщение задачи по мере вывода, не чаще раза в EXEC_EDIT_INTERVAL"""
+    shown = None
+    while True:
+        if job.active and not await job.wait_done(EXEC_EDIT_INTERVAL):
+            await job.wait_changed(IDLE_REFRESH)
+        text, markup = _job_view(job)
+        if text != shown:
+            try:
+                await message.edit_text(text, parse_mode="MarkdownV2", reply_markup=markup)
+            except TelegramBadRequest as e:
+                # Сообщение удалено - задача продолжается, она видна в /jobs
+                if "message is not modified" not in str(e):
+                    return
+            shown = text
+        if not job.active:
+            return
+
+@router.message("/exec")
+async def exec_command(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
         await message.answer("❌ Только администратор может выполнять команды.")
         return
 
-    cmd = message.text[len("/exec "):].strip()
+    cmd = message.text.partition(" ")[2].strip()
     if not cmd:
         await message.answer("❌ Укажите команду. Пример: `/exec ls -la`", parse_mode="Markdown")
         return
 
-    log_action(message.from_user.id, message.from_user.username or "Unknown", "/exec", f"Выполнена команда: {cmd}")
-
     try:
-        output = subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT)
-        if len(output) > 4000:
-            output = output[:4000] + "\n... (вывод обрезан)"
-        await message.answer(f"✅ Результат выполнения:\n```\n{output}\n```", parse_mode="MarkdownV2")
-    except subprocess.CalledProcessError as e:
-        await message.answer(f"❌ Ошибка выполнения:\n```\n{e.output[:4000] if e.output else 'Нет вывода'}\n```", parse_mode="MarkdownV2")
-    except Exception as e:
-        await message.answer(f"❌ Неизвестная ошибка: {e}")
+        job = jobs.start(cmd, message.from_user.id)
+    except ValueError as e:
+        await message.answer(f"❌ Нельзя запустить задачу: {e}. Список - /jobs, отмена - /cancel <id>.")
+        return
+    await log_action(message.from_user.id, message.from_user.username or "Unknown", "/exec", f"Задача {job.id}: {cmd}")
+
+    # Вывод идёт в одно сообщение, которое обновляется, пока задача выполняется
+    text, markup = _job_view(job)
+    status = await message.answer(text, parse_mode="MarkdownV2", reply_markup=markup)
+    await _follow_job(job, status)
+
+@router.message("/jobs")
+async def list_jobs(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может выполнять команды.")
+        return
+
+    recent = jobs.recent()
+    if not recent:
+        await message.answer("📭 Задач нет.")
+        return
+    text = "⚙️ Задачи /exec:\n\n"
+    for job in recent:
+        command = job.command if len(job.command) <= 60 else job.command[:57] + "..."
+        text += f"{job.id}. {STATUS_LABELS[job.status]}, {job.elapsed:.0f} с: {command}\n"
+    text += "\nОтмена: /cancel <id>"
+    await message.answer(text)
+
+async def _cancel_job(job_id: int, user: types.User) -> str:
+    if not jobs.cancel(job_id):
+        return f"❌ Задача {job_id} не найдена или уже завершена."
+    await log_action(user.id, user.username or "Unknown", "/cancel", f"Задача {job_id}")
+    return f"⛔ Задача {job_id} отменена."
+
+@router.message("/cancel")
+async def cancel_job(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может выполнять команды.")
+        return
+
+    args = message.text.split()[1:]
+    if len(args) != 1 or not args[0].isdigit():
+        await message.answer("❌ Использование: /cancel <id>")
+        return
+    await message.answer(await _cancel_job(int(args[0]), message.from_user))
+
+@router.callback_query(prefix="job_cancel:")
+async def cancel_job_callback(callback: types.CallbackQuery, role: str | None):
+    if role != ROLE_ADMIN:
+        await callback.answer("❌ Только администратор может выполнять команды.", show_alert=True)
+        return
+    # Итоговый вид сообщения выставит _follow_job
+    await callback.answer(await _cancel_job(int(callback.data.split(":", 1)[1]), callback.from_user))
+
+@router.message("/botstats")
+async def bot_stats(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может смотреть статистику бота.")
+        return
+
+    audit = audit_writer.stats()
+    sends = outbox.stats()
+    jobs = offload.stats()
+    cache = response_cache.stats()
+    outputs = output_store.stats()
+    text = (
+        "📈 *Статистика бота:*\n\n"
+        "📝 *Журнал действий:*\n"
+        f"🔹 В очереди: {audit['queued']}\n"
+        f"🔹 Записано: {audit['written']} (пакетов: {audit['batches']})\n"
+        f"🔹 Отброшено: {audit['dropped']}, ошибок записи: {audit['failed']}\n"
+        f"🔹 Задержка записи: {audit['last_lag']:.2f} с (макс. {audit['max_lag']:.2f} с)\n\n"
+        "📤 *Исходящие сообщения:*\n"
+        f"🔹 В очереди: {sends['queued']} (макс. {sends['max_depth']})\n"
+        f"🔹 Отправлено: {sends['sent']}, ошибок: {sends['failed']}\n"
+        f"🔹 Объединено правок: {sends['coalesced']}, повторов после 429: {sends['retried']}\n"
+        f"🔹 Задержка: {sends['avg_latency']:.2f} с в среднем, p95 {sends['p95_latency']:.2f} с\n\n"
+        "🗃 *Кэш ответов:*\n"
+        f"🔹 Попаданий: {cache['hits']}, вычислений: {cache['misses']}, ждали общее: {cache['shared']}\n"
+        f"🔹 Записей: {cache['entries']}, сбросов: {cache['invalidations']}\n\n"
+        "📄 *Сохранённые выводы:*\n"
+        f"🔹 Выводов: {outputs['outputs']}, {outputs['size'] / 1048576:.1f} из {outputs['max_bytes'] / 1048576:.0f} МБ сжатыми\n"
+        f"🔹 Вытеснено: {outputs['evicted']}, истекло: {outputs['expired']}\n\n"
+        "⚙️ *Фоновые задачи (выполняется/лимит, ждут, всего, таймаутов):*\n"
+    )
+    for name, job in jobs.items():
+        text += f"🔹 {name}: {job['running']}/{job['limit']}, {job['waiting']}, {job['completed']}, {job['timeouts']}\n"
+    await message.answer(text, parse_mode="Markdown")
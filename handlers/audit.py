@@ -0,0 +1,174 @@
+import hashlib
+from collections import OrderedDict
+from aiogram import types
+from handlers.dispatch import CommandRouter
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from database.database import ROLE_ADMIN, get_logs_page, search_logs
+
+router = CommandRouter()
+
+AUDIT_PAGE_SIZE = 10
+# Ограничение callback_data в Telegram - 64 байта
+MAX_FILTER_LENGTH = 24
+
+# Поисковые запросы не помещаются в callback_data, поэтому кнопки
+# ссылаются на них по короткому ключу. Храним только последние запросы.
+MAX_SEARCH_QUERIES = 256
+_search_queries = OrderedDict()
+
+def _parse_filters(args):
+    """Разбирает фильтры вида user=<id> action=<действие>"""
+    user_id = None
+    action = None
+    for arg in args:
+        key, _, value = arg.partition("=")
+        if key == "user" and value:
+            user_id = int(value)
+        elif key == "action" and value:
+            action = value
+        else:
+            raise ValueError(arg)
+    if action and len(action.encode()) > MAX_FILTER_LENGTH:
+        raise ValueError(action)
+    return user_id, action
+
+def _format_rows(rows):
+    text = ""
+    for log_id, log_user_id, username, log_action, details, timestamp in rows:
+        if details and len(details) > 200:
+            details = details[:200] + "..."
+        text += f"#{log_id} {timestamp}\n👤 {username} ({log_user_id}) — {log_action}\n"
+        if details:
+            text += f"{details}\n"
+        text += "\n"
+    return text
+
+async def _render_page(user_id=None, action=None, before_id=None, after_id=None):
+    rows = await get_logs_page(AUDIT_PAGE_SIZE + 1, before_id=before_id, after_id=after_id,
+                               user_id=user_id, action=action)
+    # Лишняя запись показывает, есть ли следующая страница в направлении запроса
+    has_more = len(rows) > AUDIT_PAGE_SIZE
+    if has_more:
+        rows = rows[1:] if after_id is not None else rows[:-1]
+
+    filters = []
+    if user_id is not None:
+        filters.append(f"user={user_id}")
+    if action is not None:
+        filters.append(f"action={action}")
+
+    text = "📜 Журнал действий"
+    if filters:
+        text += f" ({', '.join(filters)})"
+    text += ":\n\n"
+
+    if not rows:
+        text += "📭 Записей нет."
+        return text, None
+
+    text += _format_rows(rows)
+
+    # Курсоры - id крайних записей страницы, фильтры передаются в callback_data
+    suffix = f"{user_id if user_id is not None else ''}:{action or ''}"
+    newer = has_more if after_id is not None else before_id is not None
+    older = has_more if after_id is None else True
+
+    builder = InlineKeyboardBuilder()
+    if newer:
+        builder.button(text="◀️ Новее", callback_data=f"audit:a:{rows[0][0]}:{suffix}")
+    if older:
+        builder.button(text="Старее ▶️", callback_data=f"audit:b:{rows[-1][0]}:{suffix}")
+    builder.button(text="❌ Закрыть", callback_data="close")
+    builder.adjust(2)
+    return text, builder.as_markup()
+
+@router.message("/audit")
+async def audit_handler(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может просматривать журнал.")
+        return
+
+    try:
+        user_id, action = _parse_filters(message.text.split()[1:])
+    except ValueError:
+        await message.answer("❌ Использование: `/audit [user=<id>] [action=<действие>]`", parse_mode="Markdown")
+        return
+
+    text, markup = await _render_page(user_id, action)
+    await message.answer(text, reply_markup=markup)
+
+@router.callback_query(prefix="audit:")
+async def audit_page_callback(callback: types.CallbackQuery, role: str | None):
+    if role != ROLE_ADMIN:
+        await callback.answer("❌ Доступ запрещён", show_alert=True)
+        return
+
+    _, direction, cursor, user_id, action = callback.data.split(":", 4)
+    user_id = int(user_id) if user_id else None
+    action = action or None
+    if direction == "a":
+        text, markup = await _render_page(user_id, action, after_id=int(cursor))
+    else:
+        text, markup = await _render_page(user_id, action, before_id=int(cursor))
+
+    await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
+
+def _remember_query(query: str) -> str:
+    key = hashlib.sha1(query.encode()).hexdigest()[:12]
+    _search_queries[key] = query
+    _search_queries.move_to_end(key)
+    while len(_search_queries) > MAX_SEARCH_QUERIES:
+        _search_queries.popitem(last=False)
+    return key
+
+async def _render_search(query: str, key: str, page: int):
+    rows = await search_logs(query, AUDIT_PAGE_SIZE + 1, page * AUDIT_PAGE_SIZE)
+    has_more = len(rows) > AUDIT_PAGE_SIZE
+    rows = rows[:AUDIT_PAGE_SIZE]
+
+    text = f"🔎 Поиск по журналу: {query}\nСтраница {page + 1}\n\n"
+    if not rows:
+        text += "📭 Ничего не найдено."
+    else:
+        text += _format_rows(rows)
+
+    builder = InlineKeyboardBuilder()
+    if page > 0:
+        builder.button(text="◀️ Назад", callback_data=f"afts:{key}:{page - 1}")
+    if has_more:
+        builder.button(text="Далее ▶️", callback_data=f"afts:{key}:{page + 1}")
+    builder.button(text="❌ Закрыть", callback_data="close")
+    builder.adjust(2)
+    return text, builder.as_markup()
+
+@router.message("/auditsearch")
+async def audit_search_handler(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может просматривать журнал.")
+        return
+
+    query = message.text[len("/auditsearch"):].strip()
+    if not query:
+        await message.answer("❌ Использование: `/auditsearch <запрос>`\nПример: `/auditsearch nginx`", parse_mode="Markdown")
+        return
+
+    key = _remember_query(query)
+    text, markup = await _render_search(query, key, 0)
+    await message.answer(text, reply_markup=markup)
+
+@router.callback_query(prefix="afts:")
+async def audit_search_page_callback(callback: types.CallbackQuery, role: str | None):
+    if role != ROLE_ADMIN:
+        await callback.answer("❌ Доступ запрещён", show_alert=True)
+        return
+
+    _, key, page = callback.data.split(":")
+    query = _search_queries.get(key)
+    if query is None:
+        await callback.answer("⌛ Результаты поиска устарели, повторите запрос.", show_alert=True)
+        return
+
+    text, markup = await _render_search(query, key, int(page))
+    await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
@@ -2,23 +2,25 @@
 import asyncio
 import logging
 import os
-from aiogram import Router, types
+from aiogram import types
+from handlers.dispatch import CommandRouter
 from aiogram.types import BufferedInputFile
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from config.config import EMAIL_CONFIG, YANDEX_DISK_TOKEN
 from utils.backup import create_backup, list_backups, send_backup_via_email
-from utils.security import is_admin
+from utils.offload import offload
+from database.database import ROLE_ADMIN
 
-router = Router()
+router = CommandRouter()
 logger = logging.getLogger(__name__)
 
 # Константа для максимального размера файла для отправки в Telegram
 TELEGRAM_MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB
 
-@router.message(lambda message: message.text == "/backup")
-async def backup_handler(message: types.Message):
+@router.message("/backup")
+async def backup_handler(message: types.Message, role: str | None):
     """Обработчик команды /backup - показывает меню управления бэкапами."""
-    if not is_admin(message.from_user.id):
+    if role != ROLE_ADMIN:
         await message.answer("❌ Только администратор может создавать бэкапы.")
         return
 
@@ -31,7 +33,7 @@ async def backup_handler(message: types.Message):
 
     await message.answer("🔧 Управление бэкапами:", reply_markup=builder.as_markup())
 
-@router.callback_query(lambda c: c.data == "create_backup")
+@router.callback_query("create_backup")
 async def create_backup_callback(callback: types.CallbackQuery):
     """
     Обработчик callback-запроса для создания бэкапа.
@@ -48,8 +50,8 @@ async def _create_backup_background_task(callback: types.CallbackQuery):
     Выполняется асинхронно.
     """
     try:
-        # 1. Создаем бэкап
-        backup_path, error = create_backup()
+        # 1. Создаем бэкап: сжатие - в пуле процессов, не в event loop
+        backup_path, error = await offload.run_cpu(create_backup, user_id=callback.from_user.id)
         
         if error:
             await callback.message.edit_text(f"❌ Ошибка создания бэкапа: {error}")
@@ -74,7 +76,7 @@ async def _create_backup_background_task(callback: types.CallbackQuery):
             success, msg = await _send_to_telegram(callback, backup_path, filename, size_mb)
         else:
             # Отправляем на почту
-            success, msg = await _send_to_email(backup_path, filename, size_mb)
+            success, msg = await _send_to_email(backup_path, filename, size_mb, callback.from_user.id)
         
         # 5. Обновляем сообщение с результатом доставки
         response_text += f"\n{msg}"
@@ -101,14 +103,14 @@ async def _send_to_telegram(callback: types.CallbackQuery, file_path: str, filen
     Возвращает кортеж (успех: bool, сообщение: str).
     """
     try:
-        with open(file_path, 'rb') as file:
-            input_file = BufferedInputFile(file.read(), filename=filename)
-            await callback.message.bot.send_document(
-                chat_id=callback.message.chat.id,
-                document=input_file,
-                caption=f"📄 Бэкап создан: `{filename}`\n📦 Размер: {size_mb} MB",
-                parse_mode="Markdown"
-            )
+        data = await offload.run("io", _read_file, file_path, user_id=callback.from_user.id)
+        input_file = BufferedInputFile(data, filename=filename)
+        await callback.message.bot.send_document(
+            chat_id=callback.message.chat.id,
+            document=input_file,
+            caption=f"📄 Бэкап создан: `{filename}`\n📦 Размер: {size_mb} MB",
+            parse_mode="Markdown"
+        )
         logger.info(f"Бэкап {filename} успешно отправлен в Telegram.")
         return True, "📤 Отправлен в Telegram."
     except Exception as e:
@@ -116,7 +118,11 @@ async def _send_to_telegram(callback: types.CallbackQuery, file_path: str, filen
         return False, f"⚠️ Не удалось отправить в Telegram: {e}"
 
 
-async def _send_to_email(file_path: str, filename: str, size_mb: float) -> tuple[bool, str]:
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+async def _send_to_email(file_path: str, filename: str, size_mb: float, user_id: int = None) -> tuple[bool, str]:
     """Отправляет файл бэкапа на почту или ссылку на него."""
     from utils.backup import upload_to_yandex_disk, send_backup_link_via_email # Импортируем новые функции
 
@@ -130,11 +136,13 @@ async def _send_to_email(file_path: str, filename: str, size_mb: float) -> tuple
     # Попробуем сначала загрузить на Яндекс.Диск
     if YANDEX_DISK_TOKEN:
         logger.info("Попытка загрузки бэкапа на Яндекс.Диск...")
-        success, result_or_error = upload_to_yandex_disk(file_path, YANDEX_DISK_TOKEN)
+        success, result_or_error = await offload.run("io", upload_to_yandex_disk, file_path, YANDEX_DISK_TOKEN, user_id=user_id)
         if success:
             logger.info(f"Бэкап загружен на Яндекс.Диск: {result_or_error}")
             # Отправляем ссылку по почте
-            link_success, link_msg = send_backup_link_via_email(file_path, recipient_email, result_or_error)
+            link_success, link_msg = await offload.run(
+                "io", send_backup_link_via_email, file_path, recipient_email, result_or_error, user_id=user_id
+            )
             if link_success:
                 return True, "📤 Ссылка на бэкап отправлена на почту (Яндекс.Диск)."
             else:
@@ -148,10 +156,10 @@ async def _send_to_email(file_path: str, filename: str, size_mb: float) -> tuple
         logger.warning(msg)
         return False, msg
 
-@router.callback_query(lambda c: c.data == "list_backups")
+@router.callback_query("list_backups")
 async def list_backups_callback(callback: types.CallbackQuery):
     """Обработчик callback-запроса для отображения списка бэкапов."""
-    backups, error = list_backups()
+    backups, error = await offload.run("io", list_backups, user_id=callback.from_user.id)
     
     if error:
         await callback.message.edit_text(f"❌ Ошибка получения списка бэкапов: {error}")
@@ -180,16 +188,16 @@ async def list_backups_callback(callback: types.CallbackQuery):
     await callback.message.edit_text(response, parse_mode="MarkdownV2", reply_markup=builder.as_markup())
     await callback.answer()
 
-@router.callback_query(lambda c: c.data == "close_backup")
+@router.callback_query("close_backup")
 async def close_backup_callback(callback: types.CallbackQuery):
     """Обработчик callback-запроса для закрытия меню бэкапов."""
     await callback.message.delete()
     await callback.answer()
 
-@router.callback_query(lambda c: c.data == "admin_panel")
-async def admin_panel_redirect(callback: types.CallbackQuery):
+@router.callback_query("admin_panel")
+async def admin_panel_redirect(callback: types.CallbackQuery, role: str | None):
     """Обработчик callback-запроса для возврата в админ-панель."""
-    if not is_admin(callback.from_user.id):
+    if role != ROLE_ADMIN:
         await callback.answer("❌ Доступ запрещён", show_alert=True)
         return
     
@@ -0,0 +1,101 @@
+from aiogram import Router, types
+from aiogram.dispatcher.event.handler import CallableObject
+
+class PrefixTrie:
+    """Префиксное дерево по символам: поиск самого длинного префикса за O(длина строки)"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix: str, value):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if None in node:
+            raise ValueError(f"префикс {prefix!r} уже зарегистрирован")
+        # Ключ None - значение узла, символы строки им быть не могут
+        node[None] = value
+
+    def longest(self, text: str):
+        node = self.root
+        found = node.get(None)
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+class CommandRouter:
+    """
+    Хендлеры модуля: команды и callback-данные, без фильтров-лямбд.
+    Регистрация в стиле aiogram: `@router.message("/status")`,
+    `@router.callback_query("close")`, `@router.callback_query(prefix="kill_")`.
+    Роутер для Dispatcher собирает build_router из всех модулей.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.callbacks = []
+        self.prefixes = []
+
+    def message(self, *commands: str):
+        def decorator(handler):
+            self.commands.extend((command, handler) for command in commands)
+            return handler
+        return decorator
+
+    def callback_query(self, *data: str, prefix=()):
+        """Точные значения data и/или префикс (строка или кортеж, как у startswith)"""
+        prefixes = (prefix,) if isinstance(prefix, str) else prefix
+        def decorator(handler):
+            self.callbacks.extend((value, handler) for value in data)
+            self.prefixes.extend((value, handler) for value in prefixes)
+            return handler
+        return decorator
+
+def parse_command(text: str):
+    """`/cmd@bot аргументы` -> `/cmd`; None, если это не команда"""
+    if not text or text[0] != "/":
+        return None
+    command = text.split(maxsplit=1)[0]
+    return command.split("@", 1)[0]
+
+def build_router(*routers: CommandRouter) -> Router:
+    """
+    Один aiogram-роутер на все модули: команда выделяется один раз
+    и ищется в словаре, callback - в словаре точных значений, затем
+    в префиксном дереве. Повторная регистрация - ошибка при запуске.
+    """
+    commands = {}
+    callbacks = {}
+    prefixes = PrefixTrie()
+    for module in routers:
+        for command, handler in module.commands:
+            if command in commands:
+                raise ValueError(f"команда {command} зарегистрирована дважды")
+            commands[command] = CallableObject(handler)
+        for data, handler in module.callbacks:
+            if data in callbacks:
+                raise ValueError(f"callback {data} зарегистрирован дважды")
+            callbacks[data] = CallableObject(handler)
+        for prefix, handler in module.prefixes:
+            prefixes.add(prefix, CallableObject(handler))
+
+    # Фильтры возвращают найденный хендлер, aiogram передаёт его аргументом
+    def match_message(message: types.Message):
+        handler = commands.get(parse_command(message.text))
+        return {"target": handler} if handler else False
+
+    def match_callback(callback: types.CallbackQuery):
+        data = callback.data or ""
+        handler = callbacks.get(data) or prefixes.longest(data)
+        return {"target": handler} if handler else False
+
+    async def dispatch(event, target: CallableObject, **kwargs):
+        return await target.call(event, **kwargs)
+
+    router = Router(name="commands")
+    router.message.register(dispatch, match_message)
+    router.callback_query.register(dispatch, match_callback)
+    return router
@@ -1,52 +1,174 @@
 # handlers/monitoring.py
-from aiogram import Router, types
-from utils.system_monitor import get_system_status, get_logs
-from database.database import is_user_allowed, log_action
+import asyncio
+import time
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from handlers.dispatch import CommandRouter
+from handlers.pager import code_block, escape_v2, page_view, tail_text
+from utils.system_monitor import get_system_status, format_system_status, get_logs
+from utils.timeseries import METRICS, metrics, parse_duration, render_trend
+from utils.rrd import archive
+from utils.output_store import output_store
+from utils.logfollow import STOP_REASONS, follows
+from config.config import LOG_FOLLOW_EDIT_INTERVAL
+from database.database import log_action
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text == "/status")
-async def status_handler(message: types.Message):
-    if not is_user_allowed(message.from_user.id):
+# Сколько строк журнала можно запросить в /logs: вывод листается по страницам
+MAX_LOG_LINES = 5000
+
+@router.message("/status")
+async def status_handler(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ Доступ запрещён.")
         return
 
-    log_action(message.from_user.id, message.from_user.username or "Unknown", "/status", "Просмотр статуса сервера")
+    await log_action(message.from_user.id, message.from_user.username or "Unknown", "/status", "Просмотр статуса сервера")
 
     status = get_system_status()
-    response = (
-        f"💻 *Статус сервера:*\n"
-        f"🔹 CPU: {status['cpu']}%\n"
-        f"🔹 RAM: {status['memory']}\n"
-        f"🔹 Диск: {status['disk']}\n"
-        f"🔹 Аптайм: {status['uptime']}\n"
-        f"🔹 IP: `{status['ip']}`"
-    )
+    response = format_system_status(status)
     await message.answer(response, parse_mode="Markdown")
 
-@router.message(lambda message: message.text.startswith("/logs"))
-async def logs_handler(message: types.Message):
-    if not is_user_allowed(message.from_user.id):
+@router.message("/logs")
+async def logs_handler(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ Доступ запрещён.")
         return
 
-    log_action(message.from_user.id, message.from_user.username or "Unknown", "/logs", f"Просмотр логов")
+    args = message.text.split()[1:]
+    if args and args[0] == "follow":
+        await _start_follow(message, args[1:])
+        return
+
+    await log_action(message.from_user.id, message.from_user.username or "Unknown", "/logs", f"Просмотр логов")
 
     try:
         lines = int(message.text.split()[1]) if len(message.text.split()) > 1 else 50
         # Ограничиваем количество строк для безопасности
-        lines = min(lines, 200)
+        lines = min(lines, MAX_LOG_LINES)
     except ValueError:
         lines = 50
 
-    logs = get_logs(lines)
-    
-    # Обрезаем слишком длинные сообщения
-    if len(logs) > 4000:
-        logs = logs[:4000] + "\n... (вывод обрезан)"
-    
+    logs = await get_logs(lines, user_id=message.from_user.id)
+
+    # Логи целиком сохраняются сжатыми и листаются кнопками без повторного запроса
+    output = output_store.put(f"📄 Последние {lines} строк логов", logs)
+    text, markup = page_view(output, 1)
+    await message.answer(text, parse_mode="MarkdownV2", reply_markup=markup)
+
+def _follow_view(follow):
+    """Текст MarkdownV2 и клавиатура сообщения /logs follow"""
+    if follow.active:
+        title = f"{follow.title}: ▶️ идёт, строк {follow.matched}"
+    else:
+        title = f"{follow.title}: ⏹ {STOP_REASONS[follow.status]}, строк {follow.matched}"
+        if follow.error:
+            title += f" ({follow.error})"
+        if not follow.stored.evicted:
+            # Всё, что пришло за время слежения, - постранично
+            follow.stored.title = title
+            return page_view(follow.stored, follow.stored.page_count)
+
+    builder = InlineKeyboardBuilder()
+    if follow.active:
+        builder.button(text="⏹ Остановить", callback_data=f"logstop:{follow.id}")
+    body = tail_text(follow.output) or f"(ожидание новых строк из {follow.source})"
+    return f"{escape_v2(title)}\n{code_block(body)}", builder.as_markup()
+
+async def _follow_logs(follow, message: types.Message):
+    """Дописывает новые строки в сообщение пачками, не чаще раза в LOG_FOLLOW_EDIT_INTERVAL"""
+    shown = None
+    while True:
+        await follow.wait_changed(None)
+        text, markup = _follow_view(follow)
+        if text != shown:
+            try:
+                await message.edit_text(text, parse_mode="MarkdownV2", reply_markup=markup)
+            except TelegramBadRequest as e:
+                # Сообщение удалено - следить больше незачем
+                if "message is not modified" not in str(e):
+                    follows.stop(follow.id)
+                    return
+            shown = text
+        if not follow.active:
+            return
+        # Строки, пришедшие за это время, попадут в одну правку
+        await asyncio.sleep(LOG_FOLLOW_EDIT_INTERVAL)
+
+async def _start_follow(message: types.Message, args: list):
+    # `/logs follow [unit|*] [шаблон...]`
+    unit = args[0] if args and args[0] != "*" else None
+    pattern = " ".join(args[1:]) or None
+    try:
+        follow = follows.start(message.chat.id, unit, pattern)
+    except OSError as e:
+        await message.answer(f"❌ Не удалось следить за журналом: {e}")
+        return
+    await log_action(message.from_user.id, message.from_user.username or "Unknown", "/logs", f"Слежение за журналом: {' '.join(args)}")
+
+    text, markup = _follow_view(follow)
+    status = await message.answer(text, parse_mode="MarkdownV2", reply_markup=markup)
+    await _follow_logs(follow, status)
+
+@router.callback_query(prefix="logstop:")
+async def stop_follow_callback(callback: types.CallbackQuery, role: str | None):
+    if role is None:
+        await callback.answer("❌ Доступ запрещён.", show_alert=True)
+        return
+    # Итоговый вид сообщения выставит _follow_logs
+    if follows.stop(int(callback.data.split(":", 1)[1])):
+        await callback.answer("⏹ Слежение остановлено.")
+    else:
+        await callback.answer("Слежение уже закончилось.")
+
+def _parse_metric_args(text: str, default_seconds: int):
+    """Разбирает аргументы `<метрика> [период]`, возвращает (метрика, секунды) или None"""
+    args = text.split()[1:]
+    name = args[0] if args else "cpu"
     try:
-        await message.answer(f"📄 Последние {lines} строк логов:\n```\n{logs}\n```", parse_mode="MarkdownV2")
-    except:
-        # Если MarkdownV2 не работает, пробуем обычный текст
-        await message.answer(f"📄 Последние {lines} строк логов:\n```\n{logs}\n```", parse_mode="Markdown")
+        seconds = parse_duration(args[1]) if len(args) > 1 else default_seconds
+    except ValueError:
+        return None
+    if name not in METRICS or not seconds:
+        return None
+    return name, seconds
+
+async def _answer_metric_usage(message: types.Message, command: str):
+    await message.answer(
+        f"❌ Использование: `{command} <метрика> [период]`\n"
+        f"Метрики: `{', '.join(METRICS)}`\nПериод: `90s`, `30m`, `6h`, `2d`",
+        parse_mode="Markdown"
+    )
+
+@router.message("/trend")
+async def trend_handler(message: types.Message, role: str | None):
+    if role is None:
+        await message.answer("❌ Доступ запрещён.")
+        return
+
+    parsed = _parse_metric_args(message.text, 3600)
+    if parsed is None:
+        await _answer_metric_usage(message, "/trend")
+        return
+
+    name, seconds = parsed
+    step, points = metrics.query(name, seconds, time.time())
+    await message.answer(render_trend(name, seconds, step, points))
+
+@router.message("/history")
+async def history_handler(message: types.Message, role: str | None):
+    if role is None:
+        await message.answer("❌ Доступ запрещён.")
+        return
+
+    parsed = _parse_metric_args(message.text, 86400)
+    if parsed is None:
+        await _answer_metric_usage(message, "/history")
+        return
+
+    # Читаем прямо из архива на диске: история переживает перезапуски бота
+    name, seconds = parsed
+    step, points = archive.query(name, seconds, time.time())
+    await message.answer("🗄 Архив метрик\n" + render_trend(name, seconds, step, points))
@@ -1,187 +1,178 @@
 # handlers/network.py
-from aiogram import Router, types
-from utils.security import is_user_allowed
-import subprocess
-import os
+from aiogram import types
+from handlers.dispatch import CommandRouter
+from utils.sockets import (
+    aggregate_sockets, encode_ip, format_endpoint, listening_sockets,
+    map_inodes_to_processes, parse_state,
+)
+from utils.offload import offload
+from utils.cache import response_cache
+from utils.sampler import sampler
+from utils.timeseries import format_value
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text == "/ports")
-async def list_ports(message: types.Message):
-    if not is_user_allowed(message.from_user.id):
+# Запас до лимита Telegram в 4096 символов
+MAX_MESSAGE_LENGTH = 3800
+
+def _code_block(title: str, header: str, rows, total: int) -> str:
+    """Собирает таблицу в блоке кода MarkdownV2, обрезая её по длине сообщения"""
+    body = header + "\n" + "-" * len(header) + "\n"
+    shown = 0
+    for row in rows:
+        if len(title) + len(body) + len(row) > MAX_MESSAGE_LENGTH:
+            break
+        body += row + "\n"
+        shown += 1
+    if shown < total:
+        body += f"... и ещё {total - shown}\n"
+    # Внутри блока кода MarkdownV2 экранируются только ` и \\
+    body = body.replace("\\", "\\\\").replace("`", "\\`")
+    return f"{title}\n```\n{body}```"
+
+def _owner_label(owners: dict, inode: int) -> str:
+    owner = owners.get(inode)
+    return f"{owner[1]}/{owner[0]}" if owner else "-"
+
+def _listening_with_owners():
+    sockets = sorted(listening_sockets(), key=lambda s: (s.local_port, s.proto))
+    # Владельцев ищем только для сокетов, которые попадут в сообщение
+    owners = map_inodes_to_processes(s.inode for s in sockets[:100])
+    return sockets, owners
+
+@router.message("/ports")
+async def list_ports(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ Доступ запрещён.")
         return
 
     try:
-        # Проверяем наличие ss
-        try:
-            output = subprocess.check_output(["ss", "-tuln"], text=True)
-            lines = output.splitlines()
-            
-            if len(lines) <= 1:
-                await message.answer("📭 Нет открытых портов.")
-                return
-
-            response = "🔓 Открытые порты:\n```\n"
-            response += f"{'PROTO':<8} {'LOCAL ADDRESS':<25} {'STATE':<15}\n"
-            response += "-" * 50 + "\n"
-            
-            for line in lines[1:]:  # Пропускаем заголовок
-                parts = line.split()
-                if len(parts) >= 5:
-                    proto = parts[0]
-                    local_addr = parts[4] if len(parts) > 4 else "N/A"
-                    state = parts[1] if len(parts) > 1 else "UNKNOWN"
-                    response += f"{proto:<8} {local_addr:<25} {state:<15}\n"
-            
-            response += "```"
-            await message.answer(response, parse_mode="MarkdownV2")
-            return
-            
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass  # Если ss недоступен, пробуем netstat
-        
-        # Проверяем наличие netstat
-        try:
-            output = subprocess.check_output(["netstat", "-tuln"], text=True)
-            lines = output.splitlines()
-            
-            if len(lines) <= 1:
-                await message.answer("📭 Нет открытых портов.")
-                return
-
-            response = "🔓 Открытые порты:\n```\n"
-            response += f"{'Proto':<8} {'Local Address':<25} {'State':<15}\n"
-            response += "-" * 50 + "\n"
-            
-            for line in lines[1:]:  # Пропускаем заголовок
-                parts = line.split()
-                if len(parts) >= 4:
-                    proto = parts[0]
-                    local_addr = parts[3] if len(parts) > 3 else "N/A"
-                    state = parts[5] if len(parts) > 5 else "UNKNOWN"
-                    response += f"{proto:<8} {local_addr:<25} {state:<15}\n"
-            
-            response += "```"
-            await message.answer(response, parse_mode="MarkdownV2")
-            return
-            
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass  # Если netstat недоступен, пробуем lsof
-        
-        # Проверяем наличие lsof
-        try:
-            output = subprocess.check_output(["lsof", "-i", "-P", "-n"], text=True)
-            lines = output.splitlines()
-            
-            if len(lines) <= 1:
-                await message.answer("📭 Нет открытых портов.")
-                return
-
-            response = "🔓 Открытые порты:\n```\n"
-            response += f"{'COMMAND':<10} {'PID':<8} {'USER':<8} {'FD':<4} {'TYPE':<6} {'DEVICE':<10} {'SIZE/OFF':<12} {'NODE':<8} {'NAME':<20}\n"
-            response += "-" * 100 + "\n"
-            
-            for line in lines[1:]:  # Пропускаем заголовок
-                parts = line.split()
-                if len(parts) >= 9:
-                    command = parts[0]
-                    pid = parts[1]
-                    user = parts[2]
-                    fd = parts[3]
-                    type_ = parts[4]
-                    device = parts[5]
-                    size_off = parts[6]
-                    node = parts[7]
-                    name = parts[8]
-                    
-                    # Извлекаем порт из имени
-                    port = ""
-                    if ":" in name:
-                        port = name.split(":")[-1]
-                    
-                    response += f"{command:<10} {pid:<8} {user:<8} {fd:<4} {type_:<6} {device:<10} {size_off:<12} {node:<8} {name:<20}\n"
-            
-            response += "```"
-            await message.answer(response, parse_mode="MarkdownV2")
+        # Чтение /proc/net и /proc/*/fd - вне event loop, одновременные /ports ждут один проход
+        sockets, owners = await response_cache.get(
+            ("ports",), lambda: offload.run("scan", _listening_with_owners, user_id=message.from_user.id)
+        )
+        if not sockets:
+            await message.answer("📭 Нет открытых портов.")
             return
-            
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass  # Если lsof недоступен, выдаем ошибку
-        
-        # Если ничего не работает
-        await message.answer("❌ Не удалось получить информацию о портах. Убедитесь, что установлены ss, netstat или lsof.")
 
+        # Строки формируются лениво: адреса разбираются только для показанных сокетов
+        rows = (
+            f"{s.proto:<6} {format_endpoint(s.local_ip, s.local_port):<28} {_owner_label(owners, s.inode)}"
+            for s in sockets
+        )
+        header = f"{'PROTO':<6} {'LOCAL ADDRESS':<28} PROCESS"
+        await message.answer(_code_block("🔓 Открытые порты:", header, rows, len(sockets)), parse_mode="MarkdownV2")
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
 
-@router.message(lambda message: message.text == "/connections")
-async def list_connections(message: types.Message):
-    if not is_user_allowed(message.from_user.id):
+def _parse_connection_filters(args) -> dict:
+    """Разбирает фильтры вида port=443 state=ESTAB ip=1.2.3.4 proto=tcp"""
+    filters = {}
+    for arg in args:
+        key, _, value = arg.partition("=")
+        if not value:
+            raise ValueError(arg)
+        if key == "port":
+            filters["port"] = int(value)
+        elif key == "state":
+            filters["state"] = parse_state(value)
+        elif key == "ip":
+            encode_ip(value)  # проверка формата адреса
+            filters["ip"] = value
+        elif key == "proto" and value in ("tcp", "udp"):
+            filters["protocols"] = (value, value + "6")
+        else:
+            raise ValueError(arg)
+    return filters
+
+def _format_summary(title: str, summary: dict) -> str:
+    text = f"{title}: {summary['total']}\n\n"
+    if summary["states"]:
+        text += "📊 По состояниям:\n"
+        text += " · ".join(f"{name} {n}" for name, n in summary["states"]) + "\n\n"
+    if summary["remotes"]:
+        text += "🌍 Топ удалённых IP:\n"
+        text += "".join(f"  {ip} — {n}\n" for ip, n in summary["remotes"]) + "\n"
+    if summary["local_ports"]:
+        text += "🔌 Топ локальных портов:\n"
+        text += "".join(f"  {port} — {n}\n" for port, n in summary["local_ports"]) + "\n"
+    if summary["processes"]:
+        text += "⚙️ Топ процессов:\n"
+        text += "".join(f"  {name} — {n}\n" for name, n in summary["processes"]) + "\n"
+    if summary["samples"]:
+        text += "🔗 Соединения:\n"
+        for s in summary["samples"]:
+            text += (
+                f"  {s.proto} {format_endpoint(s.local_ip, s.local_port)} → "
+                f"{format_endpoint(s.remote_ip, s.remote_port)} {s.state_name}\n"
+            )
+        text += "\n"
+    text += f"⏱ {summary['elapsed'] * 1000:.0f} мс"
+    return text
+
+@router.message("/connections")
+async def list_connections(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ Доступ запрещён.")
         return
 
+    args = message.text.split()[1:]
     try:
-        # Проверяем наличие ss
-        try:
-            output = subprocess.check_output(["ss", "-tuln"], text=True)
-            lines = output.splitlines()
-            
-            if len(lines) <= 1:
-                await message.answer("📭 Нет активных соединений.")
-                return
-
-            response = "🔗 Активные соединения:\n```\n"
-            response += f"{'PROTO':<6} {'LOCAL ADDR':<20} {'PEER ADDR':<20} {'STATE':<15}\n"
-            response += "-" * 70 + "\n"
-            
-            for line in lines[1:]:  # Пропускаем заголовок
-                parts = line.split()
-                if len(parts) >= 5:
-                    proto = parts[0]
-                    local_addr = parts[4] if len(parts) > 4 else "N/A"
-                    peer_addr = parts[5] if len(parts) > 5 else "N/A"
-                    state = parts[1] if len(parts) > 1 else "UNKNOWN"
-                    response += f"{proto:<6} {local_addr:<20} {peer_addr:<20} {state:<15}\n"
-            
-            response += "```"
-            await message.answer(response, parse_mode="MarkdownV2")
-            return
-            
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass  # Если ss недоступен, пробуем netstat
-        
-        # Проверяем наличие netstat
-        try:
-            output = subprocess.check_output(["netstat", "-tuln"], text=True)
-            lines = output.splitlines()
-            
-            if len(lines) <= 1:
-                await message.answer("📭 Нет активных соединений.")
-                return
-
-            response = "🔗 Активные соединения:\n```\n"
-            response += f"{'Proto':<6} {'Local Address':<20} {'Peer Address':<20} {'State':<15}\n"
-            response += "-" * 70 + "\n"
-            
-            for line in lines[1:]:  # Пропускаем заголовок
-                parts = line.split()
-                if len(parts) >= 4:
-                    proto = parts[0]
-                    local_addr = parts[3] if len(parts) > 3 else "N/A"
-                    peer_addr = parts[4] if len(parts) > 4 else "N/A"
-                    state = parts[5] if len(parts) > 5 else "UNKNOWN"
-                    response += f"{proto:<6} {local_addr:<20} {peer_addr:<20} {state:<15}\n"
-            
-            response += "```"
-            await message.answer(response, parse_mode="MarkdownV2")
-            return
-            
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass  # Если netstat недоступен, выдаем ошибку
-        
-        # Если ничего не работает
-        await message.answer("❌ Не удалось получить информацию о соединениях. Убедитесь, что установлены ss или netstat.")
+        filters = _parse_connection_filters(args)
+    except (ValueError, OSError):
+        await message.answer(
+            "❌ Использование: `/connections [port=443] [state=ESTAB] [ip=1.2.3.4] [proto=tcp]`\n"
+            "Состояния: `ESTAB`, `LISTEN`, `TIME-WAIT`, `CLOSE-WAIT`, `SYN-RECV` и др.",
+            parse_mode="Markdown"
+        )
+        return
 
+    try:
+        # Проход по таблице сокетов и /proc/*/fd - вне event loop
+        summary = await response_cache.get(
+            ("connections", tuple(sorted(filters.items()))),
+            lambda: offload.run("scan", aggregate_sockets, user_id=message.from_user.id, **filters),
+        )
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
+        return
+
+    title = "🔗 Сокеты"
+    if args:
+        title += f" ({' '.join(args)})"
+    await message.answer(_format_summary(title, summary))
+
+def _rate(value: float) -> str:
+    return format_value(value, "B/s")
+
+@router.message("/net")
+async def network_io(message: types.Message, role: str | None):
+    if role is None:
+        await message.answer("❌ Доступ запрещён.")
+        return
+
+    # Скорости уже посчитаны фоновым сборщиком по разнице счётчиков
+    snapshot = sampler.get_snapshot()
+    interfaces = sorted(
+        snapshot["interfaces"].items(),
+        key=lambda item: item[1]["bytes_recv"] + item[1]["bytes_sent"], reverse=True
+    )
+    if not interfaces:
+        await message.answer("📭 Сетевые интерфейсы не найдены.")
+        return
+
+    rows = (
+        f"{name[:10]:<10} {_rate(r['bytes_recv']):>11} {_rate(r['bytes_sent']):>11} "
+        f"{r['packets_recv']:>7.0f}/{r['packets_sent']:<7.0f} "
+        f"{r['errin'] + r['errout']:.0f}/{r['dropin'] + r['dropout']:.0f}"
+        for name, r in interfaces
+    )
+    header = f"{'IFACE':<10} {'RX':>11} {'TX':>11} {'PKT/s RX/TX':^15} ERR/DROP"
+    text = _code_block("🌐 Трафик по интерфейсам:", header, rows, len(interfaces))
+
+    disk_rows = [
+        f"{'read':<6} {_rate(snapshot['disk_read']):>11} {snapshot['disk_read_ops']:>8.0f}",
+        f"{'write':<6} {_rate(snapshot['disk_write']):>11} {snapshot['disk_write_ops']:>8.0f}",
+    ]
+    text += "\n" + _code_block("💽 Дисковый ввод\\-вывод:", f"{'':<6} {'BYTES/s':>11} {'IOPS':>8}", disk_rows, 2)
+    await message.answer(text, parse_mode="MarkdownV2")
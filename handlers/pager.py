@@ -0,0 +1,84 @@
+# handlers/pager.py
+import re
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from handlers.dispatch import CommandRouter
+from utils.offload import offload
+from utils.output_store import PAGE_SIZE, output_store
+
+router = CommandRouter()
+
+def escape_v2(text: str) -> str:
+    """Экранирование текста вне блока кода MarkdownV2"""
+    return re.sub(r"([_*\[\]()~`>#+\-=|{}.!\\])", r"\\\1", text)
+
+def code_block(text: str) -> str:
+    # Внутри блока кода MarkdownV2 экранируются только ` и \\
+    return "```\n" + text.rstrip("\n").replace("\\", "\\\\").replace("`", "\\`") + "\n```"
+
+def tail_text(text: str, limit: int = PAGE_SIZE) -> str:
+    """Конец текста не длиннее limit символов, начиная с целой строки"""
+    if len(text) <= limit:
+        return text
+    return "...\n" + text[len(text) - limit:].split("\n", 1)[-1]
+
+def page_view(output, number: int):
+    """Текст MarkdownV2 и клавиатура страницы сохранённого вывода (номер от 1)"""
+    total = output.page_count
+    number = min(max(number, 1), total)
+    title = output.title
+    if total > 1:
+        title += f" · стр. {number}/{total}"
+    if output.dropped:
+        title += f" (первые {output.dropped} стр. не сохранены)"
+    page = output.page(number)
+    if page is None:
+        page = "(страница не сохранена: превышен лимит памяти)"
+
+    builder = InlineKeyboardBuilder()
+    if number > 1:
+        builder.button(text="◀️", callback_data=f"out:{output.key}:{number - 1}")
+    if number < total:
+        builder.button(text="▶️", callback_data=f"out:{output.key}:{number + 1}")
+    if total > 1:
+        builder.button(text="💾 .txt.gz", callback_data=f"outgz:{output.key}")
+    builder.adjust(2)
+    return f"{escape_v2(title)}\n{code_block(page or '(нет вывода)')}", builder.as_markup()
+
+@router.callback_query(prefix="out:")
+async def page_callback(callback: types.CallbackQuery, role: str | None):
+    if role is None:
+        await callback.answer("❌ Доступ запрещён.", show_alert=True)
+        return
+
+    _, key, number = callback.data.split(":")
+    output = output_store.get(key)
+    if output is None:
+        await callback.answer("⌛ Вывод больше не хранится, повторите команду.", show_alert=True)
+        return
+    text, markup = page_view(output, int(number))
+    try:
+        await callback.message.edit_text(text, parse_mode="MarkdownV2", reply_markup=markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
+@router.callback_query(prefix="outgz:")
+async def download_callback(callback: types.CallbackQuery, role: str | None):
+    if role is None:
+        await callback.answer("❌ Доступ запрещён.", show_alert=True)
+        return
+
+    output = output_store.get(callback.data.split(":", 1)[1])
+    if output is None:
+        await callback.answer("⌛ Вывод больше не хранится, повторите команду.", show_alert=True)
+        return
+    await callback.answer()
+    # Распаковка страниц и gzip - вне event loop
+    data = await offload.run("io", output.export(), user_id=callback.from_user.id)
+    await callback.message.answer_document(
+        BufferedInputFile(data, filename=f"output-{output.key}.txt.gz"), caption=output.title
+    )
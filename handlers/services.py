@@ -1,21 +1,30 @@
 # handlers/services.py
-from aiogram import Router, types
+from aiogram import types
+from handlers.dispatch import CommandRouter
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from utils.security import is_user_allowed, is_admin
+from database.database import ROLE_ADMIN
+from utils.offload import offload
+from utils.cache import response_cache
 import subprocess
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text == "/services")
-async def list_services(message: types.Message):
-    if not is_user_allowed(message.from_user.id):
+async def _running_services(user_id: int) -> list:
+    result = await offload.command(
+        ["systemctl", "list-units", "--type=service", "--state=running"],
+        check=True, user_id=user_id
+    )
+    lines = result.stdout.splitlines()[1:11]  # Первые 10 сервисов
+    return [line.split()[0] for line in lines if line]
+
+@router.message("/services")
+async def list_services(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ Доступ запрещён.")
         return
 
     try:
-        output = subprocess.check_output(["systemctl", "list-units", "--type=service", "--state=running"], text=True)
-        lines = output.splitlines()[1:11]  # Первые 10 сервисов
-        services = [line.split()[0] for line in lines if line]
+        services = await response_cache.get(("services",), lambda: _running_services(message.from_user.id))
 
         builder = InlineKeyboardBuilder()
         for svc in services:
@@ -26,7 +35,7 @@ async def list_services(message: types.Message):
     except Exception as e:
         await message.answer(f"❌ Ошибка: {e}")
 
-@router.callback_query(lambda c: c.data.startswith("svc_"))
+@router.callback_query(prefix="svc_")
 async def service_action(callback: types.CallbackQuery):
     service = callback.data.split("_")[1]
     builder = InlineKeyboardBuilder()
@@ -39,28 +48,29 @@ async def service_action(callback: types.CallbackQuery):
     await callback.message.edit_text(f"Выберите действие для сервиса `{service}`:", parse_mode="Markdown", reply_markup=builder.as_markup())
     await callback.answer()
 
-@router.callback_query(lambda c: c.data.startswith(("restart_", "stop_", "start_")))
-async def handle_service_action(callback: types.CallbackQuery):
+@router.callback_query(prefix=("restart_", "stop_", "start_"))
+async def handle_service_action(callback: types.CallbackQuery, role: str | None):
     action, service = callback.data.split("_", 1)
-    if not is_admin(callback.from_user.id):
+    if role != ROLE_ADMIN:
         await callback.answer("❌ Только администратор может управлять сервисами.", show_alert=True)
         return
 
     try:
+        await offload.command(["systemctl", action, service], check=True, user_id=callback.from_user.id)
         if action == "restart":
-            subprocess.run(["systemctl", "restart", service], check=True)
             await callback.message.edit_text(f"✅ Сервис `{service}` перезапущен.", parse_mode="Markdown")
         elif action == "stop":
-            subprocess.run(["systemctl", "stop", service], check=True)
             await callback.message.edit_text(f"⏹ Сервис `{service}` остановлен.", parse_mode="Markdown")
         elif action == "start":
-            subprocess.run(["systemctl", "start", service], check=True)
             await callback.message.edit_text(f"▶️ Сервис `{service}` запущен.", parse_mode="Markdown")
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
         await callback.message.edit_text(f"❌ Ошибка при выполнении команды: {e}")
+    finally:
+        # Даже неудачная команда могла изменить сервисы, их порты и процессы
+        response_cache.invalidate("services", "ports", "connections", "processes")
     await callback.answer()
 
-@router.callback_query(lambda c: c.data == "cancel")
+@router.callback_query("cancel")
 async def cancel_action(callback: types.CallbackQuery):
     await callback.message.edit_text("❌ Действие отменено.")
     await callback.answer()
@@ -1,34 +1,24 @@
 # handlers/start_help.py
-from aiogram import Router, types
+from aiogram import types
+from handlers.dispatch import CommandRouter
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from database.database import is_user_allowed, is_admin, add_user
-from utils.system_monitor import get_system_status
+from database.database import ROLE_ADMIN
+from utils.system_monitor import get_system_status, format_system_status
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text == "/start")
-async def start_handler(message: types.Message):
-    user_id = message.from_user.id
+@router.message("/start")
+async def start_handler(message: types.Message, role: str | None):
     username = message.from_user.username or "Unknown"
     
-    # Проверяем, является ли пользователь админом из .env
-    try:
-        with open('.env', 'r') as f:
-            env_content = f.read()
-            admin_id_from_env = int(env_content.split('ADMIN_ID=')[1].split('\n')[0])
-            if user_id == admin_id_from_env:
-                add_user(user_id, is_admin=True)
-    except:
-        pass  # Если не удалось прочитать .env, продолжаем как обычно
-    
-    if not is_user_allowed(user_id):
+    if role is None:
         await message.answer("👋 Привет! У вас нет доступа к этому боту.")
         return
     
     builder = InlineKeyboardBuilder()
     builder.button(text="📊 Статус", callback_data="show_status")
     builder.button(text="📋 Помощь", callback_data="show_help")
-    if is_admin(user_id):
+    if role == ROLE_ADMIN:
         builder.button(text="⚙️ Админ панель", callback_data="admin_panel")
     builder.adjust(2)
     
@@ -38,23 +28,26 @@ async def start_handler(message: types.Message):
     
     await message.answer(welcome_text, reply_markup=builder.as_markup())
 
-@router.message(lambda message: message.text == "/help")
-async def help_handler(message: types.Message):
-    user_id = message.from_user.id
-    
-    if not is_user_allowed(user_id):
+@router.message("/help")
+async def help_handler(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ У вас нет доступа к этому боту.")
         return
     
-    is_user_admin = is_admin(user_id)
+    is_user_admin = role == ROLE_ADMIN
     
     help_text = "🤖 *Команды бота:*\n\n"
     help_text += "🔍 *Мониторинг:*\n"
     help_text += "`/status` - Статус сервера\n"
     help_text += "`/logs [N]` - Последние N строк логов\n"
-    help_text += "`/processes` - Список процессов\n"
+    help_text += "`/logs follow [unit|*] [шаблон]` - Новые строки журнала в реальном времени\n"
+    help_text += "`/processes [cpu|rss|io|fds]` - Топ процессов\n"
+    help_text += "`/topusage [период] [cpu|rss|io]` - Кто потреблял ресурсы за период\n"
     help_text += "`/ports` - Открытые порты\n"
-    help_text += "`/connections` - Активные соединения\n\n"
+    help_text += "`/connections [port=] [state=] [ip=]` - Сводка по соединениям\n"
+    help_text += "`/net` - Трафик по интерфейсам и дисковый ввод-вывод\n"
+    help_text += "`/trend <метрика> [период]` - График метрики (cpu, memory, disk, load, net_rx, net_tx, disk_read, disk_write)\n"
+    help_text += "`/history <метрика> [период]` - История метрики из архива на диске\n\n"
     
     help_text += "サービс *Сервисы:*\n"
     help_text += "`/services` - Список сервисов\n"
@@ -66,10 +59,17 @@ async def help_handler(message: types.Message):
     if is_user_admin:
         help_text += "🔐 *Админ команды:*\n"
         help_text += "`/auth [user_id]` - Добавить пользователя\n"
-        help_text += "`/exec [команда]` - Выполнить shell команду\n"
+        help_text += "`/exec [команда]` - Выполнить shell команду с выводом по мере выполнения\n"
+        help_text += "`/jobs` - Задачи /exec\n"
+        help_text += "`/cancel <id>` - Отменить задачу\n"
+        help_text += "`/kill <PID>` - Завершить процесс вместе с потомками\n"
+        help_text += "`/pkill <имя>|name=|cmd=|user=` - Завершить процессы по шаблону\n"
         help_text += "`/backup` - Управление бэкапами\n"
         help_text += "`/adduser <username> [pass]` - Создать пользователя\n" # Новая команда
         help_text += "`/deluser <username>` - Удалить пользователя\n"       # Новая команда
+        help_text += "`/botstats` - Статистика работы бота\n"
+        help_text += "`/audit [user=<id>] [action=<действие>]` - Журнал действий\n"
+        help_text += "`/auditsearch <запрос>` - Поиск по журналу действий\n"
         help_text += "\n"
     help_text += "ℹ️ *Дополнительно:*\n"
     help_text += "`/start` - Начать работу\n"
@@ -78,17 +78,10 @@ async def help_handler(message: types.Message):
     await message.answer(help_text, parse_mode="Markdown")
 
 # Callback handlers для кнопок
-@router.callback_query(lambda c: c.data == "show_status")
+@router.callback_query("show_status")
 async def show_status_callback(callback: types.CallbackQuery):
     status = get_system_status()
-    response = (
-        f"💻 *Статус сервера:*\n"
-        f"🔹 CPU: {status['cpu']}%\n"
-        f"🔹 RAM: {status['memory']}\n"
-        f"🔹 Диск: {status['disk']}\n"
-        f"🔹 Аптайм: {status['uptime']}\n"
-        f"🔹 IP: `{status['ip']}`"
-    )
+    response = format_system_status(status)
     
     builder = InlineKeyboardBuilder()
     builder.button(text="⬅️ Назад", callback_data="back_to_main")
@@ -97,18 +90,22 @@ async def show_status_callback(callback: types.CallbackQuery):
     await callback.message.edit_text(response, parse_mode="Markdown", reply_markup=builder.as_markup())
     await callback.answer()
 
-@router.callback_query(lambda c: c.data == "show_help")
-async def show_help_callback(callback: types.CallbackQuery):
-    user_id = callback.from_user.id
-    is_user_admin = is_admin(user_id)
+@router.callback_query("show_help")
+async def show_help_callback(callback: types.CallbackQuery, role: str | None):
+    is_user_admin = role == ROLE_ADMIN
     
     help_text = "🤖 *Команды бота:*\n\n"
     help_text += "🔍 *Мониторинг:*\n"
     help_text += "`/status` - Статус сервера\n"
     help_text += "`/logs [N]` - Последние N строк логов\n"
-    help_text += "`/processes` - Список процессов\n"
+    help_text += "`/logs follow [unit|*] [шаблон]` - Новые строки журнала в реальном времени\n"
+    help_text += "`/processes [cpu|rss|io|fds]` - Топ процессов\n"
+    help_text += "`/topusage [период] [cpu|rss|io]` - Кто потреблял ресурсы за период\n"
     help_text += "`/ports` - Открытые порты\n"
-    help_text += "`/connections` - Активные соединения\n\n"
+    help_text += "`/connections [port=] [state=] [ip=]` - Сводка по соединениям\n"
+    help_text += "`/net` - Трафик по интерфейсам и дисковый ввод-вывод\n"
+    help_text += "`/trend <метрика> [период]` - График метрики (cpu, memory, disk, load, net_rx, net_tx, disk_read, disk_write)\n"
+    help_text += "`/history <метрика> [период]` - История метрики из архива на диске\n\n"
     
     help_text += "サービс *Сервисы:*\n"
     help_text += "`/services` - Список сервисов\n"
@@ -119,7 +116,11 @@ async def show_help_callback(callback: types.CallbackQuery):
     if is_user_admin:
         help_text += "🔐 *Админ команды:*\n"
         help_text += "`/auth [user_id]` - Добавить пользователя\n"
-        help_text += "`/exec [команда]` - Выполнить shell команду\n"
+        help_text += "`/exec [команда]` - Выполнить shell команду с выводом по мере выполнения\n"
+        help_text += "`/jobs` - Задачи /exec\n"
+        help_text += "`/cancel <id>` - Отменить задачу\n"
+        help_text += "`/kill <PID>` - Завершить процесс вместе с потомками\n"
+        help_text += "`/pkill <имя>|name=|cmd=|user=` - Завершить процессы по шаблону\n"
         help_text += "`/backup` - Управление бэкапами\n\n"
     
     help_text += "ℹ️ *Дополнительно:*\n"
@@ -133,29 +134,12 @@ async def show_help_callback(callback: types.CallbackQuery):
     await callback.message.edit_text(help_text, parse_mode="Markdown", reply_markup=builder.as_markup())
     await callback.answer()
 
-@router.callback_query(lambda c: c.data == "admin_panel")
-async def admin_panel_callback(callback: types.CallbackQuery):
-    if not is_admin(callback.from_user.id):
-        await callback.answer("❌ Доступ запрещён", show_alert=True)
-        return
-    
-    builder = InlineKeyboardBuilder()
-    builder.button(text="💾 Создать бэкап", callback_data="create_backup")
-    builder.button(text="📋 Список бэкапов", callback_data="list_backups")
-    builder.button(text="⬅️ Назад", callback_data="back_to_main")
-    builder.button(text="❌ Закрыть", callback_data="close_backup")
-    builder.adjust(2)
-    
-    await callback.message.edit_text("🔧 Управление бэкапами:", reply_markup=builder.as_markup())
-    await callback.answer()
-
-@router.callback_query(lambda c: c.data == "back_to_main")
-async def back_to_main_callback(callback: types.CallbackQuery):
-    user_id = callback.from_user.id
+@router.callback_query("back_to_main")
+async def back_to_main_callback(callback: types.CallbackQuery, role: str | None):
     builder = InlineKeyboardBuilder()
     builder.button(text="📊 Статус", callback_data="show_status")
     builder.button(text="📋 Помощь", callback_data="show_help")
-    if is_admin(user_id):
+    if role == ROLE_ADMIN:
         builder.button(text="⚙️ Админ панель", callback_data="admin_panel")
     builder.adjust(2)
     
@@ -163,8 +147,3 @@ async def back_to_main_callback(callback: types.CallbackQuery):
     
     await callback.message.edit_text(welcome_text, reply_markup=builder.as_markup())
     await callback.answer()
-
-@router.callback_query(lambda c: c.data == "close_backup")
-async def close_backup_callback(callback: types.CallbackQuery):
-    await callback.message.delete()
-    await callback.answer()
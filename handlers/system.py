@@ -1,76 +1,290 @@
 # handlers/system.py
-from aiogram import Router, types
+import re
+import secrets
+from collections import OrderedDict
+import psutil
+from aiogram import types
+from handlers.dispatch import CommandRouter
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from utils.system_monitor import get_top_processes, kill_process
-from database.database import is_user_allowed, is_admin, log_action
+from utils.offload import offload
+from utils.cache import response_cache
+from utils.processes import SORT_KEYS, process_tracker
+from utils.kill import TERM_TIMEOUT, filter_protected, format_results, match_processes, process_tree, terminate_async
+from utils.timeseries import format_duration, format_value, parse_duration
+from utils.usage import USAGE_KEYS, usage_store
+from config.config import USAGE_RETENTION
+from database.database import ROLE_ADMIN, log_action
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text == "/processes")
-async def list_processes(message: types.Message):
-    if not is_user_allowed(message.from_user.id):
+def _escape_markdown(text: str) -> str:
+    # Имена вроде pool_workqueue_release ломают разбор Markdown без экранирования
+    for char in "_*`[":
+        text = text.replace(char, "\\" + char)
+    return text
+
+def _format_process(p: dict) -> str:
+    line = f"`{p['pid']}` - {_escape_markdown(p['name'])} ({p['cpu']:.1f}% CPU, {p['rss'] / 1024**2:.0f} MB"
+    if p["io"] is not None:
+        line += f", I/O {format_value(p['io'], 'B/s')}"
+    if p["fds"] is not None:
+        line += f", FD {p['fds']}"
+    return line + ")\n"
+
+def _processes_view(key: str):
+    """Текст и клавиатура топ-10 процессов по ключу сортировки"""
+    procs = process_tracker.top(key, 10)
+    text = f"📊 Топ 10 процессов {SORT_KEYS[key][1]}:\n\n"
+    builder = InlineKeyboardBuilder()
+
+    for p in procs:
+        text += _format_process(p)
+        builder.button(text=f"❌ {p['name']} ({p['pid']})", callback_data=f"kill_{p['pid']}")
+
+    sort_buttons = [
+        InlineKeyboardButton(text=("• " if k == key else "") + label, callback_data=f"refresh_procs:{k}")
+        for k, (label, _) in SORT_KEYS.items()
+    ]
+    builder.adjust(1)
+    builder.row(*sort_buttons)
+    builder.row(
+        InlineKeyboardButton(text="🔄 Обновить", callback_data=f"refresh_procs:{key}"),
+        InlineKeyboardButton(text="❌ Закрыть", callback_data="close"),
+    )
+    return text, builder.as_markup()
+
+async def _cached_processes_view(key: str):
+    """_processes_view, общий для одновременных запросов с тем же ключом"""
+    async def compute():
+        await process_tracker.ensure_fresh()
+        return _processes_view(key)
+    return await response_cache.get(("processes", key), compute)
+
+@router.message("/processes")
+async def list_processes(message: types.Message, role: str | None):
+    if role is None:
         await message.answer("❌ Доступ запрещён.")
         return
 
-    log_action(message.from_user.id, message.from_user.username or "Unknown", "/processes", "Просмотр процессов")
+    args = message.text.split()[1:]
+    key = args[0] if args else "cpu"
+    if key not in SORT_KEYS:
+        await message.answer(f"❌ Использование: /processes [{'|'.join(SORT_KEYS)}]")
+        return
+
+    await log_action(message.from_user.id, message.from_user.username or "Unknown", "/processes", "Просмотр процессов")
 
     try:
-        procs = get_top_processes(10)
-        text = "📊 Топ 10 процессов по CPU:\n\n"
-        builder = InlineKeyboardBuilder()
+        # Таблицу обновляет фоновый сборщик; здесь только выбор топа
+        text, markup = await _cached_processes_view(key)
+        await message.answer(text, parse_mode="Markdown", reply_markup=markup)
+    except Exception as e:
+        await message.answer(f"❌ Ошибка: {e}")
 
-        for p in procs:
-            text += f"`{p['pid']}` - {p['name']} ({p['cpu_percent']}% CPU)\n"
-            builder.button(text=f"❌ {p['name']} ({p['pid']})", callback_data=f"kill_{p['pid']}")
+def _parse_usage_args(args):
+    """Разбирает `[период] [cpu|rss|io]` в любом порядке"""
+    seconds, key = 3600, "cpu"
+    for arg in args:
+        if arg in USAGE_KEYS:
+            key = arg
+        else:
+            seconds = parse_duration(arg)
+    return min(seconds, USAGE_RETENTION), key
 
-        builder.button(text="🔄 Обновить", callback_data="refresh_procs")
-        builder.button(text="❌ Закрыть", callback_data="close")
-        builder.adjust(1)
+@router.message("/topusage")
+async def top_usage(message: types.Message, role: str | None):
+    if role is None:
+        await message.answer("❌ Доступ запрещён.")
+        return
 
-        await message.answer(text, parse_mode="Markdown", reply_markup=builder.as_markup())
-    except Exception as e:
-        await message.answer(f"❌ Ошибка: {e}")
+    try:
+        seconds, key = _parse_usage_args(message.text.split()[1:])
+    except ValueError:
+        await message.answer(
+            f"❌ Использование: `/topusage [период] [{'|'.join(USAGE_KEYS)}]`\n"
+            f"Период: `30m`, `1h` (не больше {format_duration(USAGE_RETENTION)})",
+            parse_mode="Markdown"
+        )
+        return
+
+    await log_action(message.from_user.id, message.from_user.username or "Unknown", "/topusage", f"Потребление за {format_duration(seconds)}")
+
+    top = usage_store.top(seconds, key, 10)
+    if not top:
+        await message.answer("📭 Нет данных о потреблении за этот период.")
+        return
+
+    text = f"📊 Потребление за {format_duration(seconds)} {USAGE_KEYS[key][1]}:\n\n"
+    for record, (cpu, rss, io) in top:
+        text += (
+            f"`{record.pid}` - {_escape_markdown(record.name)} "
+            f"(CPU {cpu:.1f} с, пик {format_value(rss, 'B')}, I/O {format_value(io, 'B')})"
+        )
+        text += " - завершён\n" if not record.alive else "\n"
+    await message.answer(text, parse_mode="Markdown")
+
+def _limit_lines(text: str) -> str:
+    """Обрезает итог по строкам, чтобы уложиться в лимит сообщения"""
+    if len(text) <= 3800:
+        return text
+    lines = text[:3800].split("\n")[:-1]
+    return "\n".join(lines) + f"\n... и ещё {text.count(chr(10)) - len(lines)} строк"
+
+def _invalidate_after_kill():
+    # Завершённые процессы уносят с собой свои сокеты
+    response_cache.invalidate("processes", "ports", "connections", "services")
 
-@router.callback_query(lambda c: c.data.startswith("kill_"))
-async def kill_process_callback(callback: types.CallbackQuery):
-    if not is_admin(callback.from_user.id):
+async def _kill_tree(pid: int, user: types.User) -> str:
+    try:
+        procs = await offload.run("scan", process_tree, pid, user_id=user.id)
+    except psutil.NoSuchProcess:
+        return "❌ Процесс не найден"
+    allowed, skipped = filter_protected(procs)
+    try:
+        results = await terminate_async(allowed, user_id=user.id)
+    finally:
+        _invalidate_after_kill()
+    await log_action(user.id, user.username or "Unknown", "kill_process", f"Завершение дерева процесса {pid}: {len(results)} шт.")
+    return _limit_lines(f"🔪 Завершение процесса {pid} и потомков:\n\n" + format_results(results, skipped))
+
+@router.callback_query(prefix="kill_")
+async def kill_process_callback(callback: types.CallbackQuery, role: str | None):
+    if role != ROLE_ADMIN:
         await callback.answer("❌ Только администратор может убивать процессы.", show_alert=True)
         return
 
+    # Ожидание завершения занимает до нескольких секунд - отвечаем на нажатие сразу
+    await callback.answer()
     try:
         pid = int(callback.data.split("_")[1])
-        success, result = kill_process(pid)
-        
-        if success:
-            log_action(callback.from_user.id, callback.from_user.username or "Unknown", "kill_process", f"Убит процесс {pid}")
-            await callback.message.edit_text(f"✅ Результат: {result}")
-        else:
-            await callback.message.edit_text(f"❌ Ошибка: {result}")
+        await callback.message.edit_text(f"⏳ Завершаю процесс {pid}...")
+        await callback.message.edit_text(await _kill_tree(pid, callback.from_user))
     except Exception as e:
         await callback.message.edit_text(f"❌ Ошибка: {e}")
-    await callback.answer()
 
-@router.callback_query(lambda c: c.data == "refresh_procs")
-async def refresh_processes(callback: types.CallbackQuery):
+@router.message("/kill")
+async def kill_command(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может убивать процессы.")
+        return
+
+    args = message.text.split()[1:]
+    if len(args) != 1 or not args[0].isdigit():
+        await message.answer("❌ Использование: /kill <PID>")
+        return
+
+    status = await message.answer(f"⏳ Завершаю процесс {args[0]}...")
     try:
-        procs = get_top_processes(10)
-        text = "📊 Топ 10 процессов по CPU:\n\n"
-        builder = InlineKeyboardBuilder()
+        await status.edit_text(await _kill_tree(int(args[0]), message.from_user))
+    except Exception as e:
+        await status.edit_text(f"❌ Ошибка: {e}")
+
+# Найденные /pkill процессы до подтверждения: ключ кнопки -> (список процессов, шаблон)
+_pending_kills = OrderedDict()
+MAX_PENDING_KILLS = 32
+
+def _parse_pkill_args(args) -> dict:
+    """Разбирает `<имя>` или `name=`, `cmd=`, `user=` в условия match_processes"""
+    fields = {"name": "name", "cmd": "cmdline", "user": "user"}
+    filters = {}
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if not sep:
+            key, value = "name", arg
+        if key not in fields or not value:
+            raise ValueError(arg)
+        filters[fields[key]] = value
+    if not filters:
+        raise ValueError("пустой шаблон")
+    return filters
+
+@router.message("/pkill")
+async def pkill_command(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
+        await message.answer("❌ Только администратор может убивать процессы.")
+        return
+
+    args = message.text.split()[1:]
+    try:
+        filters = _parse_pkill_args(args)
+        procs = await offload.run("scan", match_processes, user_id=message.from_user.id, **filters)
+    except (ValueError, re.error):
+        await message.answer(
+            "❌ Использование: `/pkill <имя>` или `/pkill [name=<regex>] [cmd=<regex>] [user=<имя>]`",
+            parse_mode="Markdown"
+        )
+        return
+
+    allowed, skipped = filter_protected(procs)
+    if not allowed:
+        await message.answer("📭 Подходящих процессов не найдено." + (f" Защищённых пропущено: {len(skipped)}." if skipped else ""))
+        return
+
+    # Процессы хранятся как объекты psutil: если PID успеет переиспользоваться,
+    # сигнал не уйдёт чужому процессу
+    key = secrets.token_hex(6)
+    _pending_kills[key] = (allowed, " ".join(args))
+    while len(_pending_kills) > MAX_PENDING_KILLS:
+        _pending_kills.popitem(last=False)
 
-        for p in procs:
-            text += f"`{p['pid']}` - {p['name']} ({p['cpu_percent']}% CPU)\n"
-            builder.button(text=f"❌ {p['name']} ({p['pid']})", callback_data=f"kill_{p['pid']}")
+    text = f"🔪 Найдено процессов: {len(allowed)}\n\n"
+    text += "".join(f"{p.pid} {p.info['name']} ({p.info['username']})\n" for p in allowed[:30])
+    if len(allowed) > 30:
+        text += f"... и ещё {len(allowed) - 30}\n"
+    if skipped:
+        text += f"🛡 Защищённых пропущено: {len(skipped)}\n"
+    text += f"\nОтправить SIGTERM (SIGKILL через {TERM_TIMEOUT} с)?"
 
-        builder.button(text="🔄 Обновить", callback_data="refresh_procs")
-        builder.button(text="❌ Закрыть", callback_data="close")
-        builder.adjust(1)
+    builder = InlineKeyboardBuilder()
+    builder.button(text=f"✅ Завершить {len(allowed)}", callback_data=f"pkill:{key}")
+    builder.button(text="❌ Отмена", callback_data="close")
+    await message.answer(text, reply_markup=builder.as_markup())
 
-        await callback.message.edit_text(text, parse_mode="Markdown", reply_markup=builder.as_markup())
+@router.callback_query(prefix="pkill:")
+async def pkill_confirm(callback: types.CallbackQuery, role: str | None):
+    if role != ROLE_ADMIN:
+        await callback.answer("❌ Только администратор может убивать процессы.", show_alert=True)
+        return
+
+    pending = _pending_kills.pop(callback.data.split(":", 1)[1], None)
+    if pending is None:
+        await callback.answer("⌛ Список устарел, повторите /pkill.", show_alert=True)
+        return
+    procs, pattern = pending
+
+    await callback.answer()
+    await callback.message.edit_text(f"⏳ Завершаю {len(procs)} процессов...")
+    try:
+        results = await terminate_async(procs, user_id=callback.from_user.id)
+    except Exception as e:
+        await callback.message.edit_text(f"❌ Ошибка: {e}")
+        return
+    finally:
+        _invalidate_after_kill()
+    await log_action(callback.from_user.id, callback.from_user.username or "Unknown", "/pkill", f"{pattern}: {len(results)} процессов")
+    await callback.message.edit_text(_limit_lines(f"🔪 /pkill {pattern}\n\n" + format_results(results)))
+
+@router.callback_query("refresh_procs", prefix="refresh_procs:")
+async def refresh_processes(callback: types.CallbackQuery):
+    _, _, key = callback.data.partition(":")
+    if key not in SORT_KEYS:
+        key = "cpu"
+    try:
+        text, markup = await _cached_processes_view(key)
+        await callback.message.edit_text(text, parse_mode="Markdown", reply_markup=markup)
+    except TelegramBadRequest as e:
+        # Таблица ещё не обновилась с прошлого нажатия - текст тот же
+        if "message is not modified" not in str(e):
+            await callback.answer(f"❌ Ошибка: {e}", show_alert=True)
+            return
     except Exception as e:
         await callback.answer(f"❌ Ошибка: {e}", show_alert=True)
+        return
     await callback.answer()
 
-@router.callback_query(lambda c: c.data == "close")
+@router.callback_query("close")
 async def close_menu(callback: types.CallbackQuery):
     await callback.message.delete()
     await callback.answer()
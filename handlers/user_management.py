@@ -1,14 +1,15 @@
 # handlers/user_management.py
-from aiogram import Router, types
-from utils.security import is_admin
-import subprocess
+from aiogram import types
+from handlers.dispatch import CommandRouter
+from database.database import ROLE_ADMIN
+from utils.offload import offload
 import logging
 
-router = Router()
+router = CommandRouter()
 
-@router.message(lambda message: message.text.startswith("/adduser"))
-async def add_user(message: types.Message):
-    if not is_admin(message.from_user.id):
+@router.message("/adduser")
+async def add_user(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
         await message.answer("❌ Только администратор может управлять пользователями.")
         return
 
@@ -23,7 +24,7 @@ async def add_user(message: types.Message):
 
         # Создание пользователя
         cmd_create = ["sudo", "useradd", "-m", "-s", "/bin/bash", username]
-        result_create = subprocess.run(cmd_create, capture_output=True, text=True)
+        result_create = await offload.command(cmd_create, user_id=message.from_user.id)
 
         if result_create.returncode != 0:
             if "already exists" in result_create.stderr:
@@ -33,9 +34,10 @@ async def add_user(message: types.Message):
             return
 
         # Установка пароля
+        # Пароль передаём через stdin chpasswd, а не через shell
+        cmd_pass = ["sudo", "chpasswd"]
         if password:
-            cmd_pass = f"echo '{username}:{password}' | sudo chpasswd"
-            result_pass = subprocess.run(cmd_pass, shell=True, capture_output=True, text=True)
+            result_pass = await offload.command(cmd_pass, input=f"{username}:{password}\n", user_id=message.from_user.id)
             if result_pass.returncode != 0:
                 await message.answer(f"⚠️ Пользователь создан, но ошибка установки пароля: {result_pass.stderr}")
                 return
@@ -45,8 +47,7 @@ async def add_user(message: types.Message):
             # Генерация случайного пароля (простой пример)
             import random, string
             password = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
-            cmd_pass = f"echo '{username}:{password}' | sudo chpasswd"
-            result_pass = subprocess.run(cmd_pass, shell=True, capture_output=True, text=True)
+            result_pass = await offload.command(cmd_pass, input=f"{username}:{password}\n", user_id=message.from_user.id)
             if result_pass.returncode != 0:
                 await message.answer(f"⚠️ Пользователь создан, но ошибка установки пароля: {result_pass.stderr}")
                 return
@@ -58,9 +59,9 @@ async def add_user(message: types.Message):
         logging.error(f"Ошибка в /adduser: {e}")
         await message.answer(f"❌ Ошибка: {e}")
 
-@router.message(lambda message: message.text.startswith("/deluser"))
-async def del_user(message: types.Message):
-    if not is_admin(message.from_user.id):
+@router.message("/deluser")
+async def del_user(message: types.Message, role: str | None):
+    if role != ROLE_ADMIN:
         await message.answer("❌ Только администратор может управлять пользователями.")
         return
 
@@ -74,7 +75,7 @@ async def del_user(message: types.Message):
 
         # Удаление пользователя и его домашней директории
         cmd_del = ["sudo", "userdel", "-r", username]
-        result_del = subprocess.run(cmd_del, capture_output=True, text=True)
+        result_del = await offload.command(cmd_del, user_id=message.from_user.id)
 
         if result_del.returncode != 0:
             if "does not exist" in result_del.stderr:
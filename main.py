@@ -3,10 +3,28 @@ import asyncio
 import logging
 import os
 from aiogram import Bot, Dispatcher
-from config.config import BOT_TOKEN
-from database.database import init_db
-from handlers import admin, monitoring, services, system, network, backup, start_help, user_management
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from config.config import (
+    BOT_TOKEN, ADMIN_ID, TELEGRAM_API_URL, WEBHOOK_HOST, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_URL,
+)
+from database.database import init_db, add_user
+from database.engine import db
+from database.audit import audit_writer, run_log_retention
+from handlers import admin, audit, monitoring, services, system, network, backup, pager, start_help, user_management
+from handlers.dispatch import build_router
+from middlewares.auth import AuthMiddleware
 from utils.notifications import SystemMonitor
+from utils.sampler import sampler
+from utils.processes import process_tracker
+from utils.usage import usage_store
+from utils.timeseries import metrics
+from utils.rrd import archive
+from utils.offload import offload
+from utils.jobs import jobs
+from utils.logfollow import follows
+from utils.outbox import outbox
+from utils.webhook import run_polling, run_webhook
 
 # Настройка логирования
 logging.basicConfig(
@@ -23,13 +41,25 @@ logger = logging.getLogger(__name__)
 async def main():
     logger.info("Инициализация базы данных...")
     init_db()
+    # Администратор из .env всегда есть в белом списке
+    await add_user(ADMIN_ID, is_admin=True)
+    audit_writer.start()
+    asyncio.create_task(run_log_retention())
     
     logger.info("Запуск бота...")
-    bot = Bot(token=BOT_TOKEN)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+    bot = Bot(token=BOT_TOKEN, session=session)
+    # Все исходящие сообщения идут через очередь с лимитами Telegram
+    bot.session.middleware(outbox)
+    outbox.start()
     dp = Dispatcher()
 
-    # Добавляем роутеры
-    dp.include_routers(
+    # Роль пользователя определяется один раз на апдейт
+    dp.message.outer_middleware(AuthMiddleware())
+    dp.callback_query.outer_middleware(AuthMiddleware())
+
+    # Команды и callback-и всех модулей - одна таблица с поиском по словарю
+    dp.include_router(build_router(
         start_help.router,
         admin.router,
         monitoring.router,
@@ -37,15 +67,43 @@ async def main():
         system.router,
         network.router,
         backup.router,
-	user_management.router
-    )
+        user_management.router,
+        audit.router,
+        pager.router
+    ))
 
-    # Запускаем мониторинг в отдельной задаче
+    # Фоновый сбор метрик: /status и мониторинг читают готовый снимок
+    # История метрик: в памяти для /trend и в файле-архиве для /history
+    archive.open()
+    metrics.add_flush_listener(archive.write)
+    sampler.add_listener(metrics.add_snapshot)
+    sampler.add_listener(archive.sync)
+    # Таблица процессов для /processes обновляется раз в PROCESS_REFRESH_INTERVAL
+    sampler.add_listener(process_tracker.on_snapshot)
+    # Поминутный учёт потребления по процессам для /topusage и уведомлений
+    process_tracker.add_listener(usage_store.update)
+    # Правила уведомлений проверяются по каждому снимку
     monitor = SystemMonitor(bot)
-    asyncio.create_task(monitor.start_monitoring())
+    sampler.add_listener(monitor.on_snapshot)
+    sampler.start()
 
     logger.info("Бот запущен и готов к работе")
-    await dp.start_polling(bot)
+    try:
+        if WEBHOOK_URL:
+            await run_webhook(dp, bot, WEBHOOK_URL, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET)
+        else:
+            await run_polling(dp, bot)
+    finally:
+        await sampler.stop()
+        archive.close()
+        # Задачи /exec и /logs follow не переживают бота: их процессы убиваются.
+        # Их последние правки ещё идут через очередь, поэтому она останавливается после
+        await jobs.shutdown()
+        await follows.shutdown()
+        await outbox.stop()
+        offload.shutdown()
+        await audit_writer.stop()
+        db.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,21 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from database.database import get_role
+
+class AuthMiddleware(BaseMiddleware):
+    """
+    Определяет роль пользователя один раз на апдейт и передаёт её
+    в хендлеры аргументом `role` (ROLE_ADMIN, ROLE_USER или None).
+    Роль берётся из кэша белого списка, без обращения к БД.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        data["role"] = get_role(user.id) if user else None
+        return await handler(event, data)
@@ -0,0 +1,189 @@
+import operator
+import re
+from config.config import (
+    ALERT_COOLDOWN, ALERT_DURATION, ALERT_RULES,
+    CPU_THRESHOLD, DISK_THRESHOLD, MEMORY_THRESHOLD, NET_EGRESS_DURATION, NET_EGRESS_THRESHOLD,
+)
+from utils.timeseries import METRICS, format_duration, format_value, parse_duration
+
+# Метрики по каждой файловой системе: значение берётся из snapshot["mounts"]
+MOUNT_METRICS = {
+    "disk": ("Диск", "%", "percent"),
+    "inodes": ("Inode", "%", "inodes_percent"),
+}
+
+COMPARATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+RULE_RE = re.compile(r"(\w+)\s*(>=|<=|>|<)\s*([\d.]+)")
+
+class AlertRule:
+    """
+    Правило уведомления: `metric op threshold` держится не меньше duration секунд.
+    Снимается, когда значение пересекает recovery (по умолчанию - сам порог),
+    поэтому колебания между recovery и threshold не дают новых уведомлений.
+    Повторно правило срабатывает не раньше чем через cooldown секунд.
+    """
+
+    def __init__(self, metric: str, op: str, threshold: float, duration: int = 0,
+                 recovery: float = None, cooldown: int = ALERT_COOLDOWN):
+        if metric not in METRICS and metric not in MOUNT_METRICS:
+            raise ValueError(f"неизвестная метрика {metric}")
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.duration = duration
+        self.recovery = threshold if recovery is None else recovery
+        self.cooldown = cooldown
+        self._compare = COMPARATORS[op]
+        # Условие восстановления - строго по другую сторону от recovery
+        self._recovered = operator.lt if op in (">", ">=") else operator.gt
+
+    @property
+    def name(self) -> str:
+        return f"{self.metric}{self.op}{self.threshold:g}"
+
+    def values(self, snapshot: dict) -> dict:
+        """Значения метрики из снимка: {точка монтирования или "": значение}"""
+        if self.metric in MOUNT_METRICS:
+            field = MOUNT_METRICS[self.metric][2]
+            return {m["mountpoint"]: m[field] for m in snapshot.get("mounts", ())}
+        value = snapshot.get(self.metric)
+        if self.metric == "load" and value is not None:
+            value = value[0]
+        return {} if value is None else {"": value}
+
+    def breached(self, value: float) -> bool:
+        return self._compare(value, self.threshold)
+
+    def recovered(self, value: float) -> bool:
+        return self._recovered(value, self.recovery)
+
+    def describe(self, key: str) -> tuple:
+        """(название, единица) метрики для текста уведомления"""
+        title, unit = METRICS[self.metric] if self.metric in METRICS else MOUNT_METRICS[self.metric][:2]
+        return (f"{title} {key}" if key else title), unit
+
+def parse_rule(text: str) -> AlertRule:
+    """
+    Разбирает правило вида `cpu>90 for=5m recover=80 cooldown=30m`.
+    Параметры после условия необязательны.
+    """
+    condition, *options = text.split()
+    match = RULE_RE.fullmatch(condition)
+    if not match:
+        raise ValueError(text)
+    metric, op, threshold = match.groups()
+    kwargs = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        if key == "for":
+            kwargs["duration"] = parse_duration(value)
+        elif key == "cooldown":
+            kwargs["cooldown"] = parse_duration(value)
+        elif key == "recover":
+            kwargs["recovery"] = float(value)
+        else:
+            raise ValueError(option)
+    return AlertRule(metric, op, float(threshold), **kwargs)
+
+def parse_rules(text: str) -> list:
+    """Правила через `;`, например из переменной окружения ALERT_RULES"""
+    return [parse_rule(part) for part in text.split(";") if part.strip()]
+
+def default_rules() -> list:
+    """Правила из порогов CPU_THRESHOLD, MEMORY_THRESHOLD и DISK_THRESHOLD"""
+    return [
+        AlertRule("cpu", ">", CPU_THRESHOLD, ALERT_DURATION, recovery=CPU_THRESHOLD - 10),
+        AlertRule("memory", ">", MEMORY_THRESHOLD, ALERT_DURATION, recovery=MEMORY_THRESHOLD - 5),
+        # Заполнение диска растёт медленно и не скачет - достаточно минуты
+        AlertRule("disk", ">", DISK_THRESHOLD, 60, recovery=DISK_THRESHOLD - 2),
+        AlertRule("inodes", ">", DISK_THRESHOLD, 60, recovery=DISK_THRESHOLD - 2),
+    ]
+
+class AlertState:
+    __slots__ = ("since", "firing", "last_fired")
+
+    def __init__(self):
+        # Когда условие начало выполняться без перерыва, иначе None
+        self.since = None
+        self.firing = False
+        self.last_fired = None
+
+class AlertEngine:
+    """
+    Инкрементальная проверка правил по каждому снимку сборщика:
+    на снимок - одно сравнение на правило и файловую систему, без истории.
+    evaluate() возвращает события [("fired" | "resolved", правило, ключ, значение)].
+    """
+
+    def __init__(self, rules: list):
+        self.rules = rules
+        self._states = {}
+
+    def evaluate(self, snapshot: dict) -> list:
+        now = snapshot["time"]
+        events = []
+        seen = set()
+        # Состояние - по номеру правила: у одинаковых условий с разными for/cooldown свои таймеры
+        for index, rule in enumerate(self.rules):
+            for key, value in rule.values(snapshot).items():
+                seen.add((index, key))
+                state = self._states.get((index, key))
+                if state is None:
+                    state = self._states[(index, key)] = AlertState()
+                event = self._step(rule, state, value, now)
+                if event:
+                    events.append((event, rule, key, value))
+        # Отмонтированные файловые системы больше не проверяются
+        for gone in self._states.keys() - seen:
+            del self._states[gone]
+        return events
+
+    @staticmethod
+    def _step(rule: AlertRule, state: AlertState, value: float, now: float):
+        if state.firing:
+            if rule.recovered(value):
+                state.firing = False
+                state.since = None
+                return "resolved"
+            return None
+        if not rule.breached(value):
+            state.since = None
+            return None
+        if state.since is None:
+            state.since = now
+        if now - state.since < rule.duration:
+            return None
+        if state.last_fired is not None and now - state.last_fired < rule.cooldown:
+            return None
+        state.firing = True
+        state.last_fired = now
+        return "fired"
+
+    def active(self) -> list:
+        """Сработавшие и ещё не снятые правила: [(имя правила, ключ)]"""
+        return [(self.rules[index].name, key) for (index, key), state in self._states.items() if state.firing]
+
+def format_event(event: str, rule: AlertRule, key: str, value: float) -> str:
+    title, unit = rule.describe(key)
+    if event == "fired":
+        text = f"⚠️ {title}: {format_value(value, unit)} ({rule.op} {format_value(rule.threshold, unit)}"
+        if rule.duration:
+            text += f" дольше {format_duration(rule.duration)}"
+        return text + ")"
+    return f"✅ {title}: {format_value(value, unit)} - снова в норме"
+
+def egress_rule() -> AlertRule | None:
+    """Исходящий трафик выше NET_EGRESS_THRESHOLD Мбит/с дольше NET_EGRESS_DURATION секунд"""
+    if NET_EGRESS_THRESHOLD <= 0:
+        return None
+    threshold = NET_EGRESS_THRESHOLD * 1_000_000 / 8
+    return AlertRule("net_tx", ">", threshold, NET_EGRESS_DURATION, recovery=threshold * 0.8)
+
+def load_rules() -> list:
+    rules = parse_rules(ALERT_RULES) if ALERT_RULES else default_rules()
+    # Порог трафика задаётся отдельно и действует, если в ALERT_RULES нет своего правила net_tx
+    egress = egress_rule()
+    if egress is not None and not any(rule.metric == "net_tx" for rule in rules):
+        rules.append(egress)
+    return rules
@@ -1,19 +1,15 @@
 # utils/backup.py
 import os
-import tarfile
 from datetime import datetime
 from config.config import BACKUP_STORAGE_PATH
 import logging
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from email.mime.text import MIMEText
-import ssl
-import requests
+# tarfile, smtplib, email, ssl и requests импортируются в функциях:
+# бэкапы редки, а эти модули заметно замедляют запуск бота
 
 def create_backup():
     """Создаёт бэкап директории /home/mrk/, исключая папку backup и саму папку backups."""
+    import tarfile
+
     try:
         # Создаём директорию для бэкапов
         os.makedirs(BACKUP_STORAGE_PATH, exist_ok=True)
@@ -70,6 +66,12 @@ def list_backups():
 
 def send_backup_via_email(file_path, recipient_email):
     """Отправляет файл бэкапа по электронной почте через Yandex SMTP."""
+    import smtplib
+    import ssl
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
     from config.config import EMAIL_CONFIG # Импортируем настройки почты
 
     if not EMAIL_CONFIG:
@@ -110,6 +112,8 @@ def send_backup_via_email(file_path, recipient_email):
 
 def upload_to_yandex_disk(file_path, token):
     """Загружает файл на Яндекс.Диск и возвращает публичную ссылку."""
+    import requests
+
     try:
         # 1. Получаем URL для загрузки
         upload_url = "https://cloud-api.yandex.net/v1/disk/resources/upload"
@@ -147,6 +151,10 @@ def upload_to_yandex_disk(file_path, token):
 # Обновите send_backup_via_email или создайте новую функцию
 def send_backup_link_via_email(file_path, recipient_email, download_link):
     """Отправляет ссылку на бэкап по электронной почте."""
+    import smtplib
+    import ssl
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
     from config.config import EMAIL_CONFIG
 
     if not EMAIL_CONFIG:
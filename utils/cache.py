@@ -0,0 +1,76 @@
+import asyncio
+import time
+from config.config import RESPONSE_CACHE_TTL
+
+class ResponseCache:
+    """
+    Кэш ответов команд только для чтения с объединением одновременных запросов.
+
+    Ключ - кортеж, первый элемент которого - имя команды: ("connections", фильтры).
+    Пока значение считается, остальные запросы с тем же ключом ждут ту же
+    задачу; готовое значение живёт ttl секунд. Вычисление идёт отдельной
+    задачей, поэтому отмена одного хендлера не прерывает его для остальных.
+    Ошибки не кэшируются. Изменяющие действия вызывают invalidate(команда).
+    Просроченные значения удаляются при чтении и при каждом сохранении.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._values = {}
+        self._inflight = {}
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.invalidations = 0
+
+    async def get(self, key: tuple, compute, ttl: float = None):
+        """Значение по ключу; compute - корутинная функция без аргументов"""
+        cached = self._values.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.hits += 1
+                return cached[1]
+            del self._values[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            task = self._inflight[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda t: self._store(key, t, self.ttl if ttl is None else ttl))
+        return await asyncio.shield(task)
+
+    def _store(self, key: tuple, task: asyncio.Future, ttl: float):
+        # Вычисление, начатое до invalidate, уже не в _inflight - его результат не сохраняем
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        now = time.monotonic()
+        # Просроченные значения других ключей, которые больше не запрашивали
+        for stale in [k for k, (expires, _) in self._values.items() if expires <= now]:
+            del self._values[stale]
+        if ttl > 0:
+            self._values[key] = (now + ttl, task.result())
+
+    def invalidate(self, *commands: str):
+        """Сбрасывает все ключи указанных команд"""
+        self.invalidations += 1
+        for store in (self._values, self._inflight):
+            for key in [k for k in store if k[0] in commands]:
+                del store[key]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "invalidations": self.invalidations,
+            "entries": sum(1 for expires, _ in self._values.values() if expires > now),
+        }
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL)
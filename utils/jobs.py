@@ -0,0 +1,183 @@
+import asyncio
+import codecs
+import itertools
+import subprocess
+import time
+from collections import OrderedDict
+from config.config import EXEC_TIMEOUT, EXEC_USER_JOBS
+from utils.offload import offload
+from utils.output_store import output_store
+
+# Сколько последних символов вывода задачи держать для показа
+OUTPUT_TAIL = 16384
+# Сколько завершённых задач помнить для /jobs
+FINISHED_HISTORY = 20
+
+STATUS_LABELS = {
+    "queued": "⏳ в очереди",
+    "running": "▶️ выполняется",
+    "done": "✅ завершена",
+    "failed": "❌ завершена с ошибкой",
+    "timeout": "⏱ остановлена по таймауту",
+    "cancelled": "⛔ отменена",
+}
+
+class Job:
+    """Задача /exec: shell-команда в своей группе процессов и хвост её вывода"""
+
+    def __init__(self, job_id: int, command: str, user_id: int):
+        self.id = job_id
+        self.command = command
+        self.user_id = user_id
+        self.status = "queued"
+        self.returncode = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output_bytes = 0
+        # Полный вывод для постраничного просмотра, хвост - для обновляемого сообщения
+        self.stored = output_store.create(f"⚙️ Задача {job_id}")
+        self.stored.write(f"$ {command}\n")
+        self._tail = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._changed = asyncio.Event()
+        self._task = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def output(self) -> str:
+        """Последние OUTPUT_TAIL символов вывода"""
+        return self._tail
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def _on_start(self):
+        self.status = "running"
+        self.started = time.time()
+        self._changed.set()
+
+    def _on_output(self, chunk: bytes):
+        self.output_bytes += len(chunk)
+        text = self._decoder.decode(chunk)
+        self.stored.write(text)
+        self._tail = (self._tail + text)[-OUTPUT_TAIL:]
+        self._changed.set()
+
+    def _finish(self, status: str, returncode: int = None):
+        text = self._decoder.decode(b"", final=True)
+        self.stored.write(text)
+        self.stored.close()
+        self._tail = (self._tail + text)[-OUTPUT_TAIL:]
+        self.status = status
+        self.returncode = returncode
+        self.finished = time.time()
+        if self.started is None:
+            self.started = self.finished
+        self._changed.set()
+
+    def _on_done(self, task: asyncio.Task):
+        # Задача, отменённая до первого шага, не успевает отметить себя в _run
+        if self.active:
+            self._finish("cancelled")
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Ждёт изменения вывода или статуса не дольше timeout; False, если изменений не было"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+    async def wait_done(self, timeout: float = None) -> bool:
+        """Ждёт завершения задачи не дольше timeout; False, если она ещё выполняется"""
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+class JobManager:
+    """
+    Фоновые задачи /exec. Команда выполняется через offload.stream в категории
+    exec, поэтому долгая задача не занимает слоты обычных команд; на пользователя -
+    не больше user_jobs активных задач. По таймауту или отмене группа процессов убивается.
+    """
+
+    def __init__(self, timeout: float, user_jobs: int):
+        self.timeout = timeout
+        self.user_jobs = user_jobs
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+
+    def start(self, command: str, user_id: int) -> Job:
+        """Запускает задачу; ValueError, если у пользователя уже user_jobs активных задач"""
+        if sum(1 for job in self._jobs.values() if job.user_id == user_id and job.active) >= self.user_jobs:
+            raise ValueError(f"не больше {self.user_jobs} задач одновременно")
+        job = Job(next(self._ids), command, user_id)
+        job._task = asyncio.create_task(self._run(job))
+        job._task.add_done_callback(job._on_done)
+        self._jobs[job.id] = job
+        self._trim()
+        return job
+
+    async def _run(self, job: Job):
+        try:
+            returncode = await offload.stream(
+                job.command, job._on_output, shell=True, on_start=job._on_start,
+                timeout=self.timeout, category="exec",
+            )
+        except subprocess.TimeoutExpired:
+            job._finish("timeout")
+        except asyncio.CancelledError:
+            job._finish("cancelled")
+        except Exception as e:
+            job._on_output(f"\n{e}\n".encode())
+            job._finish("failed")
+        else:
+            job._finish("done" if returncode == 0 else "failed", returncode)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - FINISHED_HISTORY)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: int) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def recent(self) -> list:
+        """Активные задачи, затем завершённые, от новых к старым"""
+        jobs = list(reversed(self._jobs.values()))
+        return [job for job in jobs if job.active] + [job for job in jobs if not job.active]
+
+    def cancel(self, job_id: int) -> bool:
+        """Отменяет задачу; False, если её нет или она уже завершена"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job._task.cancel()
+        return True
+
+    async def shutdown(self):
+        """Отменяет все задачи и ждёт завершения их процессов"""
+        tasks = [job._task for job in self._jobs.values() if job.active]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        jobs = list(self._jobs.values())
+        return {
+            "running": sum(1 for job in jobs if job.status == "running"),
+            "queued": sum(1 for job in jobs if job.status == "queued"),
+            "finished": sum(1 for job in jobs if not job.active),
+        }
+
+jobs = JobManager(EXEC_TIMEOUT, EXEC_USER_JOBS)
@@ -0,0 +1,124 @@
+import os
+import re
+import psutil
+from utils.offload import offload
+
+# Сколько ждать завершения после SIGTERM и после SIGKILL, секунд
+TERM_TIMEOUT = 5
+KILL_TIMEOUT = 3
+
+# Итог по каждому процессу: (значок, описание)
+OUTCOMES = {
+    "terminated": ("✅", "завершён (SIGTERM)"),
+    "killed": ("💀", "убит (SIGKILL)"),
+    "gone": ("➖", "уже завершён"),
+    "denied": ("⛔", "нет прав"),
+    "alive": ("⚠️", "не завершился"),
+}
+
+def protected_pids() -> set:
+    """init, kthreadd, сам бот и его предки: их завершение уронит бота или систему"""
+    pids = {0, 1, 2, os.getpid()}
+    try:
+        pids.update(p.pid for p in psutil.Process().parents())
+    except psutil.Error:
+        pass
+    return pids
+
+def _is_kernel_thread(proc: psutil.Process) -> bool:
+    try:
+        return proc.ppid() == 2
+    except psutil.Error:
+        return False
+
+def process_tree(pid: int) -> list:
+    """Процесс и все его потомки; потомки идут первыми, чтобы родитель не перезапустил их"""
+    proc = psutil.Process(pid)
+    return proc.children(recursive=True)[::-1] + [proc]
+
+def match_processes(name: str = None, cmdline: str = None, user: str = None) -> list:
+    """
+    Процессы, подходящие под все заданные условия: name и cmdline -
+    регулярные выражения (без учёта регистра), user - точное имя.
+    """
+    name_re = re.compile(name, re.IGNORECASE) if name else None
+    cmd_re = re.compile(cmdline, re.IGNORECASE) if cmdline else None
+    matched = []
+    for proc in psutil.process_iter(["name", "cmdline", "username"]):
+        info = proc.info
+        if name_re and not name_re.search(info["name"] or ""):
+            continue
+        if cmd_re and not cmd_re.search(" ".join(info["cmdline"] or ())):
+            continue
+        if user and info["username"] != user:
+            continue
+        matched.append(proc)
+    return matched
+
+def filter_protected(procs: list) -> tuple:
+    """Разделяет процессы на разрешённые к завершению и защищённые"""
+    protected = protected_pids()
+    allowed, skipped = [], []
+    for proc in procs:
+        if proc.pid in protected or _is_kernel_thread(proc):
+            skipped.append(proc)
+        else:
+            allowed.append(proc)
+    return allowed, skipped
+
+def terminate(procs: list, term_timeout: float = TERM_TIMEOUT, kill_timeout: float = KILL_TIMEOUT) -> list:
+    """
+    Отправляет SIGTERM всем процессам, ждёт их одновременно через
+    psutil.wait_procs и добивает оставшихся SIGKILL. Блокирующий вызов:
+    из обработчиков - только через terminate_async.
+    Возвращает [(pid, имя, итог)] с итогами из OUTCOMES.
+    """
+    results = {}
+    names = {}
+    signalled = []
+    for proc in procs:
+        try:
+            names[proc.pid] = proc.name()
+            proc.terminate()
+            signalled.append(proc)
+        except psutil.NoSuchProcess:
+            results[proc.pid] = "gone"
+        except psutil.AccessDenied:
+            results[proc.pid] = "denied"
+
+    gone, alive = psutil.wait_procs(signalled, timeout=term_timeout)
+    for proc in gone:
+        results[proc.pid] = "terminated"
+
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            results[proc.pid] = "terminated"
+        except psutil.AccessDenied:
+            results[proc.pid] = "denied"
+    alive = [proc for proc in alive if proc.pid not in results]
+    gone, alive = psutil.wait_procs(alive, timeout=kill_timeout)
+    for proc in gone:
+        results[proc.pid] = "killed"
+    for proc in alive:
+        results[proc.pid] = "alive"
+
+    return [(proc.pid, names.get(proc.pid, "?"), results[proc.pid]) for proc in procs]
+
+async def terminate_async(procs: list, user_id: int = None, **kwargs) -> list:
+    """terminate() вне event loop: ожидание до TERM_TIMEOUT + KILL_TIMEOUT секунд не блокирует бота"""
+    return await offload.run("io", terminate, procs, user_id=user_id, **kwargs)
+
+def format_results(results: list, skipped: list = ()) -> str:
+    """Одно сообщение с итогом по каждому PID и сводкой"""
+    counts = {}
+    lines = []
+    for pid, name, outcome in results:
+        icon, text = OUTCOMES[outcome]
+        counts[outcome] = counts.get(outcome, 0) + 1
+        lines.append(f"{icon} {pid} {name} - {text}")
+    for proc in skipped:
+        lines.append(f"🛡 {proc.pid} - защищён, пропущен")
+    summary = ", ".join(f"{OUTCOMES[o][1]}: {n}" for o, n in counts.items())
+    return "\n".join(lines) + (f"\n\nИтого: {summary}" if summary else "")
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import json
+import os
+import re
+import shutil
+import time
+from config.config import LOG_FOLLOW_FILE, LOG_FOLLOW_IDLE, LOG_FOLLOW_MAX
+from utils.offload import offload
+from utils.output_store import output_store
+from utils.system_monitor import LOG_FILES
+
+# Сколько последних символов держать для обновляемого сообщения
+TAIL_CHARS = 16384
+# Период опроса файла журнала, секунд
+FILE_POLL_INTERVAL = 0.5
+# Сколько байт файла читать за один опрос
+FILE_READ_LIMIT = 1024 * 1024
+
+STOP_REASONS = {
+    "idle": "нет новых строк",
+    "limit": "лимит времени",
+    "stopped": "остановлено",
+    "failed": "ошибка источника",
+}
+
+def compile_pattern(pattern: str):
+    """Регулярное выражение без учёта регистра; некорректное - ищется как подстрока"""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(pattern), re.IGNORECASE)
+
+def format_entry(data: bytes) -> str:
+    """Строка из записи `journalctl -o json`; не-JSON (ошибки journalctl) - как есть"""
+    try:
+        entry = json.loads(data)
+    except ValueError:
+        return data.decode(errors="replace")
+    message = entry.get("MESSAGE", "")
+    # Бинарные сообщения journalctl отдаёт списком байтов
+    if isinstance(message, list):
+        message = bytes(message).decode(errors="replace")
+    stamp = time.strftime("%H:%M:%S", time.localtime(int(entry.get("__REALTIME_TIMESTAMP", 0)) / 1e6))
+    ident = entry.get("SYSLOG_IDENTIFIER") or entry.get("_SYSTEMD_UNIT") or entry.get("_COMM", "")
+    return f"{stamp} {ident}: {message}"
+
+class _FileTail:
+    """Чтение дописанного в файл, как `tail -F`: старый файл дочитывается до конца, затем открывается новый"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        # Показываем только новые строки
+        self._file.seek(0, os.SEEK_END)
+
+    def read(self) -> bytes:
+        data = self._file.read(FILE_READ_LIMIT)
+        if data:
+            return data
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Файл переименован, новый ещё не создан
+            return b""
+        if stat.st_ino != os.fstat(self._file.fileno()).st_ino:
+            self._file.close()
+            self._file = open(self.path, "rb")
+        elif stat.st_size < self._file.tell():
+            # Файл усечён (logrotate copytruncate)
+            self._file.seek(0)
+        return self._file.read(FILE_READ_LIMIT)
+
+    def close(self):
+        self._file.close()
+
+class LogFollow:
+    """
+    Живой хвост журнала для /logs follow: `journalctl -f -o json` или опрос файла.
+
+    Строки фильтруются по мере поступления (unit и регулярное выражение),
+    совпавшие копятся в хвосте для сообщения и целиком - в output_store.
+    Останавливается, если новых строк нет idle секунд, через max_duration
+    секунд или по stop().
+    """
+
+    def __init__(self, follow_id: int, chat_id: int, unit: str = None, pattern: str = None,
+                 path: str = None, idle: float = LOG_FOLLOW_IDLE, max_duration: float = LOG_FOLLOW_MAX):
+        self.id = follow_id
+        self.chat_id = chat_id
+        self.unit = unit
+        self.pattern = pattern
+        self.path = path
+        self.idle = idle
+        self.max_duration = max_duration
+        self.status = "running"
+        self.error = None
+        self.seen = 0
+        self.matched = 0
+        self.started = time.monotonic()
+        self.last_line = self.started
+        self.title = "📡 Журнал" + (f" {unit}" if unit else "") + (f" · {pattern}" if pattern else "")
+        self.stored = output_store.create(self.title)
+        self._regex = compile_pattern(pattern) if pattern else None
+        self._tail = ""
+        self._changed = asyncio.Event()
+        self._task = None
+
+    @property
+    def active(self) -> bool:
+        return self.status == "running"
+
+    @property
+    def output(self) -> str:
+        return self._tail
+
+    @property
+    def source(self) -> str:
+        return self.path or "journalctl"
+
+    def _on_line(self, line: str):
+        self.seen += 1
+        # Для файла unit - подстрока строки syslog (`nginx[123]:`)
+        if self.path and self.unit and self.unit not in line:
+            return
+        if self._regex is not None and not self._regex.search(line):
+            return
+        self.matched += 1
+        self.last_line = time.monotonic()
+        self.stored.write(line + "\n")
+        self._tail = (self._tail + line + "\n")[-TAIL_CHARS:]
+        self._changed.set()
+
+    async def _journal(self):
+        args = ["journalctl", "-f", "-o", "json", "-n", "0"]
+        if self.unit:
+            args += ["-u", self.unit]
+        buffer = b""
+
+        def on_output(chunk: bytes):
+            nonlocal buffer
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                if line:
+                    self._on_line(format_entry(line))
+
+        returncode = await offload.stream(args, on_output, timeout=None, category="follow")
+        if buffer:
+            self._on_line(format_entry(buffer))
+        raise RuntimeError(f"journalctl завершился с кодом {returncode}")
+
+    async def _file(self):
+        tail = await offload.run("io", _FileTail, self.path)
+        buffer = b""
+        try:
+            while True:
+                data = await offload.run("io", tail.read)
+                if data:
+                    *lines, buffer = (buffer + data).split(b"\n")
+                    for line in lines:
+                        self._on_line(line.decode(errors="replace"))
+                if len(data) < FILE_READ_LIMIT:
+                    await asyncio.sleep(FILE_POLL_INTERVAL)
+        finally:
+            tail.close()
+
+    async def _run(self):
+        source = asyncio.ensure_future(self._file() if self.path else self._journal())
+        try:
+            while True:
+                now = time.monotonic()
+                if now - self.started >= self.max_duration:
+                    self.status = "limit"
+                    break
+                remaining = min(self.last_line + self.idle, self.started + self.max_duration) - now
+                if remaining <= 0:
+                    self.status = "idle"
+                    break
+                await asyncio.wait({source}, timeout=remaining)
+                if source.done():
+                    self.status = "failed"
+                    self.error = str(source.exception())
+                    break
+        except asyncio.CancelledError:
+            self.status = "stopped"
+        finally:
+            # Отмена источника убивает journalctl вместе с группой процессов
+            source.cancel()
+            await asyncio.gather(source, return_exceptions=True)
+            if self.active:
+                self.status = "stopped"
+            self.stored.close()
+            self._changed.set()
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Ждёт новых строк или остановки не дольше timeout; False, если изменений не было"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+class LogFollowManager:
+    """Активные /logs follow: не больше одного на чат, новый останавливает прежний"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._ids = itertools.count(1)
+        self._follows = {}
+
+    def _source_path(self) -> str | None:
+        """Файл для опроса или None для journalctl"""
+        if self.path:
+            return self.path
+        if shutil.which("journalctl"):
+            return None
+        for log_file in LOG_FILES:
+            if os.access(log_file, os.R_OK):
+                return log_file
+        raise FileNotFoundError("нет ни journalctl, ни доступного файла журнала")
+
+    def start(self, chat_id: int, unit: str = None, pattern: str = None, **kwargs) -> LogFollow:
+        for follow in self._follows.values():
+            if follow.chat_id == chat_id:
+                follow._task.cancel()
+        follow = LogFollow(next(self._ids), chat_id, unit, pattern, path=self._source_path(), **kwargs)
+        follow._task = asyncio.create_task(follow._run())
+        follow._task.add_done_callback(lambda _: self._finished(follow))
+        self._follows[follow.id] = follow
+        return follow
+
+    def _finished(self, follow: LogFollow):
+        self._follows.pop(follow.id, None)
+        # Слежение, отменённое до первого шага, не успевает отметить себя в _run
+        if follow.active:
+            follow.status = "stopped"
+            follow.stored.close()
+            follow._changed.set()
+
+    def stop(self, follow_id: int) -> bool:
+        """Останавливает слежение; False, если его нет или оно уже закончилось"""
+        follow = self._follows.get(follow_id)
+        if follow is None:
+            return False
+        follow._task.cancel()
+        return True
+
+    async def shutdown(self):
+        tasks = [follow._task for follow in self._follows.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+follows = LogFollowManager(LOG_FOLLOW_FILE)
@@ -1,56 +1,67 @@
 # utils/notifications.py
-import psutil
 import asyncio
 from config.config import ADMIN_ID
-from database.database import is_user_allowed
+from utils.alerts import AlertEngine, format_event, load_rules
+from utils.outbox import PRIORITY_ALERT, priority
+from utils.timeseries import format_duration, format_value
+from utils.usage import usage_store
+
+# За какой период искать виновников в уведомлениях о CPU и RAM, секунд
+OFFENDERS_WINDOW = 300
+# Для каких правил добавлять топ процессов: метрика -> ключ usage_store
+OFFENDER_KEYS = {"cpu": "cpu", "memory": "rss"}
 
 class SystemMonitor:
-    def __init__(self, bot):
+    def __init__(self, bot, rules=None):
         self.bot = bot
-        self.last_notification = {}
-        self.thresholds = {
-            'cpu': 80,      # % CPU
-            'memory': 85,   # % RAM
-            'disk': 90      # % диск
-        }
-
-    async def check_system_load(self):
-        """Проверяет нагрузку на систему и отправляет уведомления"""
-        try:
-            # Проверяем CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
-            if cpu_percent > self.thresholds['cpu']:
-                await self.send_notification("cpu", f"⚠️ Высокая нагрузка CPU: {cpu_percent}%")
+        # Пороги CPU/RAM/дисков/трафика - правила из config (ALERT_RULES или *_THRESHOLD)
+        self.alerts = AlertEngine(load_rules() if rules is None else rules)
+        # Ссылки на задачи отправки, чтобы их не собрал сборщик мусора до завершения
+        self._tasks = set()
 
-            # Проверяем память
-            memory = psutil.virtual_memory()
-            if memory.percent > self.thresholds['memory']:
-                await self.send_notification("memory", f"⚠️ Высокое использование памяти: {memory.percent}%")
+    def on_snapshot(self, snapshot: dict):
+        """
+        Проверяет правила по каждому снимку сборщика (sampler.add_listener).
+        Отправка идёт отдельной задачей, чтобы не задерживать сбор метрик.
+        """
+        for event, rule, key, value in self.alerts.evaluate(snapshot):
+            text = format_event(event, rule, key, value)
+            if event == "fired" and rule.metric in OFFENDER_KEYS:
+                text += self.format_offenders(OFFENDER_KEYS[rule.metric])
+            elif event == "fired" and rule.metric == "net_tx":
+                text += self.format_interfaces(snapshot)
+            task = asyncio.create_task(self.send_message(text))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
 
-            # Проверяем диск
-            disk = psutil.disk_usage('/')
-            disk_percent = (disk.used / disk.total) * 100
-            if disk_percent > self.thresholds['disk']:
-                await self.send_notification("disk", f"⚠️ Мало свободного места на диске: {disk_percent:.1f}%")
+    def format_offenders(self, key: str) -> str:
+        """Топ-3 процесса за последние минуты, чтобы виновник был виден даже после завершения"""
+        top = usage_store.top(OFFENDERS_WINDOW, key, 3)
+        if not top:
+            return ""
+        text = f"\nТоп процессов за {format_duration(OFFENDERS_WINDOW)}:"
+        for record, (cpu, rss, _) in top:
+            value = f"{cpu:.0f} с CPU" if key == "cpu" else f"пик {format_value(rss, 'B')}"
+            text += f"\n  {record.name} ({record.pid}) - {value}"
+            if not record.alive:
+                text += ", завершён"
+        return text
 
-        except Exception as e:
-            print(f"Ошибка мониторинга: {e}")
+    def format_interfaces(self, snapshot: dict) -> str:
+        """Скорость передачи и топ-3 интерфейса по исходящему трафику"""
+        text = f" ({snapshot['net_tx'] * 8 / 1_000_000:.1f} Мбит/с)"
+        interfaces = sorted(
+            snapshot.get("interfaces", {}).items(),
+            key=lambda item: item[1]["bytes_sent"], reverse=True
+        )
+        for name, rates in interfaces[:3]:
+            if not name.startswith("lo") and rates["bytes_sent"] > 0:
+                text += f"\n  {name}: ↑ {format_value(rates['bytes_sent'], 'B/s')}"
+        return text
 
-    async def send_notification(self, alert_type: str, message: str):
-        """Отправляет уведомление админу, если прошло достаточно времени"""
-        current_time = asyncio.get_event_loop().time()
-        last_time = self.last_notification.get(alert_type, 0)
-        
-        # Отправляем уведомление не чаще чем раз в 10 минут
-        if current_time - last_time > 600:  # 600 секунд = 10 минут
-            try:
+    async def send_message(self, message: str):
+        try:
+            with priority(PRIORITY_ALERT):
                 await self.bot.send_message(ADMIN_ID, message)
-                self.last_notification[alert_type] = current_time
-            except Exception as e:
-                print(f"Ошибка отправки уведомления: {e}")
-
-    async def start_monitoring(self):
-        """Запускает периодический мониторинг"""
-        while True:
-            await self.check_system_load()
-            await asyncio.sleep(60)  # Проверяем каждую минуту
+        except Exception as e:
+            print(f"Ошибка отправки уведомления: {e}")
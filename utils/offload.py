@@ -0,0 +1,211 @@
+import asyncio
+import functools
+import os
+import signal
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from config.config import COMMAND_TIMEOUT, OFFLOAD_LIMITS, OFFLOAD_USER_LIMIT
+
+# Категории, которые выполняются в пуле потоков (остальные - команды и пул процессов)
+THREAD_CATEGORIES = ("scan", "io")
+
+class Offload:
+    """
+    Единая точка для блокирующей работы из хендлеров.
+
+    - run(category, func, ...) - функция в пуле потоков (чтение /proc, файлы, сеть);
+    - run_cpu(func, ...) - функция в пуле процессов (сжатие бэкапа);
+    - command(args, ...) - внешняя команда через asyncio-подпроцесс;
+    - stream(args, on_output, ...) - то же с выводом по мере появления (/exec).
+
+    На каждую категорию - свой лимит одновременных задач (OFFLOAD_LIMITS),
+    на пользователя - OFFLOAD_USER_LIMIT задач сразу, чтобы один пользователь
+    не занял все слоты. Ожидание слотов - в порядке очереди.
+    По таймауту или отмене хендлера команда убивается вместе с группой
+    процессов; функцию в потоке прервать нельзя, поэтому её слот
+    освобождается только после её фактического завершения.
+    """
+
+    def __init__(self, limits: dict, user_limit: int):
+        self.limits = limits
+        self.user_limit = user_limit
+        self._slots = {name: asyncio.Semaphore(limit) for name, limit in limits.items()}
+        self._users = {}
+        # Пулы создаются при первой задаче: большинству запусков пул процессов
+        # (и импорт multiprocessing) не нужен вовсе
+        self._threads = None
+        self._processes = None
+        # Метрики по категориям
+        self.running = dict.fromkeys(limits, 0)
+        self.waiting = dict.fromkeys(limits, 0)
+        self.completed = dict.fromkeys(limits, 0)
+        self.timeouts = dict.fromkeys(limits, 0)
+
+    async def _acquire(self, category: str, user_id):
+        """Занимает слот пользователя, затем категории; возвращает функцию освобождения"""
+        user_slot = None
+        if user_id is not None:
+            user_slot = self._users.get(user_id)
+            if user_slot is None:
+                user_slot = self._users[user_id] = asyncio.Semaphore(self.user_limit)
+        slot = self._slots[category]
+        self.waiting[category] += 1
+        try:
+            if user_slot is not None:
+                await user_slot.acquire()
+            try:
+                await slot.acquire()
+            except BaseException:
+                if user_slot is not None:
+                    user_slot.release()
+                raise
+        finally:
+            self.waiting[category] -= 1
+        self.running[category] += 1
+
+        def release(*_):
+            self.running[category] -= 1
+            self.completed[category] += 1
+            slot.release()
+            if user_slot is not None:
+                user_slot.release()
+        return release
+
+    async def _run_in(self, executor, category: str, func, args, kwargs, user_id, timeout):
+        release = await self._acquire(category, user_id)
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        except BaseException:
+            release()
+            raise
+        # Слот держится до конца работы, даже если ждать результата перестали
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts[category] += 1
+            raise
+
+    async def run(self, category: str, func, *args, user_id=None, timeout=None, **kwargs):
+        """func(*args, **kwargs) в пуле потоков, category - scan или io"""
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=sum(self.limits[name] for name in THREAD_CATEGORIES), thread_name_prefix="offload"
+            )
+        return await self._run_in(self._threads, category, func, args, kwargs, user_id, timeout)
+
+    async def run_cpu(self, func, *args, user_id=None, timeout=None, **kwargs):
+        """func(*args, **kwargs) в пуле процессов: func и аргументы должны сериализоваться pickle"""
+        if self._processes is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._processes = ProcessPoolExecutor(max_workers=self.limits["cpu"])
+        return await self._run_in(self._processes, "cpu", func, args, kwargs, user_id, timeout)
+
+    async def command(self, args, *, shell: bool = False, input: str = None, check: bool = False,
+                      merge_stderr: bool = False, user_id=None, timeout: float = COMMAND_TIMEOUT,
+                      category: str = "command") -> subprocess.CompletedProcess:
+        """
+        Внешняя команда без блокировки event loop, по смыслу как subprocess.run(text=True):
+        возвращает CompletedProcess, при check=True бросает CalledProcessError,
+        по таймауту убивает команду и бросает subprocess.TimeoutExpired.
+        """
+        release = await self._acquire(category, user_id)
+        try:
+            proc = await _spawn(
+                args, shell, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+            )
+            try:
+                stdout, err = await asyncio.wait_for(
+                    proc.communicate(input.encode() if input is not None else None), timeout
+                )
+            except asyncio.TimeoutError:
+                self.timeouts[category] += 1
+                await _kill_group(proc)
+                raise subprocess.TimeoutExpired(args, timeout)
+            except asyncio.CancelledError:
+                await _kill_group(proc)
+                raise
+        finally:
+            release()
+
+        result = subprocess.CompletedProcess(
+            args, proc.returncode,
+            stdout.decode(errors="replace"),
+            err.decode(errors="replace") if err is not None else None,
+        )
+        if check:
+            result.check_returncode()
+        return result
+
+    async def stream(self, args, on_output, *, shell: bool = False, on_start=None, user_id=None,
+                     timeout: float = COMMAND_TIMEOUT, category: str = "command") -> int:
+        """
+        Внешняя команда с выводом по мере появления: on_output(bytes) получает
+        куски stdout вместе с stderr, on_start() вызывается, когда слот получен
+        и процесс запущен. Возвращает код возврата; таймаут и отмена - как у command().
+        """
+        release = await self._acquire(category, user_id)
+        try:
+            proc = await _spawn(args, shell, stdin=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+            if on_start is not None:
+                on_start()
+            try:
+                await asyncio.wait_for(_pump(proc, on_output), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts[category] += 1
+                await _kill_group(proc)
+                raise subprocess.TimeoutExpired(args, timeout)
+            except asyncio.CancelledError:
+                await _kill_group(proc)
+                raise
+        finally:
+            release()
+        return proc.returncode
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "limit": self.limits[name],
+                "running": self.running[name],
+                "waiting": self.waiting[name],
+                "completed": self.completed[name],
+                "timeouts": self.timeouts[name],
+            }
+            for name in self.limits
+        }
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+async def _spawn(args, shell: bool, stdin, stderr):
+    # Своя группа процессов: при отмене убиваем и потомков (sudo, конвейеры shell)
+    if shell:
+        return await asyncio.create_subprocess_shell(
+            args, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr, start_new_session=True,
+        )
+    return await asyncio.create_subprocess_exec(
+        *args, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr, start_new_session=True,
+    )
+
+async def _pump(proc, on_output):
+    while True:
+        chunk = await proc.stdout.read(4096)
+        if not chunk:
+            break
+        on_output(chunk)
+    await proc.wait()
+
+async def _kill_group(proc):
+    if proc.returncode is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+offload = Offload(OFFLOAD_LIMITS, OFFLOAD_USER_LIMIT)
@@ -0,0 +1,256 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageCaption, EditMessageReplyMarkup, EditMessageText
+from config.config import OUTBOX_CHAT_RATE, OUTBOX_GLOBAL_RATE, OUTBOX_GROUP_RATE
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше - раньше. Уведомления обгоняют ответы на команды
+PRIORITY_ALERT = 0
+PRIORITY_NORMAL = 1
+
+# Правки сообщения, из которых достаточно отправить последнюю
+COALESCED_METHODS = (EditMessageText, EditMessageReplyMarkup, EditMessageCaption)
+
+MAX_RETRIES = 3
+LATENCY_SAMPLES = 1000
+
+_priority = contextvars.ContextVar("outbox_priority", default=PRIORITY_NORMAL)
+
+@contextmanager
+def priority(level: int):
+    """Приоритет запросов к Telegram внутри блока: `with priority(PRIORITY_ALERT): ...`"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+class TokenBucket:
+    """rate запросов в секунду со всплеском до burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # До какого момента Telegram попросил не отправлять (RetryAfter)
+        self.blocked_until = 0.0
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self):
+        self.tokens -= 1
+
+class OutgoingRequest:
+    __slots__ = ("method", "bot", "make_request", "futures", "priority", "seq", "chat_id", "key", "enqueued", "retries")
+
+    def __init__(self, method, bot, make_request, priority: int, seq: int):
+        self.method = method
+        self.bot = bot
+        self.make_request = make_request
+        self.futures = [asyncio.get_running_loop().create_future()]
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = method.chat_id
+        self.key = (type(method), method.chat_id, method.message_id) if isinstance(method, COALESCED_METHODS) else None
+        self.enqueued = time.monotonic()
+        self.retries = 0
+
+class Outbox(BaseRequestMiddleware):
+    """
+    Очередь исходящих сообщений, подключается к сессии бота
+    (bot.session.middleware), поэтому через неё идут все answer/edit_text/
+    send_message без изменений в хендлерах.
+
+    Запросы с chat_id ждут токенов общего лимита и лимита своего чата
+    (в группах - реже), по одному запросу на чат одновременно, чтобы
+    не нарушать порядок. Уведомления обгоняют остальные запросы.
+    Неотправленная правка сообщения заменяется новой правкой того же
+    сообщения - обе стороны получают результат последней. На RetryAfter
+    чат блокируется на указанное время, запрос повторяется.
+    Остальные запросы (getUpdates, answerCallbackQuery) идут напрямую.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, group_rate: float):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self._pending = []
+        self._coalesce = {}
+        self._in_flight = set()
+        self._seq = 0
+        self._wakeup = None
+        self._task = None
+        # Метрики
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.max_depth = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Останавливает очередь. _task сбрасывается сразу, поэтому следующие
+        запросы идут напрямую; ждущие в очереди получают CancelledError.
+        """
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        for item in self._pending:
+            for future in item.futures:
+                future.cancel()
+        self._pending.clear()
+        self._coalesce.clear()
+
+    async def __call__(self, make_request, bot, method):
+        if self._task is None or getattr(method, "chat_id", None) is None:
+            return await make_request(bot, method)
+
+        level = _priority.get()
+        item = None
+        if isinstance(method, COALESCED_METHODS):
+            item = self._coalesce.get((type(method), method.chat_id, method.message_id))
+        if item is not None:
+            # Правка ещё не отправлена - отправим только новую версию
+            item.method = method
+            item.make_request = make_request
+            item.priority = min(item.priority, level)
+            future = asyncio.get_running_loop().create_future()
+            item.futures.append(future)
+            self.coalesced += 1
+        else:
+            self._seq += 1
+            item = OutgoingRequest(method, bot, make_request, level, self._seq)
+            future = item.futures[0]
+            self._pending.append(item)
+            if item.key is not None:
+                self._coalesce[item.key] = item
+            self.max_depth = max(self.max_depth, len(self._pending))
+        self._wakeup.set()
+        return await future
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательный chat_id - группа или канал, у них лимит ниже
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, max(1.0, rate * 3))
+        return bucket
+
+    def _next(self, now: float):
+        """Запрос с наивысшим приоритетом, который можно отправить сейчас, и иначе время ожидания"""
+        best = None
+        wait = None
+        global_delay = self._global.delay(now)
+        for item in self._pending:
+            if item.chat_id in self._in_flight:
+                continue
+            delay = max(global_delay, self._bucket(item.chat_id).delay(now))
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+            elif best is None or (item.priority, item.seq) < (best.priority, best.seq):
+                best = item
+        return best, wait
+
+    async def _run(self):
+        while True:
+            item, wait = self._next(time.monotonic())
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._pending.remove(item)
+            if item.key is not None:
+                self._coalesce.pop(item.key, None)
+            self._global.take()
+            self._bucket(item.chat_id).take()
+            self._in_flight.add(item.chat_id)
+            asyncio.create_task(self._send(item))
+
+    async def _send(self, item: OutgoingRequest):
+        try:
+            result = await item.make_request(item.bot, item.method)
+        except TelegramRetryAfter as e:
+            # После stop() очереди нет - повторять некому
+            if item.retries < MAX_RETRIES and self._task is not None:
+                item.retries += 1
+                self.retried += 1
+                self._bucket(item.chat_id).blocked_until = time.monotonic() + e.retry_after
+                logger.warning(f"Telegram просит подождать {e.retry_after} с (чат {item.chat_id})")
+                self._requeue(item)
+                return
+            self._finish(item, error=e)
+        except Exception as e:
+            self._finish(item, error=e)
+        else:
+            self._finish(item, result=result)
+        finally:
+            self._in_flight.discard(item.chat_id)
+            self._wakeup.set()
+
+    def _requeue(self, item: OutgoingRequest):
+        # Правка могла прийти, пока запрос был в полёте - тогда новая уже в очереди
+        newer = self._coalesce.get(item.key) if item.key is not None else None
+        if newer is not None:
+            newer.futures.extend(item.futures)
+            self.coalesced += 1
+            return
+        self._pending.append(item)
+        if item.key is not None:
+            self._coalesce[item.key] = item
+
+    def _finish(self, item: OutgoingRequest, result=None, error=None):
+        if error is None:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self._latencies.append(time.monotonic() - item.enqueued)
+        for future in item.futures:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "queued": len(self._pending),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        }
+
+outbox = Outbox(OUTBOX_GLOBAL_RATE, OUTBOX_CHAT_RATE, OUTBOX_GROUP_RATE)
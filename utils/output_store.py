@@ -0,0 +1,184 @@
+import functools
+import gzip
+import io
+import secrets
+import time
+import zlib
+from collections import OrderedDict
+from config.config import OUTPUT_STORE_MAX_BYTES, OUTPUT_STORE_TTL
+
+# Символов на страницу: с заголовком и разметкой укладывается в сообщение Telegram
+PAGE_SIZE = 3500
+
+class Output:
+    """
+    Вывод команды или логов, разбитый на страницы по PAGE_SIZE символов.
+    Готовые страницы хранятся сжатыми zlib по отдельности, поэтому показ
+    страницы распаковывает только её. Писать можно частями (write), пока
+    вывод не закрыт (close); недописанная страница лежит в буфере как есть.
+    """
+
+    def __init__(self, store, key: str, title: str):
+        self.key = key
+        self.title = title
+        self.chars = 0
+        self.size = 0
+        # Сколько первых страниц вытеснено, чтобы вывод уложился в лимит памяти
+        self.dropped = 0
+        self.closed = False
+        self.evicted = False
+        self._store = store
+        self._pages = []
+        self._buffer = ""
+
+    @property
+    def page_count(self) -> int:
+        return self.dropped + len(self._pages) + (1 if self._buffer or not self._pages else 0)
+
+    def write(self, text: str):
+        if self.closed or self.evicted:
+            return
+        self.chars += len(text)
+        buffer = self._buffer + text
+        start = 0
+        while len(buffer) - start >= PAGE_SIZE:
+            # Режем по последнему переводу строки, длинную строку - по размеру страницы
+            end = start + PAGE_SIZE
+            cut = buffer.rfind("\n", start, end) + 1 or end
+            self._add_page(buffer[start:cut])
+            start = cut
+        self._buffer = buffer[start:]
+        self._store._touch(self)
+
+    def close(self):
+        if self._buffer and not self.evicted:
+            self._add_page(self._buffer)
+        self._buffer = ""
+        self.closed = True
+
+    def _add_page(self, text: str):
+        page = zlib.compress(text.encode(), 6)
+        self._pages.append(page)
+        self.size += len(page)
+        self._store._grow(self, len(page))
+
+    def _drop_first_page(self) -> int:
+        page = self._pages.pop(0)
+        self.dropped += 1
+        self.size -= len(page)
+        return len(page)
+
+    def page(self, number: int) -> str | None:
+        """Текст страницы с номером от 1; None, если страница вытеснена или её нет"""
+        index = number - 1 - self.dropped
+        if 0 <= index < len(self._pages):
+            return zlib.decompress(self._pages[index]).decode()
+        if index == len(self._pages) and (self._buffer or not self._pages):
+            return self._buffer
+        return None
+
+    def text(self) -> str:
+        """Весь сохранённый вывод"""
+        return "".join(zlib.decompress(page).decode() for page in self._pages) + self._buffer
+
+    def export(self):
+        """Функция без аргументов, собирающая весь вывод в .gz - для запуска вне event loop"""
+        return functools.partial(_gzip_pages, list(self._pages), self._buffer)
+
+def _gzip_pages(pages: list, tail: str) -> bytes:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as f:
+        for page in pages:
+            f.write(zlib.decompress(page))
+        f.write(tail.encode())
+    return buffer.getvalue()
+
+class OutputStore:
+    """
+    Хранилище выводов для постраничного просмотра с LRU-вытеснением.
+
+    Сжатые страницы всех выводов вместе занимают не больше max_bytes:
+    сверх лимита вытесняются давно не открывавшиеся выводы, а если лимит
+    превышает один вывод - его первые страницы. Вывод, к которому не
+    обращались ttl секунд, удаляется.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._outputs = OrderedDict()
+        self._accessed = {}
+        # Метрики
+        self.evicted = 0
+        self.expired = 0
+
+    def create(self, title: str) -> Output:
+        """Новый вывод для записи частями"""
+        self._expire()
+        output = Output(self, secrets.token_hex(4), title)
+        self._outputs[output.key] = output
+        self._touch(output)
+        return output
+
+    def put(self, title: str, text: str) -> Output:
+        """Сохраняет готовый вывод целиком"""
+        output = self.create(title)
+        output.write(text)
+        output.close()
+        return output
+
+    def get(self, key: str) -> Output | None:
+        self._expire()
+        output = self._outputs.get(key)
+        if output is not None:
+            self._touch(output)
+        return output
+
+    def _touch(self, output: Output):
+        if output.key in self._outputs:
+            self._outputs.move_to_end(output.key)
+            self._accessed[output.key] = time.monotonic()
+
+    def _grow(self, output: Output, size: int):
+        self.size += size
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._outputs.values()))
+            if oldest is output:
+                if len(output._pages) <= 1:
+                    break
+                self.size -= output._drop_first_page()
+            else:
+                self._remove(oldest)
+                self.evicted += 1
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        # Выводы упорядочены по последнему обращению
+        while self._outputs:
+            oldest = next(iter(self._outputs.values()))
+            if self._accessed[oldest.key] > deadline:
+                break
+            self._remove(oldest)
+            self.expired += 1
+
+    def _remove(self, output: Output):
+        del self._outputs[output.key]
+        del self._accessed[output.key]
+        self.size -= output.size
+        # Вывод может держать ещё выполняющаяся задача - страницы освобождаем сразу
+        output.evicted = True
+        output._pages = []
+        output._buffer = ""
+
+    def stats(self) -> dict:
+        return {
+            "outputs": len(self._outputs),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "chars": sum(output.chars for output in self._outputs.values()),
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+output_store = OutputStore(OUTPUT_STORE_MAX_BYTES, OUTPUT_STORE_TTL)
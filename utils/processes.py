@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+import psutil
+from config.config import PROCESS_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Ключи сортировки для /processes: (подпись кнопки, заголовок списка)
+SORT_KEYS = {
+    "cpu": ("CPU", "по CPU"),
+    "rss": ("RAM", "по памяти"),
+    "io": ("I/O", "по вводу-выводу"),
+    "fds": ("FD", "по открытым файлам"),
+}
+
+class ProcessTracker:
+    """
+    Таблица процессов, которая обновляется инкрементально.
+
+    Объекты psutil.Process живут между обновлениями, поэтому
+    cpu_percent() считает загрузку с прошлого обновления, а не
+    возвращает 0.0 при первом чтении. При каждом обновлении
+    добавляются только новые PID и удаляются завершившиеся;
+    переиспользованный PID (другое время запуска) заменяется.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stats = {}
+        self.updated = 0.0
+        self._procs = {}
+        self._io = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Подписывает callback(stats, now) на каждое обновление таблицы (в event loop)"""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """Обновляет таблицу; блокирующий вызов, выполняется в отдельном потоке"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self.updated if self.updated else 0
+            pids = set(psutil.pids())
+            procs = self._procs
+            for pid in procs.keys() - pids:
+                del procs[pid]
+                self._io.pop(pid, None)
+
+            stats = {}
+            for pid in pids:
+                proc = procs.get(pid)
+                if proc is not None and not proc.is_running():
+                    proc = None
+                    self._io.pop(pid, None)
+                if proc is None:
+                    try:
+                        proc = procs[pid] = psutil.Process(pid)
+                    except psutil.NoSuchProcess:
+                        continue
+                info = self._read(proc, now, elapsed)
+                if info is None:
+                    procs.pop(pid, None)
+                    self._io.pop(pid, None)
+                else:
+                    stats[pid] = info
+
+            # Читатели получают целиком новую таблицу, без частично обновлённой
+            self.stats = stats
+            self.updated = now
+
+    def _read(self, proc: psutil.Process, now: float, elapsed: float):
+        try:
+            with proc.oneshot():
+                times = proc.cpu_times()
+                info = {
+                    "pid": proc.pid,
+                    "name": proc.name(),
+                    "create_time": proc.create_time(),
+                    "cpu": proc.cpu_percent(interval=None),
+                    "cpu_time": times.user + times.system,
+                    "rss": proc.memory_info().rss,
+                    "io": None,
+                    "io_total": None,
+                    "fds": None,
+                }
+                try:
+                    io = proc.io_counters()
+                    total = info["io_total"] = io.read_bytes + io.write_bytes
+                    last = self._io.get(proc.pid)
+                    self._io[proc.pid] = total
+                    if last is not None and elapsed > 0:
+                        info["io"] = max(0, total - last) / elapsed
+                    info["fds"] = proc.num_fds()
+                except psutil.AccessDenied:
+                    # Без root чужие процессы не отдают I/O и дескрипторы
+                    pass
+                return info
+        except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+            return None
+
+    def top(self, key: str = "cpu", n: int = 10) -> list:
+        """N процессов с наибольшим значением key; без полной сортировки таблицы"""
+        return heapq.nlargest(n, self.stats.values(), key=lambda info: info[key] or 0)
+
+    async def ensure_fresh(self):
+        """
+        Обновляет таблицу, если фоновое обновление ещё не запускалось.
+        Первое обновление только запоминает счётчики CPU, поэтому
+        после короткой паузы делается второе.
+        """
+        if self.updated:
+            return
+        await self._refresh()
+        await asyncio.sleep(0.5)
+        await self._refresh()
+
+    async def on_snapshot(self, snapshot: dict):
+        """Подписчик сборщика метрик: обновляет таблицу раз в interval секунд"""
+        if time.monotonic() - self.updated >= self.interval:
+            try:
+                await self._refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления таблицы процессов: {e}")
+
+    async def _refresh(self):
+        await asyncio.to_thread(self.refresh)
+        # Подписчики вызываются в event loop, а не в потоке обновления,
+        # чтобы их структуры не менялись во время чтения обработчиками
+        stats, now = self.stats, time.time()
+        for listener in self._listeners:
+            try:
+                listener(stats, now)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика таблицы процессов {listener}: {e}")
+
+process_tracker = ProcessTracker(PROCESS_REFRESH_INTERVAL)
@@ -0,0 +1,113 @@
+import os
+import socket
+import time
+import psutil
+
+# Файловые системы, которые не имеет смысла показывать и проверять
+PSEUDO_FS = {"squashfs", "tmpfs", "devtmpfs", "overlay", "iso9660"}
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+def read_uptime() -> float:
+    """Аптайм в секундах из /proc/uptime"""
+    try:
+        return float(_read("/proc/uptime").split()[0])
+    except OSError:
+        return time.time() - psutil.boot_time()
+
+def read_loadavg() -> tuple:
+    """Средняя загрузка за 1, 5 и 15 минут из /proc/loadavg"""
+    try:
+        return tuple(float(x) for x in _read("/proc/loadavg").split()[:3])
+    except OSError:
+        return os.getloadavg()
+
+def read_meminfo() -> dict:
+    """Память из /proc/meminfo в байтах: total, available, used, percent"""
+    try:
+        fields = {}
+        for line in _read("/proc/meminfo").splitlines():
+            key, _, value = line.partition(":")
+            fields[key] = int(value.split()[0]) * 1024
+        total = fields["MemTotal"]
+        available = fields.get("MemAvailable", fields["MemFree"] + fields.get("Cached", 0))
+    except (OSError, KeyError, ValueError):
+        memory = psutil.virtual_memory()
+        total, available = memory.total, memory.available
+    used = total - available
+    return {
+        "total": total,
+        "available": available,
+        "used": used,
+        "percent": round(used / total * 100, 1) if total else 0.0,
+    }
+
+def _usage(mountpoint: str, device: str = "", fstype: str = "") -> dict:
+    """Место и inode файловой системы по statvfs"""
+    st = os.statvfs(mountpoint)
+    total = st.f_blocks * st.f_frsize
+    free = st.f_bavail * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    # Процент как у df: от места, доступного непривилегированным пользователям
+    usable = used + free
+    inodes_used = st.f_files - st.f_ffree
+    return {
+        "mountpoint": mountpoint,
+        "device": device,
+        "fstype": fstype,
+        "total": total,
+        "used": used,
+        "free": free,
+        "percent": round(used / usable * 100, 1) if usable else 0.0,
+        "inodes_percent": round(inodes_used / st.f_files * 100, 1) if st.f_files else 0.0,
+    }
+
+def read_mounts() -> list:
+    """
+    Заполненность всех смонтированных файловых систем (место и inode)
+    за один проход по disk_partitions. Одно устройство учитывается один раз.
+    Корень `/` всегда первый, даже если это overlay контейнера.
+    """
+    partitions = psutil.disk_partitions(all=True)
+    root_part = next((p for p in partitions if p.mountpoint == "/"), None)
+    root = _usage("/", root_part.device if root_part else "", root_part.fstype if root_part else "")
+    mounts = [root]
+    seen = {root["device"]} if root["device"] else set()
+    for part in partitions:
+        if part.mountpoint == "/" or part.fstype in PSEUDO_FS or part.device in seen:
+            continue
+        # У настоящих ФС устройство - путь (/dev/sda1, pool/data, host:/export),
+        # у proc, sysfs, cgroup, autofs и т.п. - просто имя
+        if "/" not in part.device:
+            continue
+        try:
+            mounts.append(_usage(part.mountpoint, part.device, part.fstype))
+        except OSError:
+            continue
+        seen.add(part.device)
+    return mounts
+
+def read_ip_addresses() -> list:
+    """Адреса всех интерфейсов, кроме loopback и link-local (как hostname -I)"""
+    addresses = []
+    for iface, addrs in psutil.net_if_addrs().items():
+        for addr in addrs:
+            if addr.family == socket.AF_INET and not addr.address.startswith("127."):
+                addresses.append(addr.address)
+            elif addr.family == socket.AF_INET6 and addr.address != "::1" and not addr.address.startswith("fe80"):
+                addresses.append(addr.address.split("%")[0])
+    return addresses
+
+def format_uptime(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if days:
+        parts.append(f"{days} дн.")
+    if hours:
+        parts.append(f"{hours} ч.")
+    parts.append(f"{minutes} мин.")
+    return " ".join(parts)
@@ -0,0 +1,57 @@
+import time
+
+# Ядро отдаёт счётчики /proc/net/dev как unsigned long: на 32-битных
+# системах и у части драйверов они переполняются на 2**32
+COUNTER_32 = 2 ** 32
+
+def counter_delta(prev: int, cur: int) -> int:
+    """
+    Прирост монотонного счётчика между двумя чтениями.
+
+    Если значение уменьшилось, это либо переполнение 32-битного счётчика
+    (предыдущее значение было в верхней половине диапазона), либо сброс -
+    интерфейс пересоздан или драйвер перезагружен. При сбросе приростом
+    считается новое значение целиком: оно накоплено уже после сброса.
+    """
+    if cur >= prev:
+        return cur - prev
+    if COUNTER_32 // 2 <= prev < COUNTER_32 and cur < COUNTER_32:
+        return cur + COUNTER_32 - prev
+    return cur
+
+class CounterRates:
+    """
+    Скорости по набору именованных счётчиков (интерфейсы, диски).
+    Хранит только предыдущее чтение каждого ключа; ключи, которые
+    пропали (удалённый интерфейс), забываются при следующем обновлении.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._last = {}
+        self._last_time = None
+
+    def update(self, counters: dict, now: float = None) -> dict:
+        """
+        Принимает {ключ: namedtuple счётчиков psutil} и возвращает
+        {ключ: {поле: значение в секунду}}. Первое чтение ключа даёт нули.
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_time if self._last_time is not None else 0
+        self._last_time = now
+        rates = {}
+        last = self._last
+        current = {}
+        for key, value in counters.items():
+            values = tuple(getattr(value, field) for field in self.fields)
+            current[key] = values
+            prev = last.get(key)
+            if prev is None or elapsed <= 0:
+                rates[key] = dict.fromkeys(self.fields, 0.0)
+                continue
+            rates[key] = {
+                field: counter_delta(p, c) / elapsed
+                for field, p, c in zip(self.fields, prev, values)
+            }
+        self._last = current
+        return rates
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from config.config import METRICS_ARCHIVE_PATH
+from utils.timeseries import METRICS, TIERS, choose_level
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VDSRRD01"
+HEADER_SIZE = 4096
+# Слот: начало интервала, мин, сред, макс, crc32 первых 20 байт
+SLOT = struct.Struct("<dfffI")
+SYNC_INTERVAL = 10  # как часто сбрасывать изменения на диск, секунд
+
+class MetricsArchive:
+    """
+    Архив метрик в стиле RRD: файл фиксированного размера, отображённый
+    в память (mmap), с заранее выделенными слотами для каждой метрики
+    и каждого уровня разрешения.
+
+    Запись - O(1): номер слота вычисляется из времени интервала.
+    Каждый слот защищён crc32, поэтому недописанный при падении слот
+    просто пропускается при чтении. Слот из предыдущего круга
+    отличается временем и тоже не попадает в выборку.
+    """
+
+    def __init__(self, path: str, metrics=METRICS, tiers=TIERS):
+        self.path = path
+        self.metrics = list(metrics)
+        self.tiers = tiers
+        self._index = {name: i for i, name in enumerate(self.metrics)}
+        # Смещение начала области каждого уровня
+        self._level_offsets = []
+        offset = HEADER_SIZE
+        for _, rows in tiers:
+            self._level_offsets.append(offset)
+            offset += rows * len(self.metrics) * SLOT.size
+        self.size = offset
+        self._schema = hashlib.sha1(repr((self.metrics, tiers)).encode()).digest()
+        self._mm = None
+        self._file = None
+        self._last_sync = 0.0
+
+    def open(self):
+        if not self._is_valid():
+            self._create()
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), self.size)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+            self._file = None
+
+    def _is_valid(self) -> bool:
+        try:
+            if os.path.getsize(self.path) != self.size:
+                return False
+            with open(self.path, "rb") as f:
+                header = f.read(len(MAGIC) + len(self._schema))
+        except OSError:
+            return False
+        return header == MAGIC + self._schema
+
+    def _create(self):
+        """Создаёт файл нужного размера атомарно: временный файл + rename"""
+        if os.path.exists(self.path):
+            logger.warning(f"Архив метрик {self.path} имеет другую схему, создаётся заново")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + self._schema)
+            f.truncate(self.size)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _slot_offset(self, level: int, metric: int, bucket: float) -> int:
+        step, rows = self.tiers[level]
+        row = int(bucket // step) % rows
+        return self._level_offsets[level] + (metric * rows + row) * SLOT.size
+
+    def write(self, name: str, level: int, bucket: float, mn: float, avg: float, mx: float):
+        """Записывает закрытый интервал (подписчик MetricStore.add_flush_listener)"""
+        if self._mm is None or name not in self._index:
+            return
+        data = struct.pack("<dfff", bucket, mn, avg, mx)
+        offset = self._slot_offset(level, self._index[name], bucket)
+        self._mm[offset:offset + SLOT.size] = data + struct.pack("<I", zlib.crc32(data))
+
+    def query(self, name: str, seconds: float, now: float):
+        """
+        Возвращает (шаг уровня, точки за последние seconds секунд).
+        Читаются только слоты запрошенного периода, а не весь файл.
+        """
+        level = choose_level(self.tiers, seconds)
+        step, rows = self.tiers[level]
+        if self._mm is None or name not in self._index:
+            return step, []
+        metric = self._index[name]
+        last = now - now % step
+        first = max(now - seconds, last - (rows - 1) * step)
+        first -= first % step
+
+        points = []
+        bucket = first
+        while bucket <= last:
+            offset = self._slot_offset(level, metric, bucket)
+            t, mn, avg, mx, crc = SLOT.unpack_from(self._mm, offset)
+            if t == bucket and zlib.crc32(self._mm[offset:offset + SLOT.size - 4]) == crc:
+                points.append((t, mn, avg, mx))
+            bucket += step
+        return step, points
+
+    async def sync(self, snapshot=None):
+        """Периодически сбрасывает изменения на диск (подписчик sampler.add_listener)"""
+        now = time.monotonic()
+        if self._mm is None or now - self._last_sync < SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        await asyncio.to_thread(self._mm.flush)
+
+archive = MetricsArchive(METRICS_ARCHIVE_PATH)
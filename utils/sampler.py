@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import logging
+import time
+import psutil
+from config.config import SAMPLE_INTERVAL
+from utils.procfs import read_loadavg, read_meminfo, read_mounts, read_uptime
+from utils.rates import CounterRates
+
+NET_FIELDS = ("bytes_recv", "bytes_sent", "packets_recv", "packets_sent", "errin", "errout", "dropin", "dropout")
+DISK_FIELDS = ("read_bytes", "write_bytes", "read_count", "write_count")
+
+logger = logging.getLogger(__name__)
+
+class MetricsSampler:
+    """
+    Фоновый сбор метрик системы с фиксированным периодом.
+    Последний снимок доступен в `snapshot` без повторных измерений,
+    подписчики (add_listener) получают каждый новый снимок.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.snapshot = {}
+        self.tick = 0
+        self._listeners = []
+        self._task = None
+        self._net_rates = CounterRates(NET_FIELDS)
+        self._disk_rates = CounterRates(DISK_FIELDS)
+
+    def add_listener(self, callback):
+        """Подписывает callback(snapshot) на новые снимки, callback может быть корутиной"""
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._task is None:
+            # Первый вызов без интервала только запоминает счётчики CPU,
+            # следующие возвращают загрузку с момента предыдущего вызова
+            psutil.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def sample(self) -> dict:
+        """Снимает метрики один раз, без ожидания"""
+        memory = read_meminfo()
+        mounts = read_mounts()
+        # Корень read_mounts берёт прямо из statvfs("/"), он есть всегда
+        root = mounts[0]
+        interfaces = self._interface_rates()
+        # Суммарный трафик - без loopback, он не уходит в канал VDS
+        external = [rates for name, rates in interfaces.items() if not name.startswith("lo")]
+        disk_io = self._disk_io_rates()
+        return {
+            "time": time.time(),
+            "cpu": psutil.cpu_percent(interval=None),
+            "memory": memory["percent"],
+            "memory_used": memory["used"],
+            "memory_total": memory["total"],
+            "disk": root["percent"],
+            "disk_used": root["used"],
+            "disk_total": root["total"],
+            "mounts": mounts,
+            "load": read_loadavg(),
+            "uptime": read_uptime(),
+            "net_rx": sum(rates["bytes_recv"] for rates in external),
+            "net_tx": sum(rates["bytes_sent"] for rates in external),
+            "interfaces": interfaces,
+            "disk_read": disk_io["read_bytes"],
+            "disk_write": disk_io["write_bytes"],
+            "disk_read_ops": disk_io["read_count"],
+            "disk_write_ops": disk_io["write_count"],
+        }
+
+    def _interface_rates(self) -> dict:
+        """Скорости по каждому интерфейсу (байты, пакеты, ошибки, отбросы в секунду)"""
+        # nowrap=False: переполнения и сбросы счётчиков обрабатывает CounterRates
+        counters = psutil.net_io_counters(pernic=True, nowrap=False)
+        return self._net_rates.update(counters)
+
+    def _disk_io_rates(self) -> dict:
+        """Суммарные скорости чтения/записи по физическим дискам"""
+        counters = psutil.disk_io_counters(nowrap=False)
+        if counters is None:
+            # В контейнерах без /proc/diskstats счётчиков дисков нет
+            return dict.fromkeys(DISK_FIELDS, 0.0)
+        return self._disk_rates.update({"total": counters})["total"]
+
+    def get_snapshot(self) -> dict:
+        """Последний снимок; если сбор ещё не запущен - измеряет сразу"""
+        return self.snapshot or self.sample()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        while True:
+            next_time += self.interval
+            await asyncio.sleep(max(0, next_time - loop.time()))
+            try:
+                # Чтение /proc и statvfs - в отдельном потоке, чтобы
+                # зависшая файловая система не остановила бота
+                snapshot = await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.error(f"Ошибка сбора метрик: {e}")
+                continue
+            self.tick += 1
+            self.snapshot = snapshot
+            for listener in self._listeners:
+                try:
+                    result = listener(snapshot)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Ошибка обработчика метрик {listener}: {e}")
+
+sampler = MetricsSampler(SAMPLE_INTERVAL)
@@ -0,0 +1,412 @@
+import operator
+import os
+import re
+import socket
+import time
+from collections import Counter
+from functools import lru_cache
+from itertools import compress, islice, repeat
+from typing import NamedTuple
+
+PROC_NET = "/proc/net"
+PROTOCOLS = ("tcp", "tcp6", "udp", "udp6")
+
+# Состояния сокетов ядра (include/net/tcp_states.h), названия как у ss
+STATES = {
+    "01": "ESTAB",
+    "02": "SYN-SENT",
+    "03": "SYN-RECV",
+    "04": "FIN-WAIT-1",
+    "05": "FIN-WAIT-2",
+    "06": "TIME-WAIT",
+    "07": "UNCONN",
+    "08": "CLOSE-WAIT",
+    "09": "LAST-ACK",
+    "0A": "LISTEN",
+    "0B": "CLOSING",
+}
+STATE_CODES = {name: code for code, name in STATES.items()}
+# Синонимы для фильтров /connections
+STATE_ALIASES = {"ESTABLISHED": "ESTAB", "TIMEWAIT": "TIME-WAIT", "CLOSEWAIT": "CLOSE-WAIT"}
+
+OWNERS_MAX_AGE = 5  # секунд, сколько живёт карта inode -> процесс
+_owners_cache = {"time": 0.0, "owners": {}, "names": {}}
+
+@lru_cache(maxsize=65536)
+def decode_endpoint(raw: str):
+    """
+    Разбирает адрес из /proc/net вида 0100007F:0035 в (ip, порт).
+    Адрес записан в порядке байт ядра: IPv4 - одно 32-битное слово,
+    IPv6 - четыре слова. Кэш спасает от повторного разбора одних и тех же адресов.
+    """
+    addr, _, port = raw.partition(":")
+    data = bytes.fromhex(addr)
+    if len(data) == 4:
+        ip = socket.inet_ntop(socket.AF_INET, data[::-1])
+    else:
+        words = b"".join(data[i:i + 4][::-1] for i in range(0, 16, 4))
+        ip = socket.inet_ntop(socket.AF_INET6, words)
+        if ip.startswith("::ffff:") and "." in ip:
+            ip = ip[7:]
+    return ip, int(port, 16)
+
+class SocketEntry(NamedTuple):
+    """Сокет из /proc/net/*; адреса хранятся в сыром виде и разбираются по запросу"""
+    proto: str
+    local: str
+    remote: str
+    state: str
+    uid: int
+    inode: int
+
+    @property
+    def local_ip(self) -> str:
+        return decode_endpoint(self.local)[0]
+
+    @property
+    def local_port(self) -> int:
+        return decode_endpoint(self.local)[1]
+
+    @property
+    def remote_ip(self) -> str:
+        return decode_endpoint(self.remote)[0]
+
+    @property
+    def remote_port(self) -> int:
+        return decode_endpoint(self.remote)[1]
+
+    @property
+    def state_name(self) -> str:
+        return STATES.get(self.state, self.state)
+
+def format_endpoint(ip: str, port: int) -> str:
+    return f"[{ip}]:{port}" if ":" in ip else f"{ip}:{port}"
+
+def iter_sockets(protocols=PROTOCOLS, states=None):
+    """
+    Потоково читает таблицы сокетов /proc/net/{tcp,tcp6,udp,udp6}.
+    states - множество кодов состояний (например {"0A"}), фильтр
+    применяется до создания записи, чтобы не тратить время на лишние строки.
+    """
+    for proto in protocols:
+        try:
+            f = open(os.path.join(PROC_NET, proto))
+        except OSError:
+            continue
+        with f:
+            next(f, None)  # заголовок
+            for line in f:
+                fields = line.split(None, 10)
+                if len(fields) < 10:
+                    continue
+                if states is not None and fields[3] not in states:
+                    continue
+                yield SocketEntry(proto, fields[1], fields[2], fields[3], int(fields[7]), int(fields[9]))
+
+def listening_sockets():
+    """Слушающие TCP-сокеты и несвязанные UDP-сокеты"""
+    for entry in iter_sockets(states={"0A", "07"}):
+        if entry.proto.startswith("udp") or entry.state == "0A":
+            yield entry
+
+def map_inodes_to_processes(inodes) -> dict:
+    """
+    Находит процессы-владельцы сокетов: inode -> (pid, имя).
+    Обход /proc/*/fd дорогой, поэтому он делается только для нужных
+    inode и прекращается, как только все они найдены.
+    """
+    wanted = {inode for inode in inodes if inode}
+    owners = {}
+    if not wanted:
+        return owners
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if not target.startswith("socket:["):
+                continue
+            inode = int(target[8:-1])
+            if inode in wanted and inode not in owners:
+                owners[inode] = (int(pid), _process_name(pid))
+        if len(owners) == len(wanted):
+            break
+    return owners
+
+def _process_name(pid: str) -> str:
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return "?"
+
+def all_socket_owners(max_age: float = OWNERS_MAX_AGE) -> tuple:
+    """
+    Полная карта inode -> pid по всем процессам и имена процессов pid -> имя.
+    Ключ - inode в байтах, как он записан в /proc/net, чтобы не переводить
+    его в int; значение - pid, а не (pid, имя), потому что int считается
+    в Counter вдвое быстрее кортежа. Обход /proc/*/fd дорогой, поэтому
+    карта кэшируется на max_age секунд.
+    """
+    now = time.monotonic()
+    if now - _owners_cache["time"] < max_age:
+        return _owners_cache["owners"], _owners_cache["names"]
+    owners = {}
+    names = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if target.startswith("socket:["):
+                if int(pid) not in names:
+                    names[int(pid)] = _process_name(pid)
+                owners[target[8:-1].encode()] = int(pid)
+    _owners_cache["time"] = now
+    _owners_cache["owners"] = owners
+    _owners_cache["names"] = names
+    return owners, names
+
+def parse_state(text: str) -> str:
+    """Код состояния по названию: ESTAB, established, listen, time-wait..."""
+    name = text.upper().replace("_", "-")
+    name = STATE_ALIASES.get(name.replace("-", ""), name)
+    if name not in STATE_CODES:
+        raise ValueError(text)
+    return STATE_CODES[name]
+
+def encode_ip(ip: str) -> set:
+    """Представления адреса в /proc/net: для IPv4 ещё и как IPv4-mapped IPv6"""
+    try:
+        data = socket.inet_pton(socket.AF_INET, ip)
+    except OSError:
+        data = socket.inet_pton(socket.AF_INET6, ip)
+        return {b"".join(data[i:i + 4][::-1] for i in range(0, 16, 4)).hex().upper().encode()}
+    v4 = data[::-1].hex().upper().encode()
+    return {v4, b"0000000000000000FFFF0000" + v4}
+
+# Сколько байт таблицы сокетов разбирать за раз в aggregate_sockets
+BATCH_BYTES = 1024 * 1024
+# Поля после retrnsmt (uid, timeout, inode) - с запасом на ширину uid и inode
+INODE_WINDOW = 40
+TAIL_RE = re.compile(rb"\n +\d+ +-?\d+ (\d+) ")
+# inode при стандартной ширине uid (%5u) и timeout (%8d): до 10 цифр и пробел
+INODE_WIDTH = 11
+INODE_RE = re.compile(rb"\n(\d+) ")
+_THIRD = operator.itemgetter(2)
+
+def _offsets(addr: int) -> dict:
+    """
+    Смещения полей от начала локального адреса в строке /proc/net/*:
+    адрес - addr hex-символов (8 для IPv4, 32 для IPv6), дальше до
+    retrnsmt ядро печатает все поля фиксированной ширины.
+    """
+    return {
+        "local_port": (addr + 1, 4),
+        "remote_ip": (addr + 6, addr),
+        "remote_port": (2 * addr + 7, 4),
+        # Коды состояний - "01".."0B", различаются вторым символом
+        "state": 2 * addr + 13,
+        "tail": 2 * addr + 53,
+    }
+
+def _stride(part: bytes, start: int, width: int, length: int, rows: int) -> bytes:
+    """Поле шириной width из каждой строки длины length, каждое - после \\n"""
+    buf = bytearray((width + 1) * rows)
+    buf[::width + 1] = b"\n" * rows
+    for i in range(width):
+        buf[i + 1::width + 1] = part[start + i::length]
+    return bytes(buf)
+
+def _inode_column(part: bytes, tail: int, length: int, rows: int) -> list:
+    """inode строк одной длины; tail - смещение пробела перед uid"""
+    # uid и timeout обычно стандартной ширины - тогда inode начинается с фиксированного места
+    if part[tail + 6::length].count(b" ") != rows or part[tail + 15::length].count(b" ") != rows:
+        return TAIL_RE.findall(_stride(part, tail, INODE_WINDOW, length, rows))
+    start = tail + 16
+    # И число цифр у inode соседних сокетов обычно одно - тогда это тоже срез
+    width = part.find(b" ", start) - start
+    if (0 < width < INODE_WIDTH and part[start + width::length].count(b" ") == rows
+            and not any(part[start + i::length].count(b" ") for i in range(width))):
+        return _stride(part, start, width, length, rows).split(b"\n")[1:]
+    return INODE_RE.findall(_stride(part, start, INODE_WIDTH, length, rows))
+
+def _fixed_columns(chunk: bytes, offsets: dict, need_remote_port: bool):
+    """
+    Столбцы куска таблицы, в котором все строки одной длины (IPv4-таблицы
+    ядро дополняет пробелами до 150 и 128 символов). Символ поля в строке i -
+    chunk[start + i * length], поэтому поле вырезается срезами с шагом length
+    без объекта на каждую строку. (размер разобранной части, столбцы) или
+    None, если кусок не такой.
+    """
+    length = chunk.find(b"\n") + 1
+    if not length or len(chunk) % length:
+        return None
+    rows = len(chunk) // length
+    if chunk[length - 1::length].count(b"\n") != rows:
+        return None
+    # Номер sl печатается как %4d и с 10000-й строки становится шире:
+    # берём строки той же ширины, что и первая, остальные - следующим куском
+    colon = chunk.find(b": ")
+    if colon < 0:
+        return None
+    rows = chunk[colon::length].count(b":")
+    part = chunk if rows * length == len(chunk) else chunk[:rows * length]
+    base = colon + 2
+    tail = base + offsets["tail"]
+    if tail + INODE_WINDOW >= length or part[colon::length].count(b":") != rows:
+        return None
+
+    inode = _inode_column(part, tail, length, rows)
+    if len(inode) != rows:
+        return None
+
+    def column(field: str) -> list:
+        start, width = offsets[field]
+        return _stride(part, base + start, width, length, rows).split(b"\n")[1:]
+
+    return len(part), {
+        "local_port": column("local_port"),
+        "remote_ip": column("remote_ip"),
+        "remote_port": column("remote_port") if need_remote_port else None,
+        "state": part[base + offsets["state"]::length],
+        "inode": inode,
+        "line": lambda i: part[i * length + base:(i + 1) * length],
+    }
+
+def _split_columns(chunk: bytes, offsets: dict, need_remote_port: bool):
+    """Столбцы куска таблицы со строками разной длины (IPv6): строка - один объект, поля - её срезы"""
+    lines = chunk.split(b": ")[1:]
+
+    def column(field: str) -> list:
+        start, width = offsets[field]
+        return list(map(operator.itemgetter(slice(start, start + width)), lines))
+
+    tail = map(operator.itemgetter(slice(offsets["tail"], None)), lines)
+    return len(chunk), {
+        "local_port": column("local_port"),
+        "remote_ip": column("remote_ip"),
+        "remote_port": column("remote_port") if need_remote_port else None,
+        "state": bytes(map(operator.itemgetter(offsets["state"]), lines)),
+        "inode": list(map(_THIRD, map(bytes.split, tail, repeat(None), repeat(3)))),
+        "line": lines.__getitem__,
+    }
+
+def _table_columns(path: str, addr: int, need_remote_port: bool):
+    """Столбцы таблицы /proc/net/* по кускам около BATCH_BYTES из целых строк"""
+    offsets = _offsets(addr)
+    with open(path, "rb") as f:
+        next(f, None)  # заголовок
+        while True:
+            # Кусок дочитывается до конца строки
+            chunk = f.read(BATCH_BYTES)
+            if not chunk:
+                break
+            chunk += f.readline()
+            while chunk:
+                size, columns = (_fixed_columns(chunk, offsets, need_remote_port)
+                                 or _split_columns(chunk, offsets, need_remote_port))
+                chunk = chunk[size:]
+                yield columns
+
+def _select(columns: dict, mask):
+    """Оставляет в столбцах только строки, отмеченные в mask"""
+    for name in ("local_port", "remote_ip", "remote_port", "inode"):
+        if columns[name] is not None:
+            columns[name] = list(compress(columns[name], mask))
+    columns["state"] = bytes(compress(columns["state"], mask))
+    # Номера строк нужны только для первых sample совпадений - ленивый итератор
+    columns["rows"] = compress(columns["rows"], mask)
+
+def aggregate_sockets(port: int = None, state: str = None, ip: str = None,
+                      protocols=PROTOCOLS, top: int = 10, sample: int = 15) -> dict:
+    """
+    Сводка по таблице сокетов за один проход: счётчики по состояниям,
+    удалённым IP, локальным портам и процессам-владельцам.
+
+    port - порт (локальный или удалённый), state - код состояния
+    (см. parse_state), ip - удалённый адрес. Счёт идёт по сырым
+    hex-значениям из /proc/net, в читаемый вид переводятся только
+    попавшие в топ ключи.
+
+    Цикл Python по 100k строк сам по себе дороже 100 мс, поэтому таблица
+    разбирается по столбцам (_table_columns), а фильтры и счёт идут через
+    map/compress/Counter без кода Python на каждую строку.
+    """
+    started = time.perf_counter()
+    port_hex = f"{port:04X}".encode() if port is not None else None
+    ip_hex = encode_ip(ip) if ip is not None else None
+    if state is not None:
+        # Маска строк с нужным состоянием - один translate столбца состояний
+        state_mask = bytearray(256)
+        state_mask[state.encode()[1]] = 1
+
+    total = 0
+    states = Counter()
+    remotes = Counter()
+    local_ports = Counter()
+    processes = Counter()
+    samples = []
+    owners, names = all_socket_owners()
+    for proto in protocols:
+        addr = 32 if proto.endswith("6") else 8
+        try:
+            for columns in _table_columns(os.path.join(PROC_NET, proto), addr, port_hex is not None):
+                columns["rows"] = range(len(columns["state"]))
+                # Фильтры по очереди, каждый - по строкам, оставшимся после предыдущего
+                if state is not None:
+                    _select(columns, columns["state"].translate(state_mask))
+                if port_hex is not None:
+                    _select(columns, list(map(operator.or_, map(port_hex.__eq__, columns["local_port"]),
+                                              map(port_hex.__eq__, columns["remote_port"]))))
+                if ip_hex is not None:
+                    _select(columns, list(map(ip_hex.__contains__, columns["remote_ip"])))
+                st = columns["state"]
+
+                total += len(st)
+                for code in set(st):
+                    states[code] += st.count(code)
+                local_ports.update(columns["local_port"])
+                remotes.update(columns["remote_ip"])
+                processes.update(map(owners.get, columns["inode"]))
+                for i in islice(columns["rows"], sample - len(samples)):
+                    fields = columns["line"](i).split(None, 9)
+                    samples.append(SocketEntry(proto, fields[0].decode(), fields[1].decode(), fields[2].decode(),
+                                               int(fields[6]), int(fields[8])))
+        except OSError:
+            continue
+    # Слушающие и несвязанные сокеты не имеют удалённой стороны: адрес нулевой
+    remotes.pop(b"0" * 8, None)
+    remotes.pop(b"0" * 32, None)
+    # Сокеты без владельца (TIME-WAIT, чужие пространства имён)
+    processes.pop(None, None)
+
+    def state_name(code: int) -> str:
+        code = f"0{chr(code)}"
+        return STATES.get(code, code)
+
+    return {
+        "total": total,
+        "states": [(state_name(k), n) for k, n in states.most_common()],
+        "remotes": [(decode_endpoint(k.decode() + ":0000")[0], n) for k, n in remotes.most_common(top)],
+        "local_ports": [(int(k, 16), n) for k, n in local_ports.most_common(top)],
+        "processes": [(f"{names[pid]}/{pid}", n) for pid, n in processes.most_common(top)],
+        "samples": samples if total <= sample else [],
+        "elapsed": time.perf_counter() - started,
+    }
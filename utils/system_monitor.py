@@ -1,77 +1,75 @@
 # utils/system_monitor.py (альтернативная версия)
-import psutil
 import subprocess
 import os
+from utils.offload import offload
+from utils.procfs import format_uptime, read_ip_addresses
+from utils.sampler import sampler
+
+# Файлы журнала, если journalctl недоступен
+LOG_FILES = ("/var/log/syslog", "/var/log/messages")
+
+# Статус собирается не чаще одного раза за такт сборщика метрик
+_status_cache = {"time": None, "status": None}
 
 def get_system_status():
-    cpu = psutil.cpu_percent(interval=1)
-    mem = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
-    uptime = subprocess.check_output(["uptime", "-p"], text=True).strip()
-    try:
-        ip = subprocess.check_output("hostname -I", shell=True, text=True).strip()
-    except:
-        ip = "Не удалось получить IP"
-    return {
-        "cpu": cpu,
-        "memory": f"{mem.percent}%",
-        "disk": f"{disk.used // (1024**3)}GB / {disk.total // (1024**3)}GB",
-        "uptime": uptime,
-        "ip": ip
+    # Метрики берём из последнего снимка фонового сборщика,
+    # остальное читаем из /proc и psutil без запуска внешних команд
+    snapshot = sampler.get_snapshot()
+    if _status_cache["time"] == snapshot["time"]:
+        return _status_cache["status"]
+
+    ip = " ".join(read_ip_addresses()) or "Не удалось получить IP"
+    status = {
+        "cpu": snapshot["cpu"],
+        "memory": f"{snapshot['memory']}%",
+        "disk": f"{snapshot['disk_used'] // (1024**3)}GB / {snapshot['disk_total'] // (1024**3)}GB",
+        "uptime": format_uptime(snapshot["uptime"]),
+        "ip": ip,
+        "load": " ".join(f"{x:.2f}" for x in snapshot["load"]),
+        "mounts": snapshot["mounts"],
     }
+    _status_cache["time"] = snapshot["time"]
+    _status_cache["status"] = status
+    return status
+
+def format_system_status(status: dict) -> str:
+    """Текст статуса сервера для /status и кнопки «Статус»"""
+    response = (
+        f"💻 *Статус сервера:*\n"
+        f"🔹 CPU: {status['cpu']}%\n"
+        f"🔹 Load average: {status['load']}\n"
+        f"🔹 RAM: {status['memory']}\n"
+        f"🔹 Диск: {status['disk']}\n"
+    )
+    for mount in status["mounts"]:
+        response += (
+            f"    `{mount['mountpoint']}` {mount['used'] // (1024**3)}GB / "
+            f"{mount['total'] // (1024**3)}GB ({mount['percent']}%, inode {mount['inodes_percent']}%)\n"
+        )
+    response += (
+        f"🔹 Аптайм: {status['uptime']}\n"
+        f"🔹 IP: `{status['ip']}`"
+    )
+    return response
 
-def get_logs(lines: int = 50):
+async def get_logs(lines: int = 50, user_id: int = None):
     """Получает логи с обработкой ошибок"""
     try:
         # Пробуем получить логи через journalctl (предпочтительный способ)
-        output = subprocess.check_output(
-            ["journalctl", "--since", "1 hour ago", "-n", str(lines), "-q"], 
-            text=True, 
-            stderr=subprocess.DEVNULL
+        result = await offload.command(
+            ["journalctl", "--since", "1 hour ago", "-n", str(lines), "-q"],
+            check=True, user_id=user_id
         )
-        return output
-    except (subprocess.CalledProcessError, FileNotFoundError):
+        return result.stdout
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
         # Если journalctl недоступен, пробуем другие способы
-        log_files = [
-            "/var/log/syslog",
-            "/var/log/messages"
-        ]
-        
-        for log_file in log_files:
+        for log_file in LOG_FILES:
             if os.path.exists(log_file) and os.access(log_file, os.R_OK):
                 try:
-                    output = subprocess.check_output(
-                        ["tail", "-n", str(lines), log_file], 
-                        text=True, 
-                        stderr=subprocess.DEVNULL
-                    )
-                    return output
-                except:
+                    result = await offload.command(["tail", "-n", str(lines), log_file], check=True, user_id=user_id)
+                    return result.stdout
+                except Exception:
                     continue
         
         # Если ничего не работает, возвращаем сообщение об ошибке
         return "❌ Не удалось получить логи. Убедитесь, что бот запущен с правами доступа к лог-файлам или установлен journalctl."
-
-def get_top_processes(n=10):
-    processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-        try:
-            processes.append(proc.info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
-    return processes[:n]
-
-def kill_process(pid: int):
-    try:
-        proc = psutil.Process(pid)
-        proc.terminate()
-        proc.wait(timeout=3)
-        return True, "Процесс успешно завершен"
-    except psutil.NoSuchProcess:
-        return False, "Процесс не найден"
-    except psutil.TimeoutExpired:
-        proc.kill()
-        return True, "Процесс убит принудительно"
-    except Exception as e:
-        return False, f"Ошибка: {e}"
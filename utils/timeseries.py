@@ -0,0 +1,191 @@
+import math
+import re
+from array import array
+
+# Уровни хранения: (шаг в секундах, число точек).
+# 1с × 1ч, 1м × 24ч, 1ч × 30 дней - память фиксирована при любом аптайме.
+TIERS = ((1, 3600), (60, 1440), (3600, 720))
+
+# Метрики из снимка сборщика, которые хранятся в истории
+METRICS = {
+    "cpu": ("CPU", "%"),
+    "memory": ("RAM", "%"),
+    "disk": ("Диск", "%"),
+    "load": ("Load average", ""),
+    "net_rx": ("Сеть, приём", "B/s"),
+    "net_tx": ("Сеть, передача", "B/s"),
+    "disk_read": ("Диск, чтение", "B/s"),
+    "disk_write": ("Диск, запись", "B/s"),
+}
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+class RingBuffer:
+    """Кольцевой буфер агрегатов (время, мин, сред, макс) на массивах фиксированного размера"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.mins = array('f', bytes(4 * capacity))
+        self.avgs = array('f', bytes(4 * capacity))
+        self.maxs = array('f', bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, t: float, mn: float, avg: float, mx: float):
+        i = self.head
+        self.times[i] = t
+        self.mins[i] = mn
+        self.avgs[i] = avg
+        self.maxs[i] = mx
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def since(self, t0: float):
+        """Точки не старше t0, от старых к новым"""
+        start = (self.head - self.count) % self.capacity
+        points = []
+        for k in range(self.count):
+            i = (start + k) % self.capacity
+            if self.times[i] >= t0:
+                points.append((self.times[i], self.mins[i], self.avgs[i], self.maxs[i]))
+        return points
+
+class MetricSeries:
+    """
+    История одной метрики в нескольких разрешениях.
+    Каждый уровень копит агрегат текущего интервала и при смене
+    интервала сбрасывает его в свой кольцевой буфер.
+    """
+
+    def __init__(self, tiers=TIERS):
+        self.steps = [step for step, _ in tiers]
+        self.buffers = [RingBuffer(capacity) for _, capacity in tiers]
+        # Текущий интервал каждого уровня: [начало, мин, сумма, число, макс]
+        self._pending = [None] * len(tiers)
+
+    def add(self, t: float, value: float, on_flush=None):
+        for level, step in enumerate(self.steps):
+            bucket = t - t % step
+            pending = self._pending[level]
+            if pending is not None and pending[0] != bucket:
+                self._flush(level, on_flush)
+                pending = None
+            if pending is None:
+                self._pending[level] = [bucket, value, value, 1, value]
+            else:
+                pending[1] = min(pending[1], value)
+                pending[2] += value
+                pending[3] += 1
+                pending[4] = max(pending[4], value)
+
+    def _flush(self, level: int, on_flush):
+        bucket, mn, total, count, mx = self._pending[level]
+        self._pending[level] = None
+        avg = total / count
+        self.buffers[level].append(bucket, mn, avg, mx)
+        if on_flush is not None:
+            on_flush(level, bucket, mn, avg, mx)
+
+class MetricStore:
+    """История метрик сборщика, подписывается на снимки через sampler.add_listener"""
+
+    def __init__(self, metrics=METRICS, tiers=TIERS):
+        self.tiers = tiers
+        self.series = {name: MetricSeries(tiers) for name in metrics}
+        self._flush_listeners = []
+
+    def add_flush_listener(self, callback):
+        """Подписывает callback(metric, level, bucket, mn, avg, mx) на закрытые интервалы"""
+        self._flush_listeners.append(callback)
+
+    def add_snapshot(self, snapshot: dict):
+        t = snapshot["time"]
+        for name, series in self.series.items():
+            value = snapshot.get(name)
+            if name == "load" and value is not None:
+                value = value[0]
+            if value is None:
+                continue
+            series.add(t, float(value), self._make_flush(name))
+
+    def _make_flush(self, name):
+        if not self._flush_listeners:
+            return None
+        def on_flush(level, bucket, mn, avg, mx):
+            for listener in self._flush_listeners:
+                listener(name, level, bucket, mn, avg, mx)
+        return on_flush
+
+    def query(self, name: str, seconds: float, now: float):
+        """Возвращает (шаг уровня, точки за последние seconds секунд)"""
+        level = choose_level(self.tiers, seconds)
+        series = self.series[name]
+        return series.steps[level], series.buffers[level].since(now - seconds)
+
+def choose_level(tiers, seconds: float) -> int:
+    """Самый подробный уровень, который покрывает запрошенный период"""
+    for level, (step, capacity) in enumerate(tiers):
+        if step * capacity >= seconds:
+            return level
+    return len(tiers) - 1
+
+def parse_duration(text: str) -> int:
+    """Разбирает период вида 90s, 30m, 6h, 2d в секунды"""
+    match = re.fullmatch(r"(\d+)([smhd])", text.strip().lower())
+    if not match:
+        raise ValueError(text)
+    value, unit = match.groups()
+    return int(value) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[unit]
+
+def format_duration(seconds: int) -> str:
+    for unit, size in (("д", 86400), ("ч", 3600), ("м", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}с"
+
+def format_value(value: float, unit: str) -> str:
+    if unit in ("B", "B/s"):
+        rate = unit[1:]
+        for suffix in ("B", "KB", "MB", "GB", "TB"):
+            if abs(value) < 1024 or suffix == "TB":
+                return f"{value:.1f} {suffix}{rate}"
+            value /= 1024
+    if unit == "%":
+        return f"{value:.1f}%"
+    return f"{value:.2f}"
+
+def sparkline(values, width: int = 40) -> str:
+    """Строит спарклайн из значений, сжимая их до width символов"""
+    if not values:
+        return ""
+    if len(values) > width:
+        # Усредняем соседние точки, чтобы строка помещалась в сообщение
+        chunk = len(values) / width
+        groups = [values[int(i * chunk):int((i + 1) * chunk)] for i in range(width)]
+        values = [sum(group) / len(group) for group in groups]
+    low, high = min(values), max(values)
+    if math.isclose(low, high):
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[int((v - low) * scale)] for v in values)
+
+def render_trend(name: str, seconds: int, step: int, points) -> str:
+    """Текст со спарклайном и сводкой (мин/сред/макс) по точкам query() одной метрики"""
+    title, unit = METRICS[name]
+    header = f"📈 {title} за {format_duration(seconds)} (шаг {format_duration(step)})"
+    if not points:
+        return f"{header}\n\n📭 Нет данных за этот период."
+    avgs = [p[2] for p in points]
+    low = min(p[1] for p in points)
+    high = max(p[3] for p in points)
+    mean = sum(avgs) / len(avgs)
+    return (
+        f"{header}\n\n"
+        f"{sparkline(avgs)}\n\n"
+        f"мин {format_value(low, unit)} · сред {format_value(mean, unit)} · "
+        f"макс {format_value(high, unit)}\n"
+        f"последнее {format_value(avgs[-1], unit)} · точек: {len(points)}"
+    )
+
+metrics = MetricStore()
@@ -0,0 +1,125 @@
+import heapq
+import time
+from collections import OrderedDict, deque
+from config.config import USAGE_MAX_PROCESSES, USAGE_RETENTION
+
+BUCKET = 60  # поминутные интервалы
+
+# Ключи сортировки для /topusage: (индекс в агрегате, заголовок списка)
+USAGE_KEYS = {
+    "cpu": (0, "по CPU"),
+    "rss": (1, "по пиковой памяти"),
+    "io": (2, "по вводу-выводу"),
+}
+
+class ProcessUsage:
+    """Потребление одного процесса: поминутные [минута, CPU-секунды, пик RSS, байты I/O]"""
+
+    __slots__ = ("pid", "name", "buckets", "alive")
+
+    def __init__(self, pid: int, name: str, retention: int):
+        self.pid = pid
+        self.name = name
+        self.buckets = deque(maxlen=retention // BUCKET + 1)
+        self.alive = True
+
+    def add(self, minute: float, cpu: float, rss: int, io: int):
+        if self.buckets and self.buckets[-1][0] == minute:
+            bucket = self.buckets[-1]
+            bucket[1] += cpu
+            bucket[2] = max(bucket[2], rss)
+            bucket[3] += io
+        else:
+            self.buckets.append([minute, cpu, rss, io])
+
+    def total(self, since: float):
+        """(CPU-секунды, пик RSS, байты I/O) за интервалы не раньше since"""
+        cpu = io = 0
+        rss = 0
+        for minute, b_cpu, b_rss, b_io in reversed(self.buckets):
+            if minute + BUCKET <= since:
+                break
+            cpu += b_cpu
+            rss = max(rss, b_rss)
+            io += b_io
+        return cpu, rss, io
+
+class UsageStore:
+    """
+    Скользящий учёт потребления ресурсов процессами.
+
+    Ключ - (pid, время запуска, имя), поэтому переиспользованный PID
+    не наследует чужую историю. Получает таблицу ProcessTracker
+    после каждого обновления и копит приросты счётчиков по минутам.
+
+    Память ограничена: у процесса не больше retention / 60 интервалов,
+    а записей - не больше max_processes. Записи упорядочены по
+    последнему обновлению, поэтому при переполнении первыми
+    вытесняются давно завершившиеся процессы; завершившиеся
+    раньше retention удаляются сразу.
+    """
+
+    def __init__(self, retention: int, max_processes: int):
+        self.retention = retention
+        self.max_processes = max_processes
+        self.records = OrderedDict()
+        self._last_seen = set()
+        # Последние показания счётчиков по (pid, время запуска): имя процесса
+        # может меняться (kworker, exec), а счётчики продолжаются
+        self._counters = {}
+        self._primed = False
+
+    def update(self, stats: dict, now: float):
+        """Подписчик ProcessTracker: учитывает приросты с прошлого обновления"""
+        minute = now - now % BUCKET
+        records = self.records
+        seen = set()
+        counters = {}
+        for info in stats.values():
+            process = (info["pid"], info["create_time"])
+            key = process + (info["name"],)
+            record = records.get(key)
+            if record is None:
+                record = records[key] = ProcessUsage(info["pid"], info["name"], self.retention)
+            else:
+                records.move_to_end(key)
+            last = self._counters.get(process)
+            if last is None:
+                # Процесс, появившийся после первого обновления, запущен уже
+                # во время учёта и попадает в окно целиком; у процессов из
+                # первой таблицы прошлое потребление к окну не относится
+                last = (0.0, 0) if self._primed else (info["cpu_time"], info["io_total"])
+            io_total = info["io_total"]
+            cpu = info["cpu_time"] - last[0]
+            io = io_total - last[1] if io_total is not None and last[1] is not None else 0
+            counters[process] = (info["cpu_time"], io_total)
+            record.add(minute, max(cpu, 0.0), info["rss"], max(io, 0))
+            seen.add(key)
+        self._counters = counters
+
+        for key in self._last_seen - seen:
+            record = records.get(key)
+            if record is not None:
+                record.alive = False
+        self._last_seen = seen
+        self._primed = True
+
+        # Самые старые записи - процессы, которые давно не появлялись в таблице
+        cutoff = now - self.retention
+        while records:
+            key, record = next(iter(records.items()))
+            if len(records) <= self.max_processes and (record.alive or record.buckets[-1][0] + BUCKET > cutoff):
+                break
+            records.popitem(last=False)
+
+    def top(self, seconds: float, key: str = "cpu", n: int = 10, now: float = None) -> list:
+        """
+        N процессов с наибольшим потреблением за последние seconds секунд.
+        Возвращает [(ProcessUsage, (CPU-секунды, пик RSS, байты I/O))].
+        """
+        since = (now if now is not None else time.time()) - seconds
+        index = USAGE_KEYS[key][0]
+        totals = ((record, record.total(since)) for record in self.records.values())
+        return [item for item in heapq.nlargest(n, totals, key=lambda item: item[1][index]) if item[1][index] > 0]
+
+usage_store = UsageStore(USAGE_RETENTION, USAGE_MAX_PROCESSES)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import secrets
+import signal
+from aiogram import Bot, Dispatcher
+
+logger = logging.getLogger(__name__)
+
+async def run_webhook(dp: Dispatcher, bot: Bot, url: str, host: str, port: int,
+                      path: str = "/webhook", secret: str = None, stop: asyncio.Event = None):
+    """
+    Принимает апдейты webhook'ом на встроенном aiohttp-сервере до SIGINT/SIGTERM
+    (или до установки stop). Telegram присылает апдейт сразу, без long-poll запроса.
+
+    Запросы без заголовка X-Telegram-Bot-Api-Secret-Token с секретом отклоняются (401).
+    Если секрет не задан, на каждый запуск генерируется новый.
+    Webhook регистрируется после запуска сервера и снимается до его остановки,
+    чтобы после выключения бот можно было запустить в режиме polling.
+    """
+    # aiohttp.web нужен только в режиме webhook - не замедляем запуск в режиме polling
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+    secret = secret or secrets.token_urlsafe(32)
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+    app = web.Application()
+    # Ответ Telegram сразу, обработка апдейта - в фоне
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        await bot.set_webhook(
+            url.rstrip("/") + path,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook {url.rstrip('/')}{path}, слушаю {host}:{port}")
+        await stop.wait()
+    finally:
+        try:
+            await bot.delete_webhook()
+        except Exception as e:
+            logger.error(f"Не удалось снять webhook: {e}")
+        # Закрывает и сессию бота (SimpleRequestHandler.close)
+        await runner.cleanup()
+
+async def run_polling(dp: Dispatcher, bot: Bot, **kwargs):
+    """Long polling; оставшийся от прошлого запуска webhook мешал бы getUpdates"""
+    await bot.delete_webhook()
+    await dp.start_polling(bot, **kwargs)